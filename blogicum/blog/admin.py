@@ -1,9 +1,45 @@
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
 
-from .models import Location, Category, Post, Comment
+from .deletion import schedule_deletion
+from .models import Location, Category, Post, Comment, DeletionJob
 # Register your models here.
 
+User = get_user_model()
+
+
+class ChunkedDeletionMixin:
+    """Удаление через blog.deletion: по частям и в фоне."""
+
+    def delete_model(self, request, obj):
+        schedule_deletion(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            schedule_deletion(obj)
+
+
+class PostAdmin(ChunkedDeletionMixin, admin.ModelAdmin):
+    pass
+
+
+class BlogUserAdmin(ChunkedDeletionMixin, UserAdmin):
+    pass
+
+
+@admin.register(DeletionJob)
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'target', 'object_id', 'status', 'deleted', 'total', 'updated_at'
+    )
+    list_filter = ('status', 'target')
+    readonly_fields = [field.name for field in DeletionJob._meta.fields]
+
+
 admin.site.register(Location)
 admin.site.register(Category)
-admin.site.register(Post)
+admin.site.register(Post, PostAdmin)
 admin.site.register(Comment)
+admin.site.unregister(User)
+admin.site.register(User, BlogUserAdmin)
@@ -0,0 +1,262 @@
+"""Read-only JSON API для мобильного приложения.
+
+Правила публикации берутся из ``blog.views``, объекты сериализуются
+прямо из ``values()``, постраничный вывод - по непрозрачному курсору
+(keyset) вместо OFFSET.
+"""
+import base64
+import binascii
+import hashlib
+import json
+from datetime import datetime
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.dateparse import parse_datetime
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_safe
+
+from .deletion import deleting_post_ids
+from .models import Comment, Post
+from .reference import get_published_category, get_reference
+from .views import (
+    get_author_posts, get_category_posts, get_published_posts
+)
+
+User = get_user_model()
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+# Публичное имя поля -> выражение для values().
+POST_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'image': 'image',
+    'author': 'author__username',
+    # Категория и место берутся из справочника в памяти, без JOIN.
+    'category': 'category_id',
+    'location': 'location_id',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created_at': 'created_at',
+    # Имя автора подставляет post_comments: комментарии могут лежать в
+    # другой базе, и JOIN с пользователями невозможен.
+    'author': 'author_id',
+    'post': 'post_id',
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def encode_cursor(*values):
+    # Не DjangoJSONEncoder: он обрезает время до миллисекунд, и сравнение
+    # с точным значением в базе пропускает или повторяет строки.
+    raw = json.dumps([
+        value.isoformat() if isinstance(value, datetime) else value
+        for value in values
+    ]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        moment, pk = json.loads(base64.urlsafe_b64decode(padded))
+        moment = parse_datetime(moment)
+        pk = int(pk)
+    except (binascii.Error, ValueError, TypeError):
+        raise BadRequest('Некорректный курсор')
+    if moment is None:
+        raise BadRequest('Некорректный курсор')
+    return moment, pk
+
+
+def get_fields(request, available):
+    """Разбирает ?fields=a,b и возвращает выбранные имена полей."""
+    requested = request.GET.get('fields')
+    if not requested:
+        return list(available)
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = set(names) - set(available)
+    if unknown:
+        raise BadRequest(
+            'Неизвестные поля: ' + ', '.join(sorted(unknown))
+        )
+    return names
+
+
+def get_limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise BadRequest('Параметр limit должен быть числом')
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def serialize_rows(rows, names, available):
+    reference = get_reference()
+    items = []
+    for row in rows:
+        item = {name: row[available[name]] for name in names}
+        if 'image' in item:
+            item['image'] = (
+                default_storage.url(item['image']) if item['image'] else None
+            )
+        if 'category' in item:
+            category = reference.categories.get(item['category'])
+            item['category'] = category and category.slug
+        if 'location' in item:
+            location = reference.locations.get(item['location'])
+            item['location'] = location and location.name
+        items.append(item)
+    return items
+
+
+def paginate(request, queryset, available, order_field, descending=True):
+    """Keyset-пагинация по паре (order_field, id).
+
+    Возвращает словарь с элементами страницы и курсором следующей.
+    """
+    names = get_fields(request, available)
+    limit = get_limit(request)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        moment, pk = decode_cursor(cursor)
+        if descending:
+            queryset = queryset.filter(
+                Q(**{f'{order_field}__lt': moment})
+                | Q(**{order_field: moment, 'id__lt': pk})
+            )
+        else:
+            queryset = queryset.filter(
+                Q(**{f'{order_field}__gt': moment})
+                | Q(**{order_field: moment, 'id__gt': pk})
+            )
+    prefix = '-' if descending else ''
+    # Поля курсора выбираем всегда, даже если их нет в ?fields=.
+    columns = {available[name] for name in names} | {'id', order_field}
+    rows = list(
+        queryset.order_by(prefix + order_field, prefix + 'id')
+        .values(*columns)[:limit + 1]
+    )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last[order_field], last['id'])
+    return {
+        'results': serialize_rows(rows, names, available),
+        'next': next_cursor,
+    }
+
+
+def json_response(request, payload, status=200):
+    """JSON-ответ с ETag; при совпадении If-None-Match отдаёт 304."""
+    body = json.dumps(
+        payload, cls=DjangoJSONEncoder, ensure_ascii=False
+    ).encode()
+    response = HttpResponse(
+        body, status=status, content_type='application/json'
+    )
+    # Ответ зависит от пользователя: автор видит свои неопубликованные посты.
+    patch_vary_headers(response, ('Cookie',))
+    if status != 200:
+        return response
+    etag = quote_etag(hashlib.md5(body).hexdigest())
+    response['ETag'] = etag
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+def api_view(view):
+    """Общая обвязка: только GET/HEAD, ошибки в формате JSON."""
+    @wraps(view)
+    @require_safe
+    def wrapper(request, *args, **kwargs):
+        try:
+            payload = view(request, *args, **kwargs)
+        except BadRequest as error:
+            return JsonResponse({'error': str(error)}, status=400)
+        except Http404:
+            return JsonResponse({'error': 'Не найдено'}, status=404)
+        return json_response(request, payload)
+    return wrapper
+
+
+def get_visible_posts(user):
+    """Публикации, страницу которых может открыть пользователь."""
+    posts = get_published_posts()
+    if user.is_authenticated:
+        # Удаляемые в фоне посты скрыты и от автора.
+        posts = posts | Post.objects.filter(author=user).exclude(
+            pk__in=deleting_post_ids()
+        )
+    return posts
+
+
+@api_view
+def post_list(request):
+    return paginate(
+        request, get_published_posts(), POST_FIELDS, 'pub_date'
+    )
+
+
+@api_view
+def post_detail(request, post_id):
+    names = get_fields(request, POST_FIELDS)
+    rows = list(
+        get_visible_posts(request.user).filter(pk=post_id)
+        .values(*{POST_FIELDS[name] for name in names})[:1]
+    )
+    if not rows:
+        raise Http404
+    return serialize_rows(rows, names, POST_FIELDS)[0]
+
+
+@api_view
+def category_posts(request, category_slug):
+    category = get_published_category(category_slug)
+    if category is None:
+        raise Http404
+    return paginate(
+        request, get_category_posts(category), POST_FIELDS, 'pub_date'
+    )
+
+
+@api_view
+def author_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    return paginate(
+        request, get_author_posts(author, request.user),
+        POST_FIELDS, 'pub_date'
+    )
+
+
+@api_view
+def post_comments(request, post_id):
+    if not get_visible_posts(request.user).filter(pk=post_id).exists():
+        raise Http404
+    comments = Comment.objects.filter(post_id=post_id, is_published=True)
+    page = paginate(
+        request, comments, COMMENT_FIELDS, 'created_at', descending=False
+    )
+    items = [item for item in page['results'] if 'author' in item]
+    if items:
+        usernames = dict(User.objects.filter(
+            pk__in={item['author'] for item in items}
+        ).values_list('pk', 'username'))
+        for item in items:
+            item['author'] = usernames.get(item['author'])
+    return page
@@ -5,3 +5,13 @@ class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
     verbose_name = 'Блог'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from blogicum.db import configure_sqlite
+        from blogicum.query_budget import install_query_counter
+        from . import signals  # noqa: F401
+
+        connection_created.connect(configure_sqlite)
+        connection_created.connect(install_query_counter)
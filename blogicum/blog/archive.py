@@ -0,0 +1,133 @@
+"""Архив публикаций по годам, месяцам и дням.
+
+Боковая панель читает готовые счётчики ``MonthBucket`` одним запросом, а
+не группирует посты по месяцам; из них вычитаются опубликованные, но не
+видимые в ленте посты (отложенные, скрытые категорией, местом или
+автором), которых обычно немного. Лента периода идёт по индексу
+(pub_date, id): диапазон дат и keyset-пагинация по курсору из
+``blog.api`` вместо OFFSET, поэтому дальние страницы не дороже первой.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+from django.http import Http404
+from django.shortcuts import render
+from django.urls import register_converter
+from django.utils import timezone
+
+from .api import BadRequest, decode_cursor, encode_cursor
+from .cache import FEED_TAG
+from .models import MonthBucket, Post, month_key
+from .page_cache import shared_page
+from .reference import get_reference
+from .views import get_published_posts, prepare_posts_page
+
+PAGE_SIZE = 10
+
+
+class TwoDigitsConverter:
+    """Месяц и день в адресе всегда из двух цифр: /archive/2024/05/."""
+
+    regex = '[0-9]{2}'
+
+    def to_python(self, value):
+        return int(value)
+
+    def to_url(self, value):
+        return f'{int(value):02d}'
+
+
+register_converter(TwoDigitsConverter, 'two_digits')
+
+
+def get_period(year, month=None, day=None):
+    """Начало и конец периода в текущем часовом поясе."""
+    try:
+        start = datetime(year, month or 1, day or 1)
+        if day is not None:
+            end = start + timedelta(days=1)
+        elif month is not None:
+            end = (start + timedelta(days=31)).replace(day=1)
+        else:
+            end = start.replace(year=year + 1)
+    except (ValueError, OverflowError):
+        raise Http404('Такой даты нет')
+    return timezone.make_aware(start), timezone.make_aware(end)
+
+
+def _hidden_months(now):
+    """Сколько опубликованных постов по месяцам не видно в ленте.
+
+    Дополнение к условиям ``get_published_posts``: счётчики месяцев их
+    не учитывают.
+    """
+    reference = get_reference()
+    hidden = (
+        Q(pub_date__gt=now)
+        | Q(author__is_active=False)
+        | Q(category__isnull=True)
+        | Q(category_id__in=(
+            reference.categories.keys() - reference.published_category_ids
+        ))
+        | Q(location__isnull=True)
+        | Q(location_id__in=(
+            reference.locations.keys() - reference.published_location_ids
+        ))
+    )
+    return Counter(
+        month_key(pub_date) for pub_date in Post.objects.filter(
+            hidden, is_published=True
+        ).values_list('pub_date', flat=True).order_by()
+    )
+
+
+def get_archive_months():
+    """Месяцы с публикациями для боковой панели, новые сверху."""
+    now = timezone.now()
+    local = timezone.localtime(now)
+    hidden = _hidden_months(now)
+    months = []
+    for bucket in MonthBucket.objects.filter(
+        Q(year__lt=local.year) | Q(year=local.year, month__lte=local.month),
+        count__gt=0
+    ):
+        bucket.count -= hidden[bucket.year, bucket.month]
+        if bucket.count > 0:
+            months.append(bucket)
+    return months
+
+
+@shared_page
+def archive(request, year, month=None, day=None):
+    start, end = get_period(year, month, day)
+    posts = get_published_posts().filter(
+        pub_date__gte=start, pub_date__lt=end
+    ).select_related('author')
+
+    cursor = request.GET.get('before')
+    if cursor:
+        try:
+            moment, pk = decode_cursor(cursor)
+        except BadRequest:
+            raise Http404('Некорректный курсор')
+        posts = posts.filter(
+            Q(pub_date__lt=moment) | Q(pub_date=moment, id__lt=pk)
+        )
+    posts = list(posts.order_by('-pub_date', '-id')[:PAGE_SIZE + 1])
+    next_cursor = None
+    if len(posts) > PAGE_SIZE:
+        posts = posts[:PAGE_SIZE]
+        next_cursor = encode_cursor(posts[-1].pub_date, posts[-1].pk)
+    prepare_posts_page(request, posts, FEED_TAG)
+
+    context = {
+        'start': start,
+        'month': month,
+        'day': day,
+        'posts': posts,
+        'cursor': cursor,
+        'next_cursor': next_cursor,
+        'months': get_archive_months(),
+    }
+    return render(request, 'blog/archive.html', context)
@@ -0,0 +1,188 @@
+"""Асинхронные страницы чтения для развёртывания через ASGI.
+
+Подключаются вместо ``blog.views`` настройкой ``ASYNC_READ_VIEWS``.
+Запросы к базе синхронные и идут в потоках, но независимые из них
+выполняются одновременно: количество записей и сама страница ленты,
+пост и его комментарии, автор профиля и его записи.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.paginator import Page, Paginator
+from django.db import close_old_connections
+from django.http import Http404
+from django.shortcuts import render
+
+from .cache import (
+    FEED_TAG, LOCATIONS_TAG, author_tag, category_tag, get_post_tags,
+    post_tag
+)
+from .counters import count_views
+from .deletion import is_being_deleted
+from .forms import CommentForm
+from .models import Comment, Post
+from .page_cache import shared_page, skip_page_cache, tag_page
+from .reference import attach_reference, get_published_category
+from .views import (
+    filter_author_posts, get_category_posts, get_published_posts,
+    get_related_posts, is_own_profile, is_post_public, prepare_posts_page
+)
+
+User = get_user_model()
+
+POSTS_PER_PAGE = 10
+
+
+def in_thread(func, *args, **kwargs):
+    """Запускает синхронный код ORM в отдельном потоке со своим соединением.
+
+    Такие вызовы можно ждать одновременно через ``asyncio.gather``.
+    Потоки пула не видят request_finished, поэтому их соединения
+    закрываются по CONN_MAX_AGE здесь же, до и после вызова.
+    """
+    def run():
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)()
+
+
+async def get_page(queryset, number):
+    """Страница пагинатора; количество и записи выбираются одновременно."""
+    try:
+        number = max(int(number), 1)
+    except (TypeError, ValueError):
+        number = 1
+
+    def fetch(page_number):
+        bottom = (page_number - 1) * POSTS_PER_PAGE
+        return list(queryset[bottom:bottom + POSTS_PER_PAGE])
+
+    count, posts = await asyncio.gather(
+        in_thread(queryset.count), in_thread(fetch, number)
+    )
+    paginator = Paginator(queryset, POSTS_PER_PAGE)
+    paginator.count = count
+    if number > paginator.num_pages:
+        # Как Paginator.get_page: за последней страницей - последняя.
+        number = paginator.num_pages
+        posts = await in_thread(fetch, number)
+    return Page(posts, number, paginator)
+
+
+async def render_posts_page(request, queryset, template, context, *tags):
+    page_obj = await get_page(queryset, request.GET.get('page'))
+    await in_thread(prepare_posts_page, request, page_obj, *tags)
+    context['page_obj'] = page_obj
+    return await sync_to_async(render)(request, template, context)
+
+
+def get_feed_posts():
+    return get_published_posts().select_related(
+        'author'
+    ).order_by('-pub_date')
+
+
+def get_post(post_id):
+    post = Post.objects.select_related('author').filter(pk=post_id).first()
+    if post is not None:
+        attach_reference([post])
+    return post
+
+
+def get_comments(post_id):
+    return list(
+        Comment.objects.filter(
+            post_id=post_id, is_published=True
+        ).prefetch_related('author')
+    )
+
+
+@shared_page
+async def index(request):
+    post_list = await in_thread(get_feed_posts)
+    return await render_posts_page(
+        request, post_list, 'blog/index.html', {}, FEED_TAG
+    )
+
+
+@count_views
+@shared_page
+async def post_detail(request, post_id):
+    # Комментарии и похожие посты выбираются вместе с постом.
+    post, comments, related_posts = await asyncio.gather(
+        in_thread(get_post, post_id), in_thread(get_comments, post_id),
+        in_thread(get_related_posts, post_id)
+    )
+    if post is None:
+        raise Http404("Пост не найден")
+
+    if not await in_thread(is_post_public, post):
+        user = await request.auser()
+        if user.pk != post.author_id or await in_thread(
+            is_being_deleted, post.pk
+        ):
+            raise Http404("Пост не найден")
+        skip_page_cache(request)
+    tag_page(request, *get_post_tags(post))
+    tag_page(request, *(post_tag(related.pk) for related in related_posts))
+
+    context = {
+        'post': post,
+        'comments': comments,
+        'form': CommentForm(),
+        'related_posts': related_posts,
+    }
+    return await sync_to_async(render)(request, 'blog/detail.html', context)
+
+
+def get_category_feed(category_slug):
+    """Категория из справочника и её лента; (None, None), если скрыта."""
+    category = get_published_category(category_slug)
+    if category is None:
+        return None, None
+    return category, get_category_posts(category).select_related(
+        'author'
+    ).order_by('-pub_date')
+
+
+@shared_page
+async def category_posts(request, category_slug):
+    # Справочник в памяти, обычно без запроса к базе.
+    category, post_list = await in_thread(get_category_feed, category_slug)
+    if category is None:
+        raise Http404("Категория не найдена")
+    return await render_posts_page(
+        request, post_list, 'blog/category.html', {'category': category},
+        category_tag(category.slug), LOCATIONS_TAG
+    )
+
+
+@shared_page(personal=is_own_profile)
+async def profile(request, username):
+    user = await request.auser()
+    is_owner = user.is_authenticated and user.username == username
+    # Автор и его записи выбираются одновременно: записи ищутся по имени,
+    # по тем же правилам видимости, что и в blog.views.
+    post_list = filter_author_posts(
+        Post.objects.filter(author__username=username), is_owner
+    )
+    author, page_obj = await asyncio.gather(
+        in_thread(User.objects.filter(username=username).first),
+        get_page(post_list.select_related('author'), request.GET.get('page')),
+    )
+    if author is None:
+        raise Http404("Пользователь не найден")
+    await in_thread(
+        prepare_posts_page, request, page_obj, author_tag(author.username)
+    )
+
+    context = {
+        'profile': author,
+        'page_obj': page_obj,
+    }
+    return await sync_to_async(render)(request, 'blog/profile.html', context)
@@ -0,0 +1,132 @@
+"""Общие помощники нагрузочных тестов (management-команды *_bench)."""
+import asyncio
+import io
+import sys
+import threading
+import time
+
+
+def percentile(values, q):
+    """q-й перцентиль (0-100) методом ближайшего ранга."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = round(q / 100 * (len(ordered) - 1))
+    return ordered[min(len(ordered) - 1, max(rank, 0))]
+
+
+def run_threads(targets, duration=None):
+    """Запускает функции в отдельных потоках и ждёт их завершения.
+
+    Каждая функция получает событие остановки; если задан ``duration``,
+    событие выставляется через столько секунд. Возвращает время работы.
+    """
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=target, args=(stop,), daemon=True)
+        for target in targets
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    if duration is not None:
+        stop.wait(duration)
+        stop.set()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def format_table(headers, rows):
+    """Простая текстовая таблица для вывода в консоль."""
+    rows = [[str(cell) for cell in row] for row in rows]
+    widths = [
+        max(len(str(header)), *(len(row[i]) for row in rows))
+        if rows else len(str(header))
+        for i, header in enumerate(headers)
+    ]
+    lines = [
+        '  '.join(str(h).ljust(w) for h, w in zip(headers, widths)),
+        '  '.join('-' * w for w in widths),
+    ]
+    lines.extend(
+        '  '.join(cell.ljust(w) for cell, w in zip(row, widths))
+        for row in rows
+    )
+    return '\n'.join(lines)
+
+
+def wsgi_environ(path, host='localhost', cookies=None):
+    path, _, query = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': host,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': host,
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    if cookies:
+        environ['HTTP_COOKIE'] = '; '.join(
+            f'{name}={value}' for name, value in cookies.items()
+        )
+    return environ
+
+
+def wsgi_get(application, path, cookies=None):
+    """GET через WSGI-приложение; возвращает код ответа."""
+    status = []
+    result = application(
+        wsgi_environ(path, cookies=cookies),
+        lambda line, headers, exc_info=None: status.append(line)
+    )
+    try:
+        for _ in result:
+            pass
+    finally:
+        # close() шлёт request_finished: Django закрывает соединения.
+        result.close()
+    return int(status[0].split()[0])
+
+
+async def asgi_get(application, path, host='localhost'):
+    """GET через ASGI-приложение; возвращает код ответа."""
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', host.encode())],
+        'client': ('127.0.0.1', 0),
+        'server': (host, 80),
+    }
+    received = asyncio.Event()
+    status = []
+
+    async def receive():
+        if received.is_set():
+            # Клиент не отключается: ждём, пока обработчик не отменит.
+            await asyncio.Event().wait()
+        received.set()
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await application(scope, receive, send)
+    return status[0]
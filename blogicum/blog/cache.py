@@ -0,0 +1,238 @@
+"""Инвалидация кэша блога по тегам.
+
+Каждая запись помнит теги (``post:42``, ``category:routine``,
+``author:alice``) вместе с их поколениями на момент сохранения.
+``invalidate_tags`` увеличивает поколение тега одной операцией, и все
+записи с этим тегом становятся устаревшими; сигналы моделей вызывают
+его через ``invalidate_tags_on_commit``, уже после COMMIT. Теги, которые
+страница собирает во время рендера, неизвестны заранее, поэтому каждый
+сброс увеличивает и общий счётчик: если он сменился за время рендера,
+запись сохраняется уже устаревшей. Используются только
+``get_many``/``set``/``add``/``incr``, поэтому подходит любой бэкенд кэша.
+
+``get_or_compute`` защищает дорогие результаты (страницы, выборки) от
+«набега»: пересчитывает значение только один процесс под блокировкой,
+остальные тем временем получают устаревшую копию; обновление начинается
+чуть раньше срока с вероятностью, растущей к его концу, а при ошибке
+пересчёта (например, «database is locked») отдаётся прежняя копия.
+"""
+import hashlib
+import logging
+import math
+import random
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+
+logger = logging.getLogger(__name__)
+
+FEED_TAG = 'feed'
+LOCATIONS_TAG = 'locations'
+# Страницы популярного: сбрасывается после пересчёта (blog.trending).
+TRENDING_TAG = 'trending'
+
+
+def post_tag(post_id):
+    return f'post:{post_id}'
+
+
+def author_tag(username):
+    return f'author:{username}'
+
+
+def category_tag(slug):
+    return f'category:{slug}'
+
+
+def location_tag(location_id):
+    return f'location:{location_id}'
+
+
+def get_post_tags(post):
+    """Теги всего, что упоминает карточка или страница публикации."""
+    tags = {post_tag(post.pk), author_tag(post.author.username)}
+    if post.category_id is not None:
+        tags.add(category_tag(post.category.slug))
+    if post.location_id is not None:
+        tags.add(location_tag(post.location_id))
+    return tags
+
+
+# Общий счётчик сбросов любых тегов и время последнего сброса.
+INVALIDATIONS_KEY = 'tag:invalidations'
+INVALIDATED_AT_KEY = 'tag:invalidated_at'
+
+
+def _tag_key(tag):
+    return 'tag:' + hashlib.md5(tag.encode()).hexdigest()
+
+
+def _new_version():
+    # Не с нуля: если ключ тега вытеснен из кэша, записи со старым
+    # поколением не должны снова стать свежими.
+    return time.time_ns()
+
+
+def get_tag_versions(tags):
+    """Текущие поколения тегов; отсутствующие создаются."""
+    keys = {_tag_key(tag): tag for tag in tags}
+    found = cache.get_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    for key, tag in keys.items():
+        if key not in found:
+            cache.add(key, _new_version(), None)
+            versions[tag] = cache.get(key)
+    return versions
+
+
+def invalidate_tags(*tags):
+    """Делает устаревшими все записи с любым из тегов."""
+    # Счётчик - после тегов: кто прочитал его прежним, заметит смену.
+    for key in [*map(_tag_key, set(tags)), INVALIDATIONS_KEY]:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), None)
+    cache.set(INVALIDATED_AT_KEY, time.time(), None)
+
+
+def invalidated_within(seconds):
+    """Сбрасывался ли какой-нибудь тег за последние ``seconds`` секунд."""
+    invalidated_at = cache.get(INVALIDATED_AT_KEY)
+    return (
+        invalidated_at is not None
+        and time.time() - invalidated_at < seconds
+    )
+
+
+def invalidate_tags_on_commit(*tags, using=None):
+    """``invalidate_tags`` после фиксации транзакции ``using``.
+
+    Сброс до COMMIT открывает окно: другой процесс прочитает ещё старые
+    строки и сохранит их под новыми поколениями как свежие. Вне
+    транзакции теги сбрасываются сразу.
+    """
+    transaction.on_commit(partial(invalidate_tags, *tags), using=using)
+
+
+def is_fresh(entry):
+    tags = entry['tags']
+    return not tags or get_tag_versions(tags) == tags
+
+
+def get_entry(key):
+    """Запись кэша вместе с признаком свежести по тегам."""
+    entry = cache.get(key)
+    if entry is None:
+        return None, False
+    return entry, is_fresh(entry)
+
+
+def get_cached(key, default=None):
+    entry, fresh = get_entry(key)
+    if not fresh:
+        return default
+    return entry['value']
+
+
+def set_cached(key, value, tags=(), timeout=None):
+    entry = {'value': value, 'tags': get_tag_versions(tags)}
+    cache.set(key, entry, timeout)
+
+
+def _should_refresh(entry, beta):
+    """Вероятностное раннее обновление (XFetch).
+
+    Чем дольше считалось значение и чем ближе срок, тем вероятнее, что
+    очередной запрос возьмётся за пересчёт заранее.
+    """
+    if 'expires' not in entry:
+        return False
+    jitter = entry['delta'] * beta * math.log(1.0 - random.random())
+    return time.time() - jitter >= entry['expires']
+
+
+def _recompute(key, compute, timeout, tags, stale_timeout, stale):
+    started = time.monotonic()
+    # Поколения читаются до расчёта: сброс во время него не должен
+    # достаться устаревшему значению.
+    if callable(tags):
+        invalidations = cache.get(INVALIDATIONS_KEY)
+        versions = None
+    else:
+        versions = get_tag_versions(tags)
+    try:
+        value = compute()
+    except DatabaseError:
+        if stale is None:
+            raise
+        logger.warning(
+            'Не удалось пересчитать %s, отдаём устаревшую копию', key,
+            exc_info=True
+        )
+        return stale['value']
+    if versions is None:
+        versions = get_tag_versions(tags(value))
+        if cache.get(INVALIDATIONS_KEY) != invalidations:
+            # Какой тег сбросили, неизвестно: запись сразу устаревшая.
+            versions = dict.fromkeys(versions)
+    entry = {
+        'value': value,
+        'tags': versions,
+        'expires': time.time() + timeout,
+        'delta': time.monotonic() - started,
+    }
+    cache.set(key, entry, timeout + stale_timeout)
+    return value
+
+
+def _wait_for_entry(key, lock_key):
+    """Ждёт, пока значение посчитает владелец блокировки."""
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None and is_fresh(entry):
+            return entry
+        if cache.get(lock_key) is None:
+            break
+    return None
+
+
+def get_or_compute(
+    key, compute, timeout, tags=(), stale_timeout=None, beta=1.0
+):
+    """Значение из кэша или результат ``compute()`` без «набега».
+
+    ``tags`` - теги записи или функция, получающая их из значения.
+    Устаревшая копия хранится ещё ``stale_timeout`` секунд после срока
+    и отдаётся, пока другой процесс её пересчитывает или если пересчёт
+    упал с ошибкой базы данных.
+    """
+    if stale_timeout is None:
+        stale_timeout = settings.CACHE_STALE_TIMEOUT
+    entry = cache.get(key)
+    if (
+        entry is not None
+        and is_fresh(entry)
+        and not _should_refresh(entry, beta)
+    ):
+        return entry['value']
+
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, settings.CACHE_LOCK_TIMEOUT):
+        try:
+            return _recompute(
+                key, compute, timeout, tags, stale_timeout, entry
+            )
+        finally:
+            cache.delete(lock_key)
+    if entry is not None:
+        return entry['value']
+    entry = _wait_for_entry(key, lock_key)
+    if entry is not None:
+        return entry['value']
+    return _recompute(key, compute, timeout, tags, stale_timeout, None)
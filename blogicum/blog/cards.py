@@ -0,0 +1,114 @@
+"""Карточки постов в ленте без шаблона на каждую карточку.
+
+``render_post_cards`` выдаёт ровно то же, что цикл страниц ленты с
+``{% include "includes/post_card.html" %}`` внутри ``<article>``, но за
+один проход и с адресами из ``fast_reverse``. При правке
+``post_card.html`` или ``category_link.html`` этот модуль нужно править
+вместе с ними: совпадение проверяют тесты.
+"""
+from django.template.defaultfilters import date, truncatewords
+from django.urls import get_script_prefix, reverse
+from django.utils.formats import localize
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+from django.utils.timezone import template_localtime
+
+from .fast_urls import fast_path
+
+
+def _url(prefix, name, *args):
+    path = fast_path(name, *args)
+    if path is None:
+        return conditional_escape(reverse(name, args=args))
+    return conditional_escape(prefix + path)
+
+
+def _value(value):
+    """Как вывод переменной {{ }}: локализация и экранирование."""
+    return conditional_escape(localize(template_localtime(value)))
+
+
+def _card(post, prefix):
+    category = post.category
+    location = post.location
+    parts = [
+        '<div class="col d-flex justify-content-center">\n'
+        '  <div class="card" style="width: 40rem;">\n'
+        '    <div class="card-body">\n'
+        '      '
+    ]
+    if post.image:
+        image_url = conditional_escape(post.image.url)
+        parts.append(
+            f'\n        <a href="{image_url}" target="_blank">\n'
+            '          <img class="border-3 rounded img-fluid img-thumbnail'
+            f' mb-2 mx-auto d-block" src="{image_url}">\n'
+            '        </a>\n'
+            '      '
+        )
+    parts.append(
+        f'\n      <h5 class="card-title">{_value(post.title)}</h5>\n'
+        '      <h6 class="card-subtitle mb-2 text-muted">\n'
+        '        <small>\n'
+        '          '
+    )
+    if not post.is_published:
+        parts.append(
+            '\n            <p class="text-danger">'
+            'Пост снят с публикации админом</p>\n'
+            '          '
+        )
+    elif not getattr(category, 'is_published', None):
+        parts.append(
+            '\n            <p class="text-danger">'
+            'Выбранная категория снята с публикации админом</p>\n'
+            '          '
+        )
+    pub_date = conditional_escape(
+        date(template_localtime(post.pub_date), 'd E Y, H:i')
+    )
+    if location and location.is_published:
+        place = _value(location.name)
+    else:
+        place = 'Планета Земля'
+    username = post.author.username
+    post_url = _url(prefix, 'blog:post_detail', post.id)
+    profile_url = _url(prefix, 'blog:profile', username)
+    category_url = _url(
+        prefix, 'blog:category_posts', getattr(category, 'slug', '')
+    )
+    parts.append(
+        f'\n          {pub_date} | {place}<br>\n'
+        '          От автора <a class="text-muted" '
+        f'href="{profile_url}">@{_value(username)}</a> в\n'
+        '          категории '
+        '<a class="text-muted" '
+        f'href="{category_url}">\n'
+        f'  {_value(getattr(category, "title", ""))}\n'
+        '</a>\n'
+        '        </small>\n'
+        '      </h6>\n'
+        '      <p class="card-text">'
+        f'{conditional_escape(truncatewords(post.text, 10))}</p>\n'
+        f'      <a href="{post_url}" class="card-link">'
+        'Читать полный текст</a>\n'
+        f'      <a href="{post_url}" class="card-link text-muted">'
+        f'Комментарии ({_value(post.comment_count)})</a>\n'
+        '      <span class="card-link text-muted">'
+        f'Просмотры: {_value(post.views)}</span>\n'
+        '    </div>\n'
+        '  </div>\n'
+        '</div>'
+    )
+    return ''.join(parts)
+
+
+def render_post_cards(posts):
+    """Карточки постов, каждая в ``<article>``, как в шаблонах ленты."""
+    prefix = get_script_prefix()
+    return mark_safe(''.join(
+        '\n    <article class="mb-5">\n      '
+        + _card(post, prefix)
+        + '\n    </article>\n  '
+        for post in posts
+    ))
@@ -0,0 +1,123 @@
+"""Счётчик просмотров публикаций с отложенной записью.
+
+Запись в базу на каждый просмотр упёрлась бы в единственного писателя
+SQLite. Поэтому ``record_view`` только увеличивает счётчик в памяти
+процесса, а фоновый поток раз в ``VIEW_COUNTS_FLUSH_INTERVAL`` секунд
+вызывает ``flush_views``: накопленное уходит в базу одной транзакцией,
+по одному ``UPDATE ... SET views = views + n`` на каждое значение n.
+При остановке процесса счётчики сбрасываются в базу (atexit), так что
+упавший процесс теряет не больше одного интервала. Прибавление, а не
+запись значения, позволяет нескольким процессам считать независимо.
+"""
+import atexit
+import logging
+import threading
+from collections import Counter, defaultdict
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+
+from blogicum.db import run_write
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Сколько постов в одном UPDATE: предел параметров запроса SQLite.
+FLUSH_BATCH_SIZE = 500
+
+_counts = Counter()
+_lock = threading.Lock()
+_flusher = {'thread': None}
+
+
+def pending_views():
+    """Просмотры, ещё не записанные в базу: {post_id: n}."""
+    with _lock:
+        return dict(_counts)
+
+
+def flush_views():
+    """Записывает накопленные просмотры в базу; возвращает их число."""
+    with _lock:
+        counts = dict(_counts)
+        _counts.clear()
+    if not counts:
+        return 0
+    by_increment = defaultdict(list)
+    for post_id, count in counts.items():
+        by_increment[count].append(post_id)
+
+    def write():
+        for count, post_ids in by_increment.items():
+            for start in range(0, len(post_ids), FLUSH_BATCH_SIZE):
+                Post.objects.filter(
+                    pk__in=post_ids[start:start + FLUSH_BATCH_SIZE]
+                ).update(views=F('views') + count)
+
+    try:
+        run_write(write)
+    except Exception:
+        # Просмотры не пропадают, а ждут следующего сброса.
+        with _lock:
+            _counts.update(counts)
+        raise
+    return sum(counts.values())
+
+
+def _flush_forever(interval):
+    stop = threading.Event()
+    while not stop.wait(interval):
+        close_old_connections()
+        try:
+            flush_views()
+        except Exception:
+            logger.exception('Не удалось записать просмотры')
+
+
+def _start_flusher():
+    interval = settings.VIEW_COUNTS_FLUSH_INTERVAL
+    if not interval or _flusher['thread'] is not None:
+        return
+    with _lock:
+        if _flusher['thread'] is not None:
+            return
+        _flusher['thread'] = threading.Thread(
+            target=_flush_forever, args=(interval,),
+            name='view-counts', daemon=True
+        )
+    _flusher['thread'].start()
+    atexit.register(flush_views)
+
+
+def record_view(post_id):
+    """Засчитывает просмотр публикации."""
+    with _lock:
+        _counts[post_id] += 1
+    _start_flusher()
+
+
+def count_views(view):
+    """Засчитывает просмотр при успешном ответе страницы публикации.
+
+    Ставится снаружи ``shared_page``: просмотр из кэша тоже считается.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, post_id, *args, **kwargs):
+            response = await view(request, post_id, *args, **kwargs)
+            if request.method == 'GET' and response.status_code == 200:
+                record_view(post_id)
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, post_id, *args, **kwargs):
+        response = view(request, post_id, *args, **kwargs)
+        if request.method == 'GET' and response.status_code == 200:
+            record_view(post_id)
+        return response
+    return wrapper
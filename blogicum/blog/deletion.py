@@ -0,0 +1,302 @@
+"""Удаление публикаций и пользователей с большим каскадом по частям.
+
+Каскад Django собирает все зависимые объекты в памяти и удаляет их одной
+транзакцией: для автора с тысячами постов и комментариев это секунды
+блокировки записи SQLite прямо в запросе. ``schedule_deletion`` сразу
+скрывает объект и заводит ``DeletionJob``, а удаляет всё фоновый поток:
+комментарии, затем посты, затем сам объект - пачками по
+``DELETION_BATCH_SIZE``, каждая пачка в своей короткой транзакции
+(``run_write``), так что между ними успевают записать другие.
+
+После каждой пачки задача сохраняет прогресс, сбрасывает теги кэша
+затронутых страниц и отправляет сигнал ``deletion_progress``. Задачи,
+прерванные перезапуском, продолжает ``python manage.py resume_deletions``.
+Если задача упала, объект возвращается в состояние до скрытия
+(``DeletionJob.previous_state``); ``resume_deletions --failed`` снова
+скрывает его и доудаляет.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections, router, transaction
+from django.dispatch import Signal
+
+from blogicum.db import run_write
+
+from .cache import (
+    FEED_TAG, author_tag, category_tag, invalidate_tags_on_commit,
+    location_tag, post_tag
+)
+from .models import Comment, DeletionJob, MonthBucket, Post, month_key
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# Отправляется после каждой пачки и в конце: sender=DeletionJob, job=...
+deletion_progress = Signal()
+
+_worker = {'executor': None}
+_worker_lock = threading.Lock()
+
+
+def _batches(queryset, *fields):
+    """Строки ``fields`` пачками; пачку надо удалить до следующей."""
+    size = settings.DELETION_BATCH_SIZE
+    queryset = queryset.order_by('pk')
+    while True:
+        rows = list(queryset.values_list('pk', *fields)[:size])
+        if not rows:
+            return
+        yield rows
+
+
+def _advance(job, count):
+    job.deleted += count
+    run_write(job.save, update_fields=('deleted', 'updated_at'))
+    deletion_progress.send(sender=DeletionJob, job=job)
+    if settings.DELETION_BATCH_PAUSE:
+        # Даём дорогу записи из запросов.
+        time.sleep(settings.DELETION_BATCH_PAUSE)
+
+
+def _delete_comments(job, queryset):
+    using = router.db_for_write(Comment)
+    for rows in _batches(queryset, 'post_id'):
+        # _raw_delete - один DELETE без сборщика каскада и сигналов. Это
+        # безопасно: на комментарии никто не ссылается, а единственный
+        # обработчик их удаления (signals.invalidate_comment) сбрасывает
+        # тег поста - здесь это делается разом на пачку. Оба условия
+        # проверяет test_deletion.test_comment_raw_delete_is_safe.
+        batch = Comment.objects.filter(pk__in=[pk for pk, _ in rows])
+        run_write(batch._raw_delete, using, using=using)
+        invalidate_tags_on_commit(
+            *{post_tag(post_id) for _, post_id in rows}, using=using
+        )
+        _advance(job, len(rows))
+
+
+def _delete_posts(job, queryset):
+    for rows in _batches(queryset):
+        ids = [pk for pk, in rows]
+        _delete_comments(job, Comment.objects.filter(post_id__in=ids))
+        # Посты удаляются обычным delete(): каскады других моделей и
+        # сигналы blog.signals сбрасывают теги их страниц.
+        run_write(Post.objects.filter(pk__in=ids).delete)
+        _advance(job, len(ids))
+
+
+def _count_post_comments(post_ids, exclude_author=None):
+    size = settings.DELETION_BATCH_SIZE
+    comments = Comment.objects.exclude(author_id=exclude_author)
+    return sum(
+        comments.filter(post_id__in=post_ids[start:start + size]).count()
+        for start in range(0, len(post_ids), size)
+    )
+
+
+def _remaining(job):
+    """Сколько объектов задаче ещё осталось удалить."""
+    if job.target == DeletionJob.POST:
+        return (
+            Comment.objects.filter(post_id=job.object_id).count()
+            + Post.objects.filter(pk=job.object_id).count()
+        )
+    post_ids = list(
+        Post.objects.filter(author_id=job.object_id)
+        .values_list('pk', flat=True)
+    )
+    return (
+        Comment.objects.filter(author_id=job.object_id).count()
+        + _count_post_comments(post_ids, exclude_author=job.object_id)
+        + len(post_ids)
+        + User.objects.filter(pk=job.object_id).count()
+    )
+
+
+def _delete_post(job):
+    _delete_comments(job, Comment.objects.filter(post_id=job.object_id))
+    deleted, _ = run_write(Post.objects.filter(pk=job.object_id).delete)
+    _advance(job, min(deleted, 1))
+
+
+def _delete_user(job):
+    _delete_comments(job, Comment.objects.filter(author_id=job.object_id))
+    _delete_posts(job, Post.objects.filter(author_id=job.object_id))
+    deleted, _ = run_write(User.objects.filter(pk=job.object_id).delete)
+    _advance(job, min(deleted, 1))
+
+
+def run_deletion(job):
+    """Выполняет задачу удаления или продолжает прерванную.
+
+    При ошибке объект возвращается в состояние до скрытия, а повтор
+    задачи скрывает его снова.
+    """
+    if job.status == DeletionJob.FAILED:
+        invalidate_tags_on_commit(*run_write(_rehide, job))
+    job.status = DeletionJob.RUNNING
+    job.error = ''
+    job.total = job.deleted + _remaining(job)
+    run_write(
+        job.save, update_fields=('status', 'error', 'total', 'updated_at')
+    )
+    try:
+        if job.target == DeletionJob.POST:
+            _delete_post(job)
+        else:
+            _delete_user(job)
+    except Exception as exc:
+        logger.exception('Задача удаления %s не выполнена', job.pk)
+        job.status = DeletionJob.FAILED
+        job.error = f'{type(exc).__name__}: {exc}'
+        invalidate_tags_on_commit(*run_write(_restore, job))
+    else:
+        job.status = DeletionJob.DONE
+    run_write(job.save, update_fields=('status', 'error', 'updated_at'))
+    deletion_progress.send(sender=DeletionJob, job=job)
+    return job
+
+
+def _run_in_worker(job_id):
+    try:
+        run_deletion(DeletionJob.objects.get(pk=job_id))
+    finally:
+        # Соединения потока не должны пережить задачу.
+        connections.close_all()
+
+
+def _get_worker():
+    with _worker_lock:
+        if _worker['executor'] is None:
+            _worker['executor'] = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix='deletion'
+            )
+        return _worker['executor']
+
+
+def start_deletion(job):
+    """Запускает задачу в фоне или, без DELETION_IN_BACKGROUND, сразу."""
+    if not settings.DELETION_IN_BACKGROUND:
+        return run_deletion(job)
+    # Поток должен увидеть задачу, поэтому ждём конца транзакции.
+    transaction.on_commit(
+        lambda: _get_worker().submit(_run_in_worker, job.pk)
+    )
+    return job
+
+
+def deleting_post_ids():
+    """Подзапрос: посты, которые уже удаляются в фоне.
+
+    Скрытие переиспользует is_published, поэтому автор видел бы такой
+    пост как снятый админом; его страницы исключают эти посты.
+    """
+    return DeletionJob.objects.filter(
+        target=DeletionJob.POST, status__in=DeletionJob.ACTIVE
+    ).values('object_id')
+
+
+def is_being_deleted(post_id):
+    return deleting_post_ids().filter(object_id=post_id).exists()
+
+
+def _add_post_tags(tags, posts):
+    for slug, location_id in posts.values_list(
+        'category__slug', 'location_id'
+    ).order_by().distinct():
+        if slug:
+            tags.add(category_tag(slug))
+        if location_id:
+            tags.add(location_tag(location_id))
+    return tags
+
+
+def _hide(obj):
+    """Скрывает объект до удаления: из ленты, профиля и страниц поста.
+
+    Возвращает теги кэша и прежнее состояние для ``_restore``.
+    """
+    # update() идёт мимо сигналов: посты вычитаются из архива заранее.
+    if isinstance(obj, Post):
+        posts = Post.objects.filter(pk=obj.pk)
+        tags = {FEED_TAG, post_tag(obj.pk), author_tag(obj.author.username)}
+        state = {}
+    else:
+        # Неактивный пользователь не входит на сайт, а его посты
+        # пропадают из общей ленты.
+        posts = Post.objects.filter(author_id=obj.pk)
+        tags = {FEED_TAG, author_tag(obj.username)}
+        state = {'is_active': obj.is_active}
+        User.objects.filter(pk=obj.pk).update(is_active=False)
+    state['published_posts'] = list(
+        posts.filter(is_published=True).values_list('pk', flat=True)
+    )
+    MonthBucket.objects.forget(posts)
+    posts.update(is_published=False)
+    return _add_post_tags(tags, posts), state
+
+
+def _restore(job):
+    """Возвращает объект, скрытый ``_hide``, как был; отдаёт теги кэша."""
+    state = job.previous_state
+    posts = Post.objects.filter(pk__in=state.get('published_posts', ()))
+    tags = {FEED_TAG, *(post_tag(pk) for pk in posts.values_list(
+        'pk', flat=True
+    ))}
+    usernames = posts.values_list('author__username', flat=True)
+    if job.target == DeletionJob.USER and 'is_active' in state:
+        User.objects.filter(pk=job.object_id).update(
+            is_active=state['is_active']
+        )
+        usernames = User.objects.filter(pk=job.object_id).values_list(
+            'username', flat=True
+        )
+    tags.update(author_tag(name) for name in usernames)
+    posts.update(is_published=True)
+    MonthBucket.objects.shift(Counter(
+        month_key(pub_date)
+        for pub_date in posts.values_list('pub_date', flat=True)
+    ))
+    return _add_post_tags(tags, posts)
+
+
+def _rehide(job):
+    """Снова скрывает объект задачи, возвращённый после ошибки."""
+    model = Post if job.target == DeletionJob.POST else User
+    obj = model.objects.filter(pk=job.object_id).first()
+    if obj is None:
+        return set()
+    tags, job.previous_state = _hide(obj)
+    job.save(update_fields=('previous_state', 'updated_at'))
+    return tags
+
+
+def schedule_deletion(obj):
+    """Скрывает публикацию или пользователя и ставит удаление в очередь.
+
+    Для объекта, который уже удаляется, возвращает его задачу.
+    """
+    target = DeletionJob.POST if isinstance(obj, Post) else DeletionJob.USER
+
+    def create():
+        job = DeletionJob.objects.filter(
+            target=target, object_id=obj.pk, status__in=DeletionJob.ACTIVE
+        ).first()
+        if job is not None:
+            return job, None
+        tags, state = _hide(obj)
+        return DeletionJob.objects.create(
+            target=target, object_id=obj.pk, previous_state=state
+        ), tags
+
+    job, tags = run_write(create)
+    if tags is not None:
+        invalidate_tags_on_commit(*tags)
+        start_deletion(job)
+    return job
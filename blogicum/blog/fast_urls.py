@@ -0,0 +1,93 @@
+"""Быстрый ``reverse`` для маршрутов, которые строятся в циклах шаблонов.
+
+Маршрут с позиционными аргументами один раз проходит через ``reverse``
+с метками вместо аргументов и превращается в строку формата; дальше
+адрес собирается подстановкой. Аргументы проверяются по конвертерам
+маршрута (int, str, slug); всё необычное - именованные аргументы,
+другие конвертеры, неподходящие значения - уходит в обычный ``reverse``
+и ведёт себя так же, включая ``NoReverseMatch``.
+"""
+import re
+from functools import lru_cache
+from urllib.parse import quote
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import (
+    NoReverseMatch, Resolver404, get_script_prefix, resolve, reverse
+)
+from django.urls.resolvers import RFC3986_SUBDELIMS
+
+# Метки одной длины, чтобы ни одна не была частью другой.
+_MARKER = '4815162342{}'
+_MAX_ARGS = 10
+_CONVERTER_RE = re.compile(r'<(?:(?P<converter>[^>:]+):)?[^>]+>')
+_SAFE = RFC3986_SUBDELIMS + '/~:@'
+
+_CHECKS = {
+    'int': lambda value: (
+        isinstance(value, int) and not isinstance(value, bool)
+        and value >= 0
+        or isinstance(value, str) and value.isdigit() and value.isascii()
+    ),
+    'str': lambda value: bool(str(value)) and '/' not in str(value),
+    'slug': lambda value: bool(re.fullmatch(r'[-a-zA-Z0-9_]+', str(value))),
+}
+
+
+@lru_cache(maxsize=None)
+def _compile(name, count):
+    """Строка формата пути и проверки аргументов; None - только reverse."""
+    if count > _MAX_ARGS:
+        return None
+    markers = [_MARKER.format(number) for number in range(count)]
+    try:
+        path = reverse(name, args=markers)[len(get_script_prefix()):]
+        # resolve() ждёт путь без префикса скрипта.
+        route = resolve('/' + path).route
+    except (NoReverseMatch, Resolver404):
+        # Метки не подошли маршруту: пусть reverse объяснит, что не так.
+        # Неудача тоже кэшируется, чтобы не повторять разбор.
+        return None
+    converters = [
+        match.group('converter') or 'str'
+        for match in _CONVERTER_RE.finditer(route)
+    ]
+    if len(converters) != count or any(
+        converter not in _CHECKS for converter in converters
+    ):
+        return None
+    template = path.replace('{', '{{').replace('}', '}}')
+    for number, marker in enumerate(markers):
+        if template.count(marker) != 1:
+            return None
+        template = template.replace(marker, '{%d}' % number)
+    return template, tuple(_CHECKS[converter] for converter in converters)
+
+
+def fast_path(name, *args):
+    """Путь маршрута без префикса скрипта или None, если нужен reverse."""
+    compiled = _compile(name, len(args))
+    if compiled is None:
+        return None
+    template, checks = compiled
+    if not all(check(value) for check, value in zip(checks, args)):
+        return None
+    return template.format(
+        *(quote(str(value), safe=_SAFE) for value in args)
+    )
+
+
+def fast_reverse(name, *args, **kwargs):
+    """Как ``reverse(name, args=args)``, но без разбора маршрутов."""
+    if not kwargs:
+        path = fast_path(name, *args)
+        if path is not None:
+            return get_script_prefix() + path
+    return reverse(name, args=args or None, kwargs=kwargs or None)
+
+
+@receiver(setting_changed)
+def reset_compiled_urls(setting, **kwargs):
+    if setting == 'ROOT_URLCONF':
+        _compile.cache_clear()
@@ -0,0 +1,286 @@
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import setup_databases, teardown_databases
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils import timezone
+
+from blog.benchmark import format_table, percentile, run_threads, wsgi_get
+from blog.models import Comment, Post
+from blog.seeding import seed_blog
+from blogicum.query_budget import reset_view_query_stats, view_query_stats
+
+NAMESPACES = ('blog', 'pages')
+
+# Маршруты только для отправки формы: GET к ним не обращаются.
+POST_ONLY = {'blog:add_comment'}
+
+VISITORS = ('anonymous', 'author')
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет временную базу и нагружает WSGI-приложение в процессе: '
+        'все адреса блога и статических страниц, анонимно и под автором. '
+        'Печатает пропускную способность, задержки и запросы к базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--duration', type=float, default=2.0,
+            help='Секунд нагрузки на каждый адрес и посетителя.'
+        )
+        parser.add_argument(
+            '--view', action='append', dest='views',
+            help='Ограничить прогон маршрутом, например blog:index.'
+        )
+        parser.add_argument(
+            '--no-page-cache', action='store_true',
+            help='Отключить общий кэш страниц.'
+        )
+        parser.add_argument('--save', help='Сохранить результаты в JSON.')
+        parser.add_argument(
+            '--compare', help='Сравнить с сохранённым ранее JSON.'
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = json.loads(Path(options['compare']).read_text())
+            except (OSError, ValueError) as error:
+                raise CommandError(
+                    f'Не удалось прочитать базовый прогон: {error}'
+                )
+
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(**self.overrides(directory, options)):
+                old_config = self.setup_databases(directory)
+                try:
+                    seed_blog(
+                        users=options['users'], posts=options['posts'],
+                        comments=options['comments'], seed=options['seed'],
+                    )
+                    results = self.run(options)
+                finally:
+                    teardown_databases(old_config, verbosity=0)
+
+        report = {
+            'created': timezone.now().isoformat(),
+            'dataset': {
+                key: options[key]
+                for key in ('users', 'posts', 'comments', 'seed')
+            },
+            'concurrency': options['concurrency'],
+            'duration': options['duration'],
+            'page_cache': not options['no_page_cache'],
+            'results': results,
+        }
+        self.print_results(results)
+        if baseline is not None:
+            self.print_comparison(baseline, report)
+        if options['save']:
+            Path(options['save']).write_text(
+                json.dumps(report, ensure_ascii=False, indent=2)
+            )
+            self.stdout.write(f'Результаты сохранены в {options["save"]}')
+
+    def overrides(self, directory, options):
+        caches = {
+            alias: dict(config) for alias, config in settings.CACHES.items()
+        }
+        # Файловый кэш - во временном каталоге, чтобы не задеть рабочий.
+        for config in caches.values():
+            if config['BACKEND'].endswith('FileCache'):
+                config['LOCATION'] = str(Path(directory) / 'cache')
+        overrides = {
+            'DEBUG': False,
+            'ALLOWED_HOSTS': ['localhost'],
+            'CACHES': caches,
+            # Запросы к базе считаются, но предупреждения не нужны.
+            'QUERY_BUDGETS': {},
+        }
+        if options['no_page_cache']:
+            overrides['PAGE_CACHE_TIMEOUT'] = 0
+        return overrides
+
+    def setup_databases(self, directory):
+        """Тестовые базы для всех псевдонимов; SQLite - во временных файлах."""
+        for alias in connections:
+            settings_dict = connections[alias].settings_dict
+            if settings_dict['TEST'].get('MIRROR'):
+                continue
+            if settings_dict['ENGINE'].endswith('sqlite3'):
+                settings_dict['TEST']['NAME'] = str(
+                    Path(directory) / f'{alias}.sqlite3'
+                )
+        return setup_databases(
+            verbosity=0, interactive=False, aliases=set(connections),
+            serialized_aliases=set(),
+        )
+
+    def sample(self):
+        """Самый обсуждаемый пост и данные для аргументов адресов."""
+        top = Comment.objects.values('post_id').annotate(
+            total=Count('id')
+        ).order_by('-total').first()
+        post = Post.objects.select_related('author', 'category').get(
+            pk=top['post_id']
+        ) if top else Post.objects.select_related(
+            'author', 'category'
+        ).first()
+        if post is None:
+            raise CommandError('Нужен хотя бы один пост: увеличьте --posts.')
+        # Автор должен видеть формы правки и своего комментария.
+        comment = Comment.objects.filter(
+            post_id=post.pk, author_id=post.author_id
+        ).first() or Comment.objects.create(
+            post=post, author=post.author, text='Комментарий автора'
+        )
+        # Архив за день поста; месяц и день из двух цифр, как в адресе.
+        published = timezone.localtime(post.pub_date)
+        return post.author, {
+            'post_id': post.pk,
+            'comment_id': comment.pk,
+            'username': post.author.username,
+            'category_slug': post.category.slug,
+            'year': published.year,
+            'month': f'{published.month:02d}',
+            'day': f'{published.day:02d}',
+        }
+
+    def routes(self, sample, views=None):
+        for resolver in get_resolver().url_patterns:
+            if (
+                not isinstance(resolver, URLResolver)
+                or resolver.namespace not in NAMESPACES
+            ):
+                continue
+            for pattern in resolver.url_patterns:
+                name = f'{resolver.namespace}:{pattern.name}'
+                if name in POST_ONLY or (views and name not in views):
+                    continue
+                params = list(pattern.pattern.converters)
+                if not set(params) <= set(sample):
+                    self.stderr.write(
+                        f'{name}: неизвестные аргументы {params}'
+                    )
+                    continue
+                yield name, reverse(
+                    name, kwargs={param: sample[param] for param in params}
+                )
+
+    def login(self, user):
+        client = Client()
+        client.force_login(user)
+        cookie = client.cookies[settings.SESSION_COOKIE_NAME]
+        return {settings.SESSION_COOKIE_NAME: cookie.value}
+
+    def run(self, options):
+        application = get_wsgi_application()
+        author, sample = self.sample()
+        cookies = dict(zip(VISITORS, (None, self.login(author))))
+        results = {}
+        for name, url in self.routes(sample, options['views']):
+            for visitor in VISITORS:
+                results[f'{name} {visitor}'] = self.measure(
+                    application, name, url, cookies[visitor], options
+                )
+        return results
+
+    def measure(self, application, name, url, cookies, options):
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker(stop):
+            own_latencies = []
+            failed = 0
+            while not stop.is_set():
+                started = time.perf_counter()
+                failed += wsgi_get(application, url, cookies) >= 400
+                own_latencies.append(time.perf_counter() - started)
+            connections.close_all()
+            with lock:
+                latencies.extend(own_latencies)
+                errors.append(failed)
+
+        # Прогрев: справочники, кэш страниц и соединение с базой.
+        status = wsgi_get(application, url, cookies)
+        reset_view_query_stats()
+        elapsed = run_threads(
+            [worker] * options['concurrency'], options['duration']
+        )
+        stats = view_query_stats().get(name, {})
+        return {
+            'url': url,
+            'status': status,
+            'requests': len(latencies),
+            'rps': round(len(latencies) / elapsed, 1),
+            **{
+                f'p{q}': round(percentile(latencies, q) * 1000, 2)
+                for q in (50, 95, 99)
+            },
+            'queries': round(
+                stats.get('queries', 0) / max(stats.get('requests', 0), 1), 2
+            ),
+            'errors': sum(errors),
+        }
+
+    def print_results(self, results):
+        self.stdout.write(format_table(
+            ('Маршрут', 'код', 'запросов/с', 'p50, мс', 'p95, мс', 'p99, мс',
+             'запросов к БД', 'ошибок'),
+            [
+                (key, result['status'], result['rps'], result['p50'],
+                 result['p95'], result['p99'], result['queries'],
+                 result['errors'])
+                for key, result in results.items()
+            ],
+        ))
+
+    def print_comparison(self, baseline, report):
+        if baseline.get('dataset') != report['dataset']:
+            self.stdout.write(self.style.WARNING(
+                'Наборы данных прогонов различаются: '
+                f'{baseline.get("dataset")} и {report["dataset"]}'
+            ))
+
+        def change(old, new):
+            if not old:
+                return '-'
+            return f'{(new - old) / old * 100:+.0f}%'
+
+        rows = []
+        for key, result in report['results'].items():
+            old = baseline.get('results', {}).get(key)
+            if old is None:
+                continue
+            rows.append((
+                key,
+                f'{old["rps"]} -> {result["rps"]}',
+                change(old['rps'], result['rps']),
+                f'{old["p95"]} -> {result["p95"]}',
+                change(old['p95'], result['p95']),
+                f'{old["queries"]} -> {result["queries"]}',
+            ))
+        self.stdout.write(f'Сравнение с {baseline.get("created", "?")}:')
+        self.stdout.write(format_table(
+            ('Маршрут', 'запросов/с', 'изменение', 'p95, мс', 'изменение',
+             'запросов к БД'),
+            rows,
+        ))
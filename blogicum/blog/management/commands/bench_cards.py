@@ -0,0 +1,100 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.utils import timezone
+
+from blog.benchmark import format_table, percentile
+from blog.models import Category, Location, Post
+
+User = get_user_model()
+
+INCLUDE_LOOP = (
+    '{% for post in posts %}\n'
+    '    <article class="mb-5">\n'
+    '      {% include "includes/post_card.html" %}\n'
+    '    </article>\n'
+    '  {% endfor %}'
+)
+CARDS_TAG = '{% load post_cards %}{% post_cards posts %}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает отрисовку карточек ленты: include на каждую карточку '
+        'и тег post_cards. Базу не трогает.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cards', type=int, nargs='+', default=[10, 50, 200]
+        )
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        engine = engines['django']
+        variants = (
+            ('include', engine.from_string(INCLUDE_LOOP)),
+            ('post_cards', engine.from_string(CARDS_TAG)),
+        )
+        rows = []
+        for count in options['cards']:
+            posts = self.make_posts(count)
+            timings = {}
+            outputs = {}
+            for name, template in variants:
+                timings[name], outputs[name] = self.measure(
+                    template, posts, options['repeat']
+                )
+            if outputs['include'] != outputs['post_cards']:
+                raise CommandError(
+                    f'Карточки расходятся с post_card.html при {count}.'
+                )
+            include = percentile(timings['include'], 50)
+            cards = percentile(timings['post_cards'], 50)
+            rows.append((
+                count,
+                round(include * 1000, 3),
+                round(cards * 1000, 3),
+                f'{include / cards:.1f}x',
+            ))
+        self.stdout.write(format_table(
+            ('Карточек', 'include, мс', 'post_cards, мс', 'ускорение'),
+            rows,
+        ))
+
+    def measure(self, template, posts, repeat):
+        context = {'posts': posts}
+        output = template.render(context)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            template.render(context)
+            timings.append(time.perf_counter() - started)
+        return timings, output
+
+    def make_posts(self, count):
+        """Несохранённые посты с разными веточками шаблона карточки."""
+        now = timezone.now()
+        category = Category(
+            title='Путешествия', slug='travel', is_published=True
+        )
+        hidden = Category(title='Скрытая', slug='hidden', is_published=False)
+        location = Location(name='Москва', is_published=True)
+        author = User(username='author')
+        posts = []
+        for number in range(count):
+            post = Post(
+                id=number + 1,
+                title=f'Пост номер {number}',
+                text='Длинный текст публикации ' * 20,
+                pub_date=now,
+                author=author,
+                category=hidden if number % 10 == 9 else category,
+                location=location if number % 3 else None,
+                image='post_images/photo.jpg' if number % 4 == 0 else '',
+            )
+            post.comment_count = number
+            posts.append(post)
+        return posts
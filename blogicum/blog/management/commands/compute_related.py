@@ -0,0 +1,48 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from blog.related import compute_related
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает похожие публикации для блока «Читайте также» '
+        '(см. blog.related).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать все посты, а не только изменённые.'
+        )
+        parser.add_argument(
+            '--every', type=float, default=0,
+            help='Повторять раз в столько секунд, пока не остановят.'
+        )
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            started = time.perf_counter()
+            try:
+                count = compute_related(full=full)
+            except Exception:
+                if not options['every']:
+                    raise
+                logger.exception('Не удалось пересчитать похожие посты')
+            else:
+                self.stdout.write(
+                    f'Похожие посты: пересчитано {count} за '
+                    f'{time.perf_counter() - started:.2f} с'
+                )
+                # Полный пересчёт нужен один раз, дальше - изменения.
+                full = False
+            if not options['every']:
+                return
+            close_old_connections()
+            time.sleep(options['every'])
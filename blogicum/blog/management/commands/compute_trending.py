@@ -0,0 +1,41 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from blog.trending import compute_trending
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает популярные публикации сайта и категорий '
+        '(см. blog.trending).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--every', type=float, default=0,
+            help='Повторять раз в столько секунд, пока не остановят.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            try:
+                count = compute_trending()
+            except Exception:
+                if not options['every']:
+                    raise
+                logger.exception('Не удалось пересчитать популярное')
+            else:
+                self.stdout.write(
+                    f'Популярное: {count} записей за '
+                    f'{time.perf_counter() - started:.2f} с'
+                )
+            if not options['every']:
+                return
+            close_old_connections()
+            time.sleep(options['every'])
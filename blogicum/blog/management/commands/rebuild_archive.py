@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from blog.cache import FEED_TAG, invalidate_tags_on_commit
+from blog.models import MonthBucket
+from blogicum.db import run_write
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики месяцев архива по таблице постов '
+        '(после массовых правок мимо сигналов).'
+    )
+
+    def handle(self, *args, **options):
+        count = run_write(MonthBucket.objects.rebuild)
+        invalidate_tags_on_commit(FEED_TAG)
+        self.stdout.write(f'Архив: {count} месяцев')
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from blog.deletion import deletion_progress, run_deletion
+from blog.models import DeletionJob
+
+
+class Command(BaseCommand):
+    help = (
+        'Продолжает задачи удаления, прерванные перезапуском сервера '
+        '(см. blog.deletion).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--failed', action='store_true',
+            help='Повторить и задачи, завершившиеся ошибкой.'
+        )
+
+    def handle(self, *args, **options):
+        statuses = list(DeletionJob.ACTIVE)
+        if options['failed']:
+            statuses.append(DeletionJob.FAILED)
+        jobs = list(DeletionJob.objects.filter(status__in=statuses))
+        if not jobs:
+            self.stdout.write('Незавершённых задач удаления нет.')
+            return
+
+        def report(sender, job, **kwargs):
+            self.stdout.write(
+                f'\r{job}: {job.deleted}/{job.total}', ending=''
+            )
+
+        deletion_progress.connect(report, dispatch_uid='resume_deletions')
+        try:
+            for job in jobs:
+                run_deletion(job)
+                self.stdout.write('')
+        finally:
+            deletion_progress.disconnect(dispatch_uid='resume_deletions')
+        failed = [job for job in jobs if job.status == DeletionJob.FAILED]
+        for job in failed:
+            self.stderr.write(f'{job}: {job.error}')
+        self.stdout.write(
+            f'Завершено задач: {len(jobs) - len(failed)} из {len(jobs)}.'
+        )
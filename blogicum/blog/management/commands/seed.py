@@ -0,0 +1,95 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.seeding import PASSWORD, seed_blog
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу синтетическими пользователями, категориями, '
+        'местами, постами и комментариями для нагрузочных тестов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--locations', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=1000000)
+        parser.add_argument(
+            '--scale', type=float, default=1.0,
+            help='Множитель для количества пользователей, постов и '
+            'комментариев.'
+        )
+        parser.add_argument(
+            '--images', type=int, default=0,
+            help='Сколько разных картинок создать для постов.'
+        )
+        parser.add_argument(
+            '--image-share', type=float, default=0.3,
+            help='Доля постов с картинкой.'
+        )
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Показатель распределения Ципфа комментариев по постам.'
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределены даты публикаций.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='Префикс имён пользователей и адресов категорий.'
+        )
+
+    def handle(self, *args, **options):
+        scale = options['scale']
+        counts = {
+            name: round(options[name] * scale)
+            for name in ('users', 'posts', 'comments')
+        }
+        if counts['posts'] and not (counts['users'] and options['categories']):
+            raise CommandError('Для постов нужны пользователи и категории.')
+        if User.objects.filter(
+            username__startswith=f'{options["prefix"]}-user'
+        ).exists():
+            raise CommandError(
+                f'Данные с префиксом {options["prefix"]!r} уже есть: '
+                'укажите другой --prefix.'
+            )
+
+        started = time.perf_counter()
+
+        def progress(name, count):
+            self.stdout.write(
+                f'{name}: {count} за {time.perf_counter() - started:.1f} с'
+            )
+
+        summary = seed_blog(
+            categories=options['categories'],
+            locations=options['locations'],
+            images=options['images'],
+            image_share=options['image_share'],
+            zipf=options['zipf'],
+            days=options['days'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            prefix=options['prefix'],
+            progress=progress,
+            **counts,
+        )
+        total = sum(
+            count for name, count in summary.items() if name != 'images'
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано записей: {total} за {elapsed:.1f} с '
+            f'({total / max(elapsed, 1e-9):.0f} в секунду). '
+            f'Пароль пользователей: {PASSWORD}'
+        ))
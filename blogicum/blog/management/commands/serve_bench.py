@@ -0,0 +1,171 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.test import override_settings
+from django.urls import reverse
+
+from blog.benchmark import (
+    asgi_get, format_table, percentile, run_threads, wsgi_get
+)
+from blog.models import Post
+
+DEPLOYMENTS = ('wsgi', 'asgi')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность и хвостовые задержки страниц '
+        'чтения под WSGI (потоки) и ASGI (асинхронные представления).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--duration', type=float, default=10.0)
+        parser.add_argument(
+            '--url', action='append', dest='urls',
+            help='Адрес для нагрузки; по умолчанию - страницы чтения.'
+        )
+        parser.add_argument(
+            '--no-page-cache', action='store_true',
+            help='Отключить общий кэш страниц.'
+        )
+        # Служебный: один прогон в отдельном процессе.
+        parser.add_argument('--deployment', choices=DEPLOYMENTS)
+
+    def handle(self, *args, **options):
+        if options['deployment']:
+            self.stdout.write(json.dumps(self.run_deployment(options)))
+            return
+        options['urls'] = options['urls'] or self.default_urls()
+        rows = []
+        for deployment in DEPLOYMENTS:
+            result = self.spawn(deployment, options)
+            rows.append((
+                deployment.upper(),
+                round(result['requests'] / result['elapsed']),
+                *(
+                    round(percentile(result['latencies'], q) * 1000, 1)
+                    for q in (50, 95, 99)
+                ),
+                result['errors'],
+            ))
+        self.stdout.write('Адреса: ' + ', '.join(options['urls']))
+        self.stdout.write(format_table(
+            ('Развёртывание', 'запросов/с', 'p50, мс', 'p95, мс', 'p99, мс',
+             'ошибок'),
+            rows,
+        ))
+
+    def default_urls(self):
+        urls = [reverse('blog:index'), reverse('pages:about')]
+        post = Post.objects.filter(
+            is_published=True, category__isnull=False
+        ).select_related('author', 'category').first()
+        if post is not None:
+            urls += [
+                reverse('blog:post_detail', args=[post.pk]),
+                reverse('blog:category_posts', args=[post.category.slug]),
+                reverse('blog:profile', args=[post.author.username]),
+            ]
+        return urls
+
+    def spawn(self, deployment, options):
+        # URLconf выбирает представления при импорте, поэтому каждое
+        # развёртывание - в своём процессе.
+        command = [
+            sys.executable, '-m', 'django', 'serve_bench',
+            '--deployment', deployment,
+            '--concurrency', str(options['concurrency']),
+            '--duration', str(options['duration']),
+        ]
+        for url in options['urls']:
+            command += ['--url', url]
+        if options['no_page_cache']:
+            command.append('--no-page-cache')
+        env = {
+            **os.environ,
+            'BLOGICUM_ASYNC_VIEWS': '1' if deployment == 'asgi' else '0',
+        }
+        completed = subprocess.run(
+            command, env=env, cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        )
+        return json.loads(completed.stdout.splitlines()[-1])
+
+    def run_deployment(self, options):
+        overrides = {'DEBUG': False, 'ALLOWED_HOSTS': ['localhost']}
+        if options['no_page_cache']:
+            overrides['PAGE_CACHE_TIMEOUT'] = 0
+        run = self.run_wsgi if options['deployment'] == 'wsgi' else (
+            self.run_asgi
+        )
+        with override_settings(**overrides):
+            latencies, errors, elapsed = run(
+                options['urls'], options['concurrency'], options['duration']
+            )
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'elapsed': elapsed,
+            'latencies': latencies,
+        }
+
+    def run_wsgi(self, urls, concurrency, duration):
+        application = get_wsgi_application()
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker(number):
+            def run(stop):
+                own_latencies = []
+                failed = 0
+                while not stop.is_set():
+                    url = urls[(number + len(own_latencies)) % len(urls)]
+                    started = time.perf_counter()
+                    failed += wsgi_get(application, url) != 200
+                    own_latencies.append(time.perf_counter() - started)
+                with lock:
+                    latencies.extend(own_latencies)
+                    errors.append(failed)
+            return run
+
+        elapsed = run_threads(
+            [worker(n) for n in range(concurrency)], duration
+        )
+        return latencies, sum(errors), elapsed
+
+    def run_asgi(self, urls, concurrency, duration):
+        application = get_asgi_application()
+        latencies = []
+        errors = []
+
+        async def worker(number, deadline):
+            failed = 0
+            loop = asyncio.get_running_loop()
+            while loop.time() < deadline:
+                url = urls[(number + len(latencies)) % len(urls)]
+                started = time.perf_counter()
+                failed += await asgi_get(application, url) != 200
+                latencies.append(time.perf_counter() - started)
+            errors.append(failed)
+
+        async def main():
+            deadline = asyncio.get_running_loop().time() + duration
+            started = time.perf_counter()
+            await asyncio.gather(
+                *(worker(n, deadline) for n in range(concurrency))
+            )
+            return time.perf_counter() - started
+
+        elapsed = asyncio.run(main())
+        return latencies, sum(errors), elapsed
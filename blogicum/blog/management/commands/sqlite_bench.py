@@ -0,0 +1,123 @@
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blog.benchmark import format_table, run_threads
+from blogicum.db import apply_sqlite_pragmas
+
+ROLLBACK_PRAGMAS = {'journal_mode': 'delete', 'synchronous': 'full'}
+
+SCHEMA = '''
+CREATE TABLE post (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title VARCHAR(256) NOT NULL,
+    text TEXT NOT NULL,
+    pub_date DATETIME NOT NULL
+);
+CREATE INDEX post_pub_date ON post (pub_date);
+'''
+FEED_SQL = 'SELECT id, title, text FROM post ORDER BY pub_date DESC LIMIT 10'
+INSERT_SQL = 'INSERT INTO post (title, text, pub_date) VALUES (?, ?, ?)'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite на чтение и запись '
+        'с журналом отката и с профилем SQLITE_PRAGMAS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--duration', type=float, default=5.0)
+        parser.add_argument('--rows', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        scenarios = (
+            ('журнал отката, новое соединение', ROLLBACK_PRAGMAS, False),
+            ('SQLITE_PRAGMAS, новое соединение', settings.SQLITE_PRAGMAS,
+             False),
+            ('SQLITE_PRAGMAS, постоянное соединение',
+             settings.SQLITE_PRAGMAS, True),
+        )
+        rows = []
+        with tempfile.TemporaryDirectory() as directory:
+            for number, (name, pragmas, persistent) in enumerate(scenarios):
+                path = Path(directory) / f'bench{number}.sqlite3'
+                self.prepare(path, pragmas, options['rows'])
+                result = self.run_scenario(path, pragmas, persistent, options)
+                rows.append((name, *result))
+        self.stdout.write(format_table(
+            ('Профиль', 'чтений/с', 'записей/с', 'ошибок блокировки'), rows
+        ))
+
+    def connect(self, path, pragmas):
+        # timeout=0: ждать блокировку разрешено только через busy_timeout.
+        connection = sqlite3.connect(
+            path, timeout=0, isolation_level=None, check_same_thread=False
+        )
+        apply_sqlite_pragmas(connection, pragmas)
+        return connection
+
+    def prepare(self, path, pragmas, count):
+        connection = self.connect(path, pragmas)
+        connection.executescript(SCHEMA)
+        connection.execute('BEGIN')
+        connection.executemany(INSERT_SQL, (
+            (f'Пост {n}', 'Текст ' * 50, f'2024-01-01 00:00:{n % 60:02d}')
+            for n in range(count)
+        ))
+        connection.execute('COMMIT')
+        connection.close()
+
+    def run_scenario(self, path, pragmas, persistent, options):
+        counters = {'reads': 0, 'writes': 0, 'locked': 0}
+        lock = threading.Lock()
+
+        def worker(operation):
+            def run(stop):
+                done = locked = 0
+                connection = None
+                while not stop.is_set():
+                    try:
+                        if connection is None:
+                            connection = self.connect(path, pragmas)
+                        operation(connection)
+                        done += 1
+                    except sqlite3.OperationalError:
+                        locked += 1
+                    finally:
+                        if not persistent and connection is not None:
+                            connection.close()
+                            connection = None
+                if connection is not None:
+                    connection.close()
+                key = 'reads' if operation is read else 'writes'
+                with lock:
+                    counters[key] += done
+                    counters['locked'] += locked
+            return run
+
+        def read(connection):
+            connection.execute(FEED_SQL).fetchall()
+
+        def write(connection):
+            connection.execute(
+                INSERT_SQL, ('Новый пост', 'Текст', time.strftime('%F %T'))
+            )
+
+        targets = (
+            [worker(read)] * options['readers']
+            + [worker(write)] * options['writers']
+        )
+        elapsed = run_threads(targets, options['duration'])
+        return (
+            round(counters['reads'] / elapsed),
+            round(counters['writes'] / elapsed),
+            counters['locked'],
+        )
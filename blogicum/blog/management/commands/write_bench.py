@@ -0,0 +1,114 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import override_settings
+
+from blog.benchmark import format_table, percentile, run_threads
+from blog.models import Comment
+from blogicum.db import (
+    DatabaseBusy, reset_write_stats, run_write, write_stats
+)
+
+ALIAS = 'write_bench'
+
+# Режим -> настройки run_write; 'без повторов' - как было до очереди.
+MODES = (
+    ('без повторов', {'DB_WRITE_MODE': 'retry', 'DB_WRITE_RETRIES': 0}),
+    ('повтор с паузой', {'DB_WRITE_MODE': 'retry'}),
+    ('очередь записи', {'DB_WRITE_MODE': 'queue'}),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает запись комментариев множеством параллельных писателей '
+        'и сравнивает режимы blogicum.db.run_write.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=50)
+        parser.add_argument('--duration', type=float, default=5.0)
+        parser.add_argument(
+            '--busy-timeout', type=int, default=100,
+            help='PRAGMA busy_timeout в миллисекундах.'
+        )
+
+    def handle(self, *args, **options):
+        pragmas = {
+            **settings.SQLITE_PRAGMAS,
+            'busy_timeout': options['busy_timeout'],
+        }
+        rows = []
+        with tempfile.TemporaryDirectory() as directory:
+            for number, (name, overrides) in enumerate(MODES):
+                path = Path(directory) / f'bench{number}.sqlite3'
+                with override_settings(SQLITE_PRAGMAS=pragmas, **overrides):
+                    self.add_database(path)
+                    try:
+                        rows.append((name, *self.run_mode(options)))
+                    finally:
+                        self.remove_database()
+        self.stdout.write(format_table(
+            ('Режим', 'записей/с', 'отказов', 'p95, мс', 'ожидание ср., мс',
+             'ожидание макс., мс'),
+            rows,
+        ))
+
+    def add_database(self, path):
+        config = {**settings.DATABASES['default'], 'NAME': str(path)}
+        config.pop('TEST', None)
+        connections.settings[ALIAS] = connections.configure_settings(
+            {'default': config}
+        )['default']
+        with connections[ALIAS].schema_editor() as editor:
+            editor.create_model(Comment)
+
+    def remove_database(self):
+        connections[ALIAS].close()
+        del connections[ALIAS]
+        del connections.settings[ALIAS]
+
+    def run_mode(self, options):
+        reset_write_stats()
+        latencies = []
+        failures = []
+        lock = threading.Lock()
+
+        def writer(number):
+            def run(stop):
+                own_latencies = []
+                failed = 0
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    try:
+                        run_write(
+                            Comment.objects.using(ALIAS).create,
+                            text=f'Комментарий {number}', post_id=1,
+                            author_id=number, using=ALIAS,
+                        )
+                        own_latencies.append(time.perf_counter() - started)
+                    except DatabaseBusy:
+                        failed += 1
+                connections[ALIAS].close()
+                with lock:
+                    latencies.extend(own_latencies)
+                    failures.append(failed)
+            return run
+
+        elapsed = run_threads(
+            [writer(n) for n in range(options['writers'])],
+            options['duration'],
+        )
+        stats = write_stats()
+        return (
+            round(len(latencies) / elapsed),
+            sum(failures),
+            round(percentile(latencies, 95) * 1000),
+            round(stats['avg_wait'] * 1000, 1),
+            round(stats['max_wait'] * 1000),
+        )
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-19 11:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_comment_without_db_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target', models.CharField(choices=[('post', 'публикация'), ('user', 'пользователь')], max_length=16, verbose_name='Что удаляется')),
+                ('object_id', models.PositiveIntegerField(verbose_name='Идентификатор')),
+                ('status', models.CharField(choices=[('pending', 'ожидает'), ('running', 'выполняется'), ('done', 'завершено'), ('failed', 'ошибка')], db_index=True, default='pending', max_length=16, verbose_name='Состояние')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Всего объектов')),
+                ('deleted', models.PositiveIntegerField(default=0, verbose_name='Удалено')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Добавлено')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'задача удаления',
+                'verbose_name_plural': 'Задачи удаления',
+                'ordering': ('created_at',),
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-19 11:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_post_views'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField(verbose_name='Место')),
+                ('score', models.FloatField(verbose_name='Оценка')),
+                ('computed_at', models.DateTimeField(verbose_name='Рассчитано')),
+                ('category', models.ForeignKey(blank=True, help_text='Пусто - популярное по всему сайту.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='trending', to='blog.category', verbose_name='Категория')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trending', to='blog.post', verbose_name='Публикация')),
+            ],
+            options={
+                'verbose_name': 'популярная публикация',
+                'verbose_name_plural': 'Популярные публикации',
+                'ordering': ('category', 'rank'),
+                'indexes': [models.Index(fields=['category', 'rank'], name='trending_category_rank')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-19 11:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_trendingpost'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Изменено'),
+        ),
+        migrations.CreateModel(
+            name='RelatedPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField(verbose_name='Место')),
+                ('score', models.FloatField(verbose_name='Сходство')),
+                ('computed_at', models.DateTimeField(verbose_name='Рассчитано')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related', to='blog.post', verbose_name='Публикация')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='blog.post', verbose_name='Похожая публикация')),
+            ],
+            options={
+                'verbose_name': 'похожая публикация',
+                'verbose_name_plural': 'Похожие публикации',
+                'ordering': ('post', 'rank'),
+                'indexes': [models.Index(fields=['post', 'rank'], name='related_post_rank'), models.Index(fields=['computed_at'], name='related_computed_at')],
+            },
+        ),
+    ]
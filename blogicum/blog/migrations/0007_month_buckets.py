@@ -0,0 +1,59 @@
+# Generated by Django 5.2 on 2026-10-19 11:24
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+
+
+def fill_month_buckets(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    MonthBucket = apps.get_model('blog', 'MonthBucket')
+    using = schema_editor.connection.alias
+    rows = Post.objects.using(using).filter(is_published=True).annotate(
+        month_start=TruncMonth('pub_date')
+    ).values('month_start').annotate(total=Count('id')).order_by()
+    MonthBucket.objects.using(using).bulk_create(
+        MonthBucket(
+            year=row['month_start'].year,
+            month=row['month_start'].month,
+            count=row['total'],
+        )
+        for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_related_posts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField(verbose_name='Год')),
+                ('month', models.PositiveSmallIntegerField(verbose_name='Месяц')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Публикаций')),
+            ],
+            options={
+                'verbose_name': 'месяц архива',
+                'verbose_name_plural': 'Месяцы архива',
+                'ordering': ('-year', '-month'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['pub_date', 'id'], name='post_pub_date_id'),
+        ),
+        migrations.AddConstraint(
+            model_name='monthbucket',
+            constraint=models.UniqueConstraint(fields=('year', 'month'), name='month_bucket_unique'),
+        ),
+        migrations.RunPython(
+            fill_month_buckets, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-19 11:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+from blogicum.routers import foreign_key_options
+
+
+class Migration(migrations.Migration):
+    # Ограничения внешних ключей комментариев возвращаются, если таблица
+    # в основной базе, и остаются снятыми при отдельной базе комментариев.
+
+    dependencies = [
+        ('blog', '0007_month_buckets'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='author',
+            field=models.ForeignKey(to=settings.AUTH_USER_MODEL, verbose_name='Автор комментария', **foreign_key_options('blog.comment')),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='post',
+            field=models.ForeignKey(related_name='comments', to='blog.post', verbose_name='Публикация', **foreign_key_options('blog.comment')),
+        ),
+    ]
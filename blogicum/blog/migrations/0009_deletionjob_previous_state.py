@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_comment_foreign_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deletionjob',
+            name='previous_state',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Состояние до скрытия'),
+        ),
+    ]
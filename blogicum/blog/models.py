@@ -1,6 +1,14 @@
-from django.db import models
+from collections import Counter
+from datetime import date
+
+from django.db import IntegrityError, models, router, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest, TruncMonth
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+
+from blogicum.routers import foreign_key_options
+
 User = get_user_model()
 
 
@@ -89,34 +97,73 @@ class Post(models.Model):
         auto_now_add=True,
         verbose_name='Добавлено'
     )
+    # Какие посты пересчитать в blog.related.
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Изменено'
+    )
+    # Пишется пачками из blog.counters, а не на каждый просмотр.
+    views = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Просмотры'
+    )
 
     @property
     def comment_count(self):
         """Количество опубликованных комментариев"""
-        return self.comments.filter(is_published=True).count()
+        # Для карточек ленты количество подставляет attach_comment_counts
+        # одним запросом на страницу.
+        if not hasattr(self, '_comment_count'):
+            self._comment_count = self.comments.filter(
+                is_published=True
+            ).count()
+        return self._comment_count
+
+    @comment_count.setter
+    def comment_count(self, value):
+        self._comment_count = value
 
     def save(self, *args, **kwargs):
         if self.pub_date <= timezone.now() and self.is_published is True:
             self.is_published = True
         self.full_clean()
+        if (
+            not self._state.adding and self.pk is not None
+            and kwargs.get('update_fields') is None
+        ):
+            # Просмотры копятся в blog.counters и прибавляются к строке в
+            # базе; сохранение формы не должно затирать их старым значением.
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'views'
+            ]
         super().save(*args, **kwargs)
 
     class Meta:
         verbose_name = 'публикация'
         verbose_name_plural = 'Публикации'
         ordering = ('-pub_date',)
+        indexes = (
+            # Диапазоны дат архива и keyset-пагинация по (pub_date, id).
+            models.Index(fields=('pub_date', 'id'), name='post_pub_date_id'),
+        )
 
     def __str__(self):
         return self.title
 
 
 class Comment(models.Model):
+    # Комментарии можно вынести в отдельную базу (MODEL_DATABASES), а
+    # внешние ключи между базами невозможны. Тогда ограничений в БД нет, а
+    # удаление комментариев вместе с постом или автором делают сигналы
+    # (blog.signals.delete_post_comments).
     id = models.AutoField(primary_key=True)
     text = models.TextField(verbose_name='Текст')
     author = models.ForeignKey(
         User,
-        on_delete=models.CASCADE,
-        verbose_name='Автор комментария'
+        verbose_name='Автор комментария',
+        **foreign_key_options('blog.comment')
     )
     created_at = models.DateTimeField(
         auto_now_add=True,
@@ -129,9 +176,9 @@ class Comment(models.Model):
     )
     post = models.ForeignKey(
         Post,
-        on_delete=models.CASCADE,
         related_name='comments',
         verbose_name='Публикация',
+        **foreign_key_options('blog.comment')
     )
 
     class Meta:
@@ -141,3 +188,228 @@ class Comment(models.Model):
 
     def __str__(self):
         return f'Комментарий {self.id} к посту {self.post_id}'
+
+
+class DeletionJob(models.Model):
+    """Удаление публикации или пользователя по частям (blog.deletion)."""
+
+    POST = 'post'
+    USER = 'user'
+    TARGETS = (
+        (POST, 'публикация'),
+        (USER, 'пользователь'),
+    )
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'ожидает'),
+        (RUNNING, 'выполняется'),
+        (DONE, 'завершено'),
+        (FAILED, 'ошибка'),
+    )
+    ACTIVE = (PENDING, RUNNING)
+
+    target = models.CharField(
+        max_length=16, choices=TARGETS, verbose_name='Что удаляется'
+    )
+    object_id = models.PositiveIntegerField(verbose_name='Идентификатор')
+    status = models.CharField(
+        max_length=16,
+        choices=STATUSES,
+        default=PENDING,
+        db_index=True,
+        verbose_name='Состояние'
+    )
+    total = models.PositiveIntegerField(
+        default=0, verbose_name='Всего объектов'
+    )
+    deleted = models.PositiveIntegerField(default=0, verbose_name='Удалено')
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    # Что было до скрытия: при ошибке задача возвращает объект как был.
+    previous_state = models.JSONField(
+        default=dict, blank=True, verbose_name='Состояние до скрытия'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Добавлено'
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлено')
+
+    class Meta:
+        verbose_name = 'задача удаления'
+        verbose_name_plural = 'Задачи удаления'
+        ordering = ('created_at',)
+
+    @property
+    def progress(self):
+        """Доля удалённых объектов, от 0 до 1."""
+        if self.status == self.DONE:
+            return 1.0
+        return self.deleted / self.total if self.total else 0.0
+
+    def __str__(self):
+        return f'Удаление {self.target} {self.object_id}: {self.status}'
+
+
+class TrendingPost(models.Model):
+    """Место публикации в популярном; заполняет blog.trending."""
+
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='trending',
+        verbose_name='Категория',
+        help_text='Пусто - популярное по всему сайту.'
+    )
+    rank = models.PositiveIntegerField(verbose_name='Место')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='trending',
+        verbose_name='Публикация'
+    )
+    score = models.FloatField(verbose_name='Оценка')
+    computed_at = models.DateTimeField(verbose_name='Рассчитано')
+
+    class Meta:
+        verbose_name = 'популярная публикация'
+        verbose_name_plural = 'Популярные публикации'
+        ordering = ('category', 'rank')
+        indexes = (
+            models.Index(
+                fields=('category', 'rank'), name='trending_category_rank'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.rank}. {self.post_id}'
+
+
+class RelatedPost(models.Model):
+    """Похожая публикация для блока «Читайте также»; см. blog.related."""
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='related',
+        verbose_name='Публикация'
+    )
+    related = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожая публикация'
+    )
+    rank = models.PositiveIntegerField(verbose_name='Место')
+    score = models.FloatField(verbose_name='Сходство')
+    computed_at = models.DateTimeField(verbose_name='Рассчитано')
+
+    class Meta:
+        verbose_name = 'похожая публикация'
+        verbose_name_plural = 'Похожие публикации'
+        ordering = ('post', 'rank')
+        indexes = (
+            models.Index(fields=('post', 'rank'), name='related_post_rank'),
+            models.Index(fields=('computed_at',), name='related_computed_at'),
+        )
+
+    def __str__(self):
+        return f'{self.post_id} -> {self.related_id}'
+
+
+def month_key(moment):
+    """(год, месяц) даты в текущем часовом поясе."""
+    if timezone.is_aware(moment):
+        moment = timezone.localtime(moment)
+    return moment.year, moment.month
+
+
+class MonthBucketManager(models.Manager):
+
+    def shift(self, changes):
+        """Прибавляет ``{(год, месяц): прирост}`` к счётчикам месяцев."""
+        using = router.db_for_write(self.model)
+        for (year, month), delta in changes.items():
+            if not delta:
+                continue
+            updated = self.filter(year=year, month=month).update(
+                count=Greatest(F('count') + delta, 0)
+            )
+            if updated or delta < 0:
+                continue
+            try:
+                with transaction.atomic(using=using):
+                    self.create(year=year, month=month, count=delta)
+            except IntegrityError:
+                # Месяц успели создать параллельно.
+                self.filter(year=year, month=month).update(
+                    count=F('count') + delta
+                )
+
+    def forget(self, posts):
+        """Вычитает опубликованные посты ``posts`` перед их скрытием."""
+        months = Counter(
+            month_key(pub_date) for pub_date in posts.filter(
+                is_published=True
+            ).values_list('pub_date', flat=True).order_by()
+        )
+        self.shift({key: -count for key, count in months.items()})
+
+    def rebuild(self):
+        """Пересчитывает все месяцы по таблице постов."""
+        rows = Post.objects.filter(is_published=True).annotate(
+            month_start=TruncMonth('pub_date')
+        ).values('month_start').annotate(total=Count('id')).order_by()
+        buckets = [
+            self.model(
+                year=row['month_start'].year,
+                month=row['month_start'].month,
+                count=row['total'],
+            )
+            for row in rows
+        ]
+        with transaction.atomic(using=router.db_for_write(self.model)):
+            self.all().delete()
+            self.bulk_create(buckets)
+        return len(buckets)
+
+
+class MonthBucket(models.Model):
+    """Число опубликованных постов за месяц для архива.
+
+    Ведётся сигналами blog.signals при публикации, снятии и удалении
+    постов, так что боковой панели архива не нужен GROUP BY по всей
+    таблице. Отложенные посты и видимость категорий, мест и авторов не
+    учитываются: их вычитает боковая панель (blog.archive).
+    """
+
+    year = models.PositiveSmallIntegerField(verbose_name='Год')
+    month = models.PositiveSmallIntegerField(verbose_name='Месяц')
+    count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Публикаций'
+    )
+
+    objects = MonthBucketManager()
+
+    class Meta:
+        verbose_name = 'месяц архива'
+        verbose_name_plural = 'Месяцы архива'
+        ordering = ('-year', '-month')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('year', 'month'), name='month_bucket_unique'
+            ),
+        )
+
+    @property
+    def start(self):
+        """Первый день месяца, для подписи в шаблоне."""
+        return date(self.year, self.month, 1)
+
+    def __str__(self):
+        return f'{self.year}-{self.month:02d}: {self.count}'
@@ -0,0 +1,233 @@
+"""Общий кэш страниц с «дырками» под персональные фрагменты.
+
+Страница рендерится один раз без данных пользователя: вместо шапки с
+именем, кнопок автора и формы комментария с CSRF-токеном в неё попадают
+метки вида ``<!--personal:post_actions:42:7-->``. Готовое тело кладётся в
+кэш и отдаётся всем читателям, а метки заполняются дешёвым проходом
+подстановки под конкретного пользователя.
+
+Недавно писавший пользователь (cookie ``REPLICA_STICKY_COOKIE``) читает с
+основной базы мимо общего кэша, а страница, прочитанная с реплики вскоре
+после сброса тегов, в кэш не попадает: реплика могла ещё не получить
+запись, из-за которой теги сбросили.
+"""
+import hashlib
+import re
+from collections import namedtuple
+from functools import partial, wraps
+from urllib.parse import urlencode
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.template import engines
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .cache import get_or_compute, invalidated_within
+
+Fragment = namedtuple('Fragment', ('template', 'args', 'extra_context'))
+
+
+def _comment_form_context():
+    from .forms import CommentForm
+    return {'form': CommentForm()}
+
+
+FRAGMENTS = {
+    'header_user': Fragment(
+        'includes/personal/header_user.html', (), None
+    ),
+    'post_actions': Fragment(
+        'includes/personal/post_actions.html',
+        ('post_id', 'author_id'), None
+    ),
+    'comment_form': Fragment(
+        'includes/personal/comment_form.html',
+        ('post_id',), _comment_form_context
+    ),
+    'comment_actions': Fragment(
+        'includes/personal/comment_actions.html',
+        ('post_id', 'comment_id', 'author_id'), None
+    ),
+    'profile_actions': Fragment(
+        'includes/personal/profile_actions.html', ('profile_id',), None
+    ),
+}
+
+HOLE_RE = re.compile(r'<!--personal:(\w+)((?::\d+)*)-->')
+
+
+def punch_hole(name, args):
+    """Метка на месте персонального фрагмента."""
+    return mark_safe(
+        '<!--personal:{}-->'.format(':'.join((name, *map(str, args))))
+    )
+
+
+def render_inline(name, args, context):
+    """Рендерит фрагмент прямо в контексте родительского шаблона."""
+    fragment = FRAGMENTS[name]
+    # Тег работает внутри шаблона Django, даже если фрагмент есть и в
+    # Jinja2 (TEMPLATE_ENGINE).
+    template = engines['django'].get_template(fragment.template).template
+    with context.push(**dict(zip(fragment.args, args))):
+        return template.render(context)
+
+
+def fill_holes(request, content):
+    """Заполняет метки в закэшированном теле для текущего пользователя."""
+    rendered = {}
+
+    def substitute(match):
+        key = match.group(0)
+        if key not in rendered:
+            name = match.group(1)
+            fragment = FRAGMENTS[name]
+            args = [int(arg) for arg in match.group(2).split(':')[1:]]
+            context = dict(zip(fragment.args, args))
+            if fragment.extra_context:
+                context.update(fragment.extra_context())
+            rendered[key] = render_to_string(
+                fragment.template, context, request=request
+            )
+        return rendered[key]
+
+    return HOLE_RE.sub(substitute, content)
+
+
+def tag_page(request, *tags):
+    """Теги кэша страницы: она устареет при сбросе любого из них."""
+    if not hasattr(request, 'cache_tags'):
+        request.cache_tags = set()
+    request.cache_tags.update(tags)
+
+
+def skip_page_cache(request):
+    """Помечает ответ как персональный: его нельзя класть в общий кэш."""
+    request.skip_page_cache = True
+
+
+# Параметры запроса, которые читают страницы с общим кэшем: номер
+# страницы и курсор архива. Остальные на ответ не влияют и в ключ не
+# входят, иначе ``?x=1``, ``?x=2``... плодили бы записи без конца.
+PAGE_QUERY_PARAMS = ('page', 'before')
+
+
+def get_page_key(request):
+    params = urlencode([
+        (name, request.GET[name])
+        for name in PAGE_QUERY_PARAMS if name in request.GET
+    ])
+    path = hashlib.md5(f'{request.path}?{params}'.encode()).hexdigest()
+    return f'page:{path}'
+
+
+class _PersonalPage(Exception):
+    """Ответ нельзя делить с другими читателями."""
+
+    def __init__(self, response):
+        self.response = response
+
+
+def _maybe_behind(request):
+    """Страница прочитана с реплики, которая могла отстать от сброса."""
+    route = getattr(request, 'db_route', None)
+    return (
+        route is not None and route.replica is not None
+        and invalidated_within(settings.REPLICA_STICKY_SECONDS)
+    )
+
+
+def _cached_response(view, request, args, kwargs, timeout, personal):
+    if personal is not None and personal(request, *args, **kwargs):
+        # Решается до кэша: попадание отдало бы чужую общую копию.
+        return view(request, *args, **kwargs)
+
+    def render_shared():
+        request.punch_holes = True
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            # Страницы ошибок рендерятся уже без меток.
+            request.punch_holes = False
+        if (
+            response.status_code != 200
+            or response.streaming
+            or getattr(request, 'skip_page_cache', False)
+            or _maybe_behind(request)
+        ):
+            raise _PersonalPage(response)
+        content = response.content.decode(response.charset)
+        return content, response['Content-Type']
+
+    try:
+        content, content_type = get_or_compute(
+            get_page_key(request), render_shared, timeout,
+            tags=lambda value: getattr(request, 'cache_tags', ())
+        )
+    except _PersonalPage as page:
+        response = page.response
+        if not response.streaming:
+            response.content = fill_holes(
+                request, response.content.decode(response.charset)
+            )
+        return response
+    return HttpResponse(
+        fill_holes(request, content), content_type=content_type
+    )
+
+
+def _page_cache_timeout(request):
+    if request.method not in ('GET', 'HEAD'):
+        return 0
+    if getattr(request, 'template_profile', None) is not None:
+        # Время шаблонов видно, только если страница рендерится заново.
+        return 0
+    if settings.REPLICA_STICKY_COOKIE in request.COOKIES:
+        # Писавший должен увидеть свою запись, а не общую копию, которую
+        # мог положить читатель с отстающей реплики.
+        return 0
+    return getattr(settings, 'PAGE_CACHE_TIMEOUT', 0)
+
+
+def shared_page(view=None, *, personal=None):
+    """Кэширует общее тело страницы для всех читателей.
+
+    Включается настройкой ``PAGE_CACHE_TIMEOUT`` (в секундах); раньше
+    срока запись сбрасывается по тегам, собранным через ``tag_page``.
+    Пересчёт защищён от «набега» через ``get_or_compute``. Подходит и для
+    асинхронных представлений. Из параметров запроса ключ учитывает только
+    ``PAGE_QUERY_PARAMS``: новый параметр страницы нужно добавить туда.
+
+    ``personal(request, *args, **kwargs)`` вызывается до обращения к кэшу:
+    если он вернул True, страница рендерится для пользователя и в кэш не
+    попадает. ``skip_page_cache`` внутри представления срабатывает только
+    при промахе.
+    """
+    if view is None:
+        return partial(shared_page, personal=personal)
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            timeout = _page_cache_timeout(request)
+            if not timeout:
+                return await view(request, *args, **kwargs)
+            # Кэш и его блокировки синхронные, поэтому работают в потоке,
+            # а страница при промахе рендерится в цикле событий.
+            return await sync_to_async(_cached_response)(
+                async_to_sync(view), request, args, kwargs, timeout,
+                personal
+            )
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        timeout = _page_cache_timeout(request)
+        if not timeout:
+            return view(request, *args, **kwargs)
+        return _cached_response(
+            view, request, args, kwargs, timeout, personal
+        )
+    return wrapper
@@ -0,0 +1,104 @@
+"""Справочники блога в памяти процесса.
+
+Категорий и местоположений мало, и меняются они редко, поэтому все они
+держатся в памяти по id и slug. Актуальность сверяется с поколением тега
+``reference`` в кэше: сигналы сохранения и удаления сбрасывают тег после
+COMMIT, и каждый процесс перечитывает справочники при следующем
+обращении.
+"""
+import threading
+
+from django.db import transaction
+
+from .cache import get_tag_versions, invalidate_tags
+from .models import Category, Location
+
+REFERENCE_TAG = 'reference'
+
+
+class ReferenceData:
+
+    def __init__(self, categories, locations):
+        self.categories = {category.pk: category for category in categories}
+        self.categories_by_slug = {
+            category.slug: category for category in categories
+        }
+        self.locations = {location.pk: location for location in locations}
+        self.published_category_ids = frozenset(
+            pk for pk, category in self.categories.items()
+            if category.is_published
+        )
+        self.published_location_ids = frozenset(
+            pk for pk, location in self.locations.items()
+            if location.is_published
+        )
+
+
+_state = {'data': None, 'version': None}
+_lock = threading.Lock()
+
+
+def get_reference():
+    """Актуальные справочники; при необходимости перечитывает их из БД."""
+    # Поколение читаем до загрузки: изменение, случившееся во время
+    # загрузки, просто вызовет ещё одно перечитывание.
+    version = get_tag_versions([REFERENCE_TAG])[REFERENCE_TAG]
+    data = _state['data']
+    if data is not None and _state['version'] == version:
+        return data
+    with _lock:
+        if _state['data'] is None or _state['version'] != version:
+            _state['data'] = ReferenceData(
+                list(Category.objects.all()), list(Location.objects.all())
+            )
+            _state['version'] = version
+        return _state['data']
+
+
+def _reset():
+    _state['data'] = None
+    invalidate_tags(REFERENCE_TAG)
+
+
+def invalidate_reference(using=None):
+    """Сбрасывает справочники после фиксации транзакции ``using``.
+
+    До COMMIT другой процесс перечитал бы старые строки под новым
+    поколением и держал бы их до следующей правки справочника.
+    """
+    transaction.on_commit(_reset, using=using)
+
+
+def get_published_category(slug):
+    """Опубликованная категория по slug или None."""
+    category = get_reference().categories_by_slug.get(slug)
+    if category is None or not category.is_published:
+        return None
+    return category
+
+
+def published_category_ids():
+    return get_reference().published_category_ids
+
+
+def published_location_ids():
+    return get_reference().published_location_ids
+
+
+def attach_reference(posts):
+    """Подставляет публикациям категории и местоположения из памяти.
+
+    Заменяет ``select_related('category', 'location')`` при выводе
+    карточек.
+    """
+    data = get_reference()
+    for post in posts:
+        # Чего нет в справочнике (только что создано в другом процессе),
+        # подгрузится из БД как обычно.
+        category = data.categories.get(post.category_id)
+        if category is not None:
+            post.category = category
+        location = data.locations.get(post.location_id)
+        if location is not None:
+            post.location = location
+    return posts
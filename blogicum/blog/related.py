@@ -0,0 +1,196 @@
+"""Похожие публикации для блока «Читайте также».
+
+Сравнивать тексты при показе страницы слишком дорого, поэтому
+``compute_related`` заранее строит TF-IDF видимых публикаций (разреженная
+матрица SciPy, строки нормированы), пачками по ``RELATED_POSTS_CHUNK``
+строк находит ``RELATED_POSTS_COUNT`` ближайших по косинусу и сохраняет
+их в ``RelatedPost``. Страница публикации читает готовый список одним
+запросом по индексу (post, rank).
+
+Повторный запуск пересчитывает только посты, изменённые или ставшие
+видимыми с прошлого раза (в том числе отложенные, чья дата наступила, и
+все видимые посты без списка), и те, чьи списки они могут изменить: где
+они уже есть или где они похожее последнего места. IDF при этом не
+пересчитывается для всех, поэтому изредка стоит запускать
+``compute_related --full``.
+"""
+import re
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+from scipy import sparse
+
+from blogicum.db import run_write
+
+from .cache import invalidate_tags_on_commit, post_tag
+from .models import RelatedPost
+from .views import get_published_posts
+
+WORD_RE = re.compile(r'[^\W\d_]{3,}')
+STOP_WORDS = frozenset((
+    'без для его её еще ещё или как когда над нас они она оно под при '
+    'так там тем что это эти был была были было быть все всё уже только '
+    'and are for the this that with'
+).split())
+
+# Сколько идентификаторов в одном IN: предел параметров запроса SQLite.
+IN_BATCH_SIZE = 500
+
+
+def tokenize(text):
+    return [
+        word for word in WORD_RE.findall(text.lower())
+        if word not in STOP_WORDS
+    ]
+
+
+def build_matrix(texts):
+    """TF-IDF текстов: строка на текст, нормированная по L2."""
+    vocabulary = {}
+    indices, data, indptr = [], [], [0]
+    for text in texts:
+        for word, count in Counter(tokenize(text)).items():
+            indices.append(vocabulary.setdefault(word, len(vocabulary)))
+            data.append(count)
+        indptr.append(len(indices))
+    matrix = sparse.csr_matrix(
+        (
+            np.array(data, dtype=np.float64),
+            np.array(indices, dtype=np.int64),
+            np.array(indptr, dtype=np.int64),
+        ),
+        shape=(len(texts), len(vocabulary))
+    )
+    # Сублинейная частота слова и сглаженный idf.
+    matrix.data = 1 + np.log(matrix.data)
+    documents = np.bincount(matrix.indices, minlength=len(vocabulary))
+    idf = np.log((1 + len(texts)) / (1 + documents)) + 1
+    matrix = matrix @ sparse.diags(idf)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return (sparse.diags(1 / norms) @ matrix).tocsr()
+
+
+def nearest(matrix, rows, count, chunk):
+    """Пачками по ``chunk`` строк: [(строка, соседи, сходство), ...].
+
+    Соседи упорядочены по убыванию сходства, при равенстве выше более
+    поздняя строка; сама строка и нулевое сходство не попадают.
+    """
+    transposed = matrix.T.tocsr()
+    for start in range(0, len(rows), chunk):
+        block = rows[start:start + chunk]
+        similarity = (matrix[block] @ transposed).tocsr()
+        result = []
+        for number, row in enumerate(block):
+            begin, end = similarity.indptr[number:number + 2]
+            columns = similarity.indices[begin:end]
+            values = similarity.data[begin:end]
+            keep = (columns != row) & (values > 0)
+            columns, values = columns[keep], values[keep]
+            if len(values) > count:
+                top = np.argpartition(-values, count)[:count]
+                columns, values = columns[top], values[top]
+            order = np.lexsort((-columns, -values))
+            result.append((row, columns[order], values[order]))
+        yield result
+
+
+def _lookup(post_ids, ids):
+    """Индексы ``ids`` в отсортированном ``post_ids`` и какие там есть."""
+    ids = np.asarray(ids, dtype=np.int64)
+    if not len(post_ids):
+        return ids, np.zeros(len(ids), dtype=bool)
+    positions = np.searchsorted(post_ids, ids)
+    found = post_ids[np.minimum(positions, len(post_ids) - 1)] == ids
+    return positions, found
+
+
+def _affected(matrix, post_ids, changed):
+    """Строки, чьи списки надо пересчитать из-за изменённых ``changed``."""
+    if not len(changed):
+        return changed
+    containing = []
+    changed_ids = post_ids[changed].tolist()
+    for start in range(0, len(changed_ids), IN_BATCH_SIZE):
+        containing.extend(RelatedPost.objects.filter(
+            related_id__in=changed_ids[start:start + IN_BATCH_SIZE]
+        ).values_list('post_id', flat=True))
+
+    # Порог входа в список: последнее место, а у неполного списка - ноль.
+    thresholds = np.zeros(len(post_ids))
+    filled = RelatedPost.objects.values('post_id').annotate(
+        lowest=Min('score'), size=Count('id')
+    ).filter(size__gte=settings.RELATED_POSTS_COUNT).order_by()
+    rows = list(filled.values_list('post_id', 'lowest'))
+    if rows:
+        ids, lowest = zip(*rows)
+        positions, found = _lookup(post_ids, ids)
+        thresholds[positions[found]] = np.array(lowest)[found]
+
+    best = np.asarray(
+        (matrix @ matrix[changed].T).max(axis=1).todense()
+    ).ravel()
+    beaten = np.flatnonzero(best > thresholds)
+    positions, found = _lookup(post_ids, containing)
+    return np.union1d(np.union1d(changed, positions[found]), beaten)
+
+
+def compute_related(full=False, now=None):
+    """Пересчитывает похожие публикации; возвращает число обновлённых."""
+    now = now or timezone.now()
+    posts = list(
+        get_published_posts().order_by('pk')
+        .values_list('pk', 'title', 'text', 'updated_at', 'pub_date')
+    )
+    post_ids = np.array([row[0] for row in posts], dtype=np.int64)
+    matrix = build_matrix([f'{row[1]} {row[2]}' for row in posts])
+    last_run = None if full else RelatedPost.objects.aggregate(
+        last=Max('computed_at')
+    )['last']
+    if last_run is None:
+        # Первый запуск или --full: старые списки, в том числе скрытых
+        # постов, больше не нужны.
+        run_write(RelatedPost.objects.all().delete)
+        rows = np.arange(len(posts))
+    else:
+        # Отложенный пост становится видимым без правки updated_at, а
+        # скрытый ранее - и вовсе без следа: у такого ещё нет списка.
+        listed = set(
+            RelatedPost.objects.values_list('post_id', flat=True).distinct()
+        )
+        changed = np.array([
+            number for number, (pk, _, _, updated_at, pub_date)
+            in enumerate(posts)
+            if updated_at > last_run or pub_date > last_run
+            or pk not in listed
+        ], dtype=np.int64)
+        rows = _affected(matrix, post_ids, changed)
+
+    for block in nearest(
+        matrix, rows, settings.RELATED_POSTS_COUNT,
+        settings.RELATED_POSTS_CHUNK
+    ):
+        ids = [int(post_ids[row]) for row, _, _ in block]
+        entries = [
+            RelatedPost(
+                post_id=int(post_ids[row]),
+                related_id=int(post_ids[column]),
+                rank=rank,
+                score=float(score),
+                computed_at=now,
+            )
+            for row, columns, scores in block
+            for rank, (column, score) in enumerate(zip(columns, scores), 1)
+        ]
+
+        def replace():
+            RelatedPost.objects.filter(post_id__in=ids).delete()
+            RelatedPost.objects.bulk_create(entries, batch_size=500)
+
+        run_write(replace)
+        invalidate_tags_on_commit(*(post_tag(pk) for pk in ids))
+    return len(rows)
@@ -0,0 +1,203 @@
+"""Наполнение базы синтетическими данными для нагрузочных тестов.
+
+Данные детерминированы: одинаковые параметры и ``seed`` дают одну и ту
+же базу. Записи создаются пачками через ``bulk_create`` без сигналов,
+поэтому после наполнения кэш очищается целиком, а счётчики месяцев
+архива пересчитываются.
+
+Длина текстов распределена логнормально, как у живых публикаций:
+большинство коротких и немного длинных. Комментарии распределены по
+постам по закону Ципфа: немногие посты собирают большую часть обсуждений.
+"""
+import io
+import math
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import router, transaction
+from django.utils import timezone
+from PIL import Image
+
+from .models import Category, Comment, Location, MonthBucket, Post
+
+User = get_user_model()
+
+PASSWORD = 'bench-password'
+
+WORDS = (
+    'блог', 'путешествие', 'город', 'река', 'дорога', 'утро', 'вечер',
+    'гора', 'лес', 'море', 'поезд', 'друг', 'книга', 'кофе', 'история',
+    'фото', 'день', 'неделя', 'погода', 'музей', 'парк', 'улица', 'дом',
+    'и', 'в', 'на', 'с', 'по', 'к', 'не', 'что', 'это', 'как', 'мы',
+    'шли', 'видели', 'долго', 'снова', 'очень', 'тихо', 'рядом', 'потом',
+)
+
+# Медиана и разброс количества слов (логнормальное распределение).
+POST_WORDS = (120, 0.7, 10, 2000)
+COMMENT_WORDS = (15, 0.8, 1, 300)
+
+
+def sentence(rnd, words):
+    return ' '.join(rnd.choices(WORDS, k=words)).capitalize()
+
+
+def text(rnd, length):
+    median, sigma, low, high = length
+    words = int(rnd.lognormvariate(math.log(median), sigma))
+    return sentence(rnd, min(max(words, low), high))
+
+
+def zipf_weights(count, exponent):
+    """Накопленные веса рангов 1..count для random.choices."""
+    return list(accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)
+    ))
+
+
+def chunked_create(model, objects, batch_size):
+    """bulk_create пачками по batch_size, каждая - в своей транзакции.
+
+    Возвращает только первичные ключи: объекты пачки сразу освобождаются.
+    """
+    using = router.db_for_write(model)
+    created = []
+    chunk = []
+    for obj in objects:
+        chunk.append(obj)
+        if len(chunk) == batch_size:
+            created += _create(model, chunk, using)
+            chunk = []
+    if chunk:
+        created += _create(model, chunk, using)
+    return created
+
+
+def _create(model, chunk, using):
+    with transaction.atomic(using=using):
+        return [
+            obj.pk for obj in model.objects.using(using).bulk_create(chunk)
+        ]
+
+
+def make_images(rnd, count, prefix):
+    """Небольшие JPEG разных цветов в хранилище медиафайлов."""
+    names = []
+    for number in range(count):
+        buffer = io.BytesIO()
+        color = tuple(rnd.randrange(256) for _ in range(3))
+        Image.new('RGB', (640, 480), color).save(buffer, 'JPEG')
+        names.append(default_storage.save(
+            f'{Post.image.field.upload_to}/{prefix}-{number}.jpg',
+            ContentFile(buffer.getvalue()),
+        ))
+    return names
+
+
+def seed_blog(
+    users=50, categories=5, locations=10, posts=1000, comments=5000,
+    images=0, image_share=0.3, zipf=1.1, days=365, seed=0,
+    batch_size=5000, prefix='seed', progress=None,
+):
+    """Создаёт пользователей, справочники, посты и комментарии.
+
+    Имена пользователей и адреса категорий начинаются с ``prefix``; у всех
+    пользователей пароль ``PASSWORD``. ``progress(name, count)`` вызывается
+    после каждой модели. Возвращает количество созданных записей.
+    """
+    rnd = random.Random(seed)
+    now = timezone.now()
+    report = progress or (lambda name, count: None)
+    summary = {}
+
+    # Хеширование пароля медленное: один хеш на всех.
+    password = make_password(PASSWORD)
+    author_ids = chunked_create(
+        User,
+        (
+            User(username=f'{prefix}-user{number}', password=password)
+            for number in range(users)
+        ),
+        batch_size,
+    )
+    summary['users'] = len(author_ids)
+    report('users', len(author_ids))
+
+    category_ids = chunked_create(
+        Category,
+        (
+            Category(
+                title=f'Категория {number}',
+                slug=f'{prefix}-category-{number}',
+                description=sentence(rnd, rnd.randint(10, 40)),
+            )
+            for number in range(categories)
+        ),
+        batch_size,
+    )
+    location_ids = chunked_create(
+        Location,
+        (Location(name=f'Место {number}') for number in range(locations)),
+        batch_size,
+    )
+    summary['categories'] = len(category_ids)
+    summary['locations'] = len(location_ids)
+    report('categories', len(category_ids))
+    report('locations', len(location_ids))
+
+    image_names = make_images(rnd, images, prefix) if posts else []
+    # Часть постов - без местоположения.
+    location_choices = location_ids + [None]
+    period = timedelta(days=days).total_seconds()
+    post_ids = chunked_create(
+        Post,
+        (
+            Post(
+                title=sentence(rnd, rnd.randint(2, 8)),
+                text=text(rnd, POST_WORDS),
+                pub_date=now - timedelta(seconds=rnd.uniform(0, period)),
+                author_id=rnd.choice(author_ids),
+                category_id=rnd.choice(category_ids),
+                location_id=rnd.choice(location_choices),
+                image=(
+                    rnd.choice(image_names)
+                    if image_names and rnd.random() < image_share else ''
+                ),
+            )
+            for _ in range(posts)
+        ),
+        batch_size,
+    )
+    summary['posts'] = len(post_ids)
+    summary['images'] = len(image_names)
+    report('posts', len(post_ids))
+
+    # Ранги Ципфа достаются постам в случайном порядке.
+    rnd.shuffle(post_ids)
+    weights = zipf_weights(len(post_ids), zipf)
+
+    def comment_objects():
+        for start in range(0, comments, batch_size):
+            targets = rnd.choices(
+                post_ids, cum_weights=weights,
+                k=min(batch_size, comments - start),
+            )
+            for post_id in targets:
+                yield Comment(
+                    text=text(rnd, COMMENT_WORDS),
+                    post_id=post_id,
+                    author_id=rnd.choice(author_ids),
+                )
+
+    summary['comments'] = len(chunked_create(
+        Comment, comment_objects() if post_ids else (), batch_size
+    ))
+    report('comments', summary['comments'])
+    MonthBucket.objects.rebuild()
+    cache.clear()
+    return summary
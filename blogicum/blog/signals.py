@@ -0,0 +1,147 @@
+"""Сброс тегов кэша при изменении моделей блога и пользователей.
+
+Здесь же удаляются комментарии удалённых постов и пользователей, если их
+таблица лежит в другой базе и каскад внешних ключей недоступен. Сигналы
+постов ведут и счётчики месяцев архива (``MonthBucket``).
+"""
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from blogicum.routers import model_database
+
+from .cache import (
+    FEED_TAG, LOCATIONS_TAG, author_tag, category_tag,
+    invalidate_tags_on_commit, location_tag, post_tag
+)
+from .models import Category, Comment, Location, MonthBucket, Post, month_key
+from .reference import invalidate_reference
+
+User = get_user_model()
+
+
+def _remember_old(sender, instance, fields):
+    """Сохраняет прежние значения полей, чтобы сбросить и старые теги."""
+    if instance.pk is None:
+        instance._old_cache_values = None
+        return
+    instance._old_cache_values = (
+        sender._base_manager.filter(pk=instance.pk).values(*fields).first()
+    )
+
+
+def _old_values(instance):
+    return getattr(instance, '_old_cache_values', None) or {}
+
+
+@receiver(pre_save, sender=Post)
+def remember_post(sender, instance, **kwargs):
+    _remember_old(
+        sender, instance,
+        (
+            'author__username', 'category__slug', 'location_id',
+            'is_published', 'pub_date'
+        )
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post(sender, instance, using, **kwargs):
+    tags = {FEED_TAG, post_tag(instance.pk)}
+    old = _old_values(instance)
+    usernames = {old.get('author__username')}
+    slugs = {old.get('category__slug')}
+    location_ids = {old.get('location_id'), instance.location_id}
+    if instance.author_id is not None:
+        usernames.add(instance.author.username)
+    if instance.category_id is not None:
+        slugs.add(instance.category.slug)
+    tags.update(author_tag(name) for name in usernames if name)
+    tags.update(category_tag(slug) for slug in slugs if slug)
+    tags.update(location_tag(pk) for pk in location_ids if pk)
+    invalidate_tags_on_commit(*tags, using=using)
+
+
+@receiver(post_save, sender=Post)
+def count_post_month(sender, instance, **kwargs):
+    changes = Counter()
+    old = _old_values(instance)
+    if old.get('is_published'):
+        changes[month_key(old['pub_date'])] -= 1
+    if instance.is_published:
+        changes[month_key(instance.pub_date)] += 1
+    MonthBucket.objects.shift(changes)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post_month(sender, instance, **kwargs):
+    if instance.is_published:
+        MonthBucket.objects.shift({month_key(instance.pub_date): -1})
+
+
+@receiver(post_delete, sender=Post)
+def delete_post_comments(sender, instance, **kwargs):
+    if model_database(Comment):
+        Comment.objects.filter(post_id=instance.pk).delete()
+
+
+@receiver(post_delete, sender=User)
+def delete_author_comments(sender, instance, **kwargs):
+    if model_database(Comment):
+        Comment.objects.filter(author_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment(sender, instance, using, **kwargs):
+    invalidate_tags_on_commit(post_tag(instance.post_id), using=using)
+
+
+@receiver(pre_save, sender=Category)
+def remember_category(sender, instance, **kwargs):
+    _remember_old(sender, instance, ('slug',))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category(sender, instance, using, **kwargs):
+    invalidate_reference(using=using)
+    slugs = {instance.slug, _old_values(instance).get('slug')}
+    invalidate_tags_on_commit(
+        FEED_TAG, *(category_tag(slug) for slug in slugs if slug),
+        using=using
+    )
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_location(sender, instance, using, **kwargs):
+    invalidate_reference(using=using)
+    invalidate_tags_on_commit(
+        FEED_TAG, LOCATIONS_TAG, location_tag(instance.pk), using=using
+    )
+
+
+@receiver(pre_save, sender=User)
+def remember_user(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    _remember_old(sender, instance, ('username',))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user(
+    sender, instance, using, update_fields=None, **kwargs
+):
+    # Вход обновляет только last_login - на страницах это не видно.
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    usernames = {instance.username, _old_values(instance).get('username')}
+    invalidate_tags_on_commit(
+        FEED_TAG, *(author_tag(name) for name in usernames if name),
+        using=using
+    )
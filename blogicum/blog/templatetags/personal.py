@@ -0,0 +1,18 @@
+from django import template
+
+from blog.page_cache import punch_hole, render_inline
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def personal(context, name, *args):
+    """Персональный фрагмент страницы.
+
+    Пока страница рендерится для общего кэша, на месте фрагмента
+    остаётся метка; иначе фрагмент рендерится сразу.
+    """
+    request = context.get('request')
+    if getattr(request, 'punch_holes', False):
+        return punch_hole(name, args)
+    return render_inline(name, args, context)
@@ -0,0 +1,11 @@
+from django import template
+
+from blog.cards import render_post_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts):
+    """Карточки постов ленты одним проходом (см. blog.cards)."""
+    return render_post_cards(posts)
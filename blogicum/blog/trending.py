@@ -0,0 +1,157 @@
+"""Популярные публикации: расчёт раз в несколько минут, а не в запросе.
+
+``compute_trending`` загружает активность последних
+``TRENDING_WINDOW_DAYS`` дней массивами NumPy и одним проходом считает
+оценку всех кандидатов: каждый комментарий и каждый просмотр весит тем
+меньше, чем он старше (полураспад ``TRENDING_HALF_LIFE_HOURS``). Время
+просмотров не хранится, поэтому их вес убывает с возрастом поста.
+Лучшие ``TRENDING_SIZE`` публикаций сайта и каждой категории ложатся в
+таблицу ``TrendingPost``, и страница популярного читает готовый список
+одним запросом. Запускается по расписанию:
+``python manage.py compute_trending`` (или ``--every 300``).
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from blogicum.db import run_write
+
+from .cache import TRENDING_TAG, invalidate_tags_on_commit
+from .models import Comment, TrendingPost
+from .views import get_published_posts
+
+# Без категории в массиве кандидатов.
+NO_CATEGORY = -1
+
+
+def _timestamps(values, count):
+    return np.fromiter(
+        (value.timestamp() for value in values), dtype=np.float64,
+        count=count
+    )
+
+
+def load_activity(now):
+    """Кандидаты и их комментарии за окно в виде массивов.
+
+    Возвращает ``(post_ids, category_ids, published, views, comment_posts,
+    commented)``; ``post_ids`` отсортированы, время - секунды эпохи,
+    ``comment_posts`` - индексы постов в ``post_ids``.
+    """
+    since = now - timedelta(days=settings.TRENDING_WINDOW_DAYS)
+    rows = list(
+        get_published_posts().filter(pub_date__gte=since).order_by('pk')
+        .values_list('pk', 'category_id', 'pub_date', 'views')
+    )
+    count = len(rows)
+    post_ids, category_ids, pub_dates, views = (
+        zip(*rows) if rows else ((), (), (), ())
+    )
+    post_ids = np.array(post_ids, dtype=np.int64)
+    category_ids = np.array(
+        [NO_CATEGORY if pk is None else pk for pk in category_ids],
+        dtype=np.int64
+    )
+    published = _timestamps(pub_dates, count)
+    views = np.array(views, dtype=np.float64)
+
+    # Комментарии могут лежать в другой базе: выбираются по времени, а к
+    # кандидатам привязываются поиском по отсортированным post_ids.
+    comments = list(
+        Comment.objects.filter(is_published=True, created_at__gte=since)
+        .values_list('post_id', 'created_at').order_by()
+    )
+    comment_post_ids, comment_dates = (
+        zip(*comments) if comments else ((), ())
+    )
+    comment_post_ids = np.array(comment_post_ids, dtype=np.int64)
+    commented = _timestamps(comment_dates, len(comments))
+    if count:
+        positions = np.searchsorted(post_ids, comment_post_ids)
+        found = (
+            post_ids[np.minimum(positions, count - 1)] == comment_post_ids
+        )
+    else:
+        positions = found = np.zeros(len(comments), dtype=bool)
+    return (
+        post_ids, category_ids, published, views,
+        positions[found].astype(np.int64), commented[found]
+    )
+
+
+def score_posts(published, views, comment_posts, commented, now):
+    """Оценка каждого кандидата с затуханием по времени."""
+    now = now.timestamp()
+    half_life = settings.TRENDING_HALF_LIFE_HOURS * 3600
+
+    def decay(timestamps):
+        return np.exp2(-np.maximum(now - timestamps, 0) / half_life)
+
+    comments = np.bincount(
+        comment_posts, weights=decay(commented), minlength=len(published)
+    )
+    return (
+        settings.TRENDING_COMMENT_WEIGHT * comments
+        + settings.TRENDING_VIEW_WEIGHT * views * decay(published)
+    )
+
+
+def top_posts(scores, published, category_ids, size):
+    """Индексы лучших постов сайта и ``{category_id: индексы}``.
+
+    При равной оценке выше более новый пост. Посты без активности в
+    популярное не попадают.
+    """
+    active = np.flatnonzero(scores > 0)
+    order = active[np.lexsort((-published[active], -scores[active]))]
+    site = order[:size]
+
+    # Та же сортировка внутри каждой категории: место = номер в группе.
+    order = order[np.argsort(category_ids[order], kind='stable')]
+    grouped = category_ids[order]
+    rank = np.arange(len(order)) - np.searchsorted(grouped, grouped)
+    keep = (rank < size) & (grouped != NO_CATEGORY)
+    kept, groups = order[keep], grouped[keep]
+    if not len(kept):
+        return site, {}
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    by_category = {
+        int(groups[start]): indices
+        for start, indices in zip(starts, np.split(kept, starts[1:]))
+    }
+    return site, by_category
+
+
+def compute_trending(now=None):
+    """Пересчитывает таблицу популярного; возвращает число записей."""
+    now = now or timezone.now()
+    (
+        post_ids, category_ids, published, views, comment_posts, commented
+    ) = load_activity(now)
+    scores = score_posts(published, views, comment_posts, commented, now)
+    site, by_category = top_posts(
+        scores, published, category_ids, settings.TRENDING_SIZE
+    )
+
+    entries = []
+    for category_id, indices in [(None, site), *by_category.items()]:
+        entries.extend(
+            TrendingPost(
+                category_id=category_id,
+                rank=rank,
+                post_id=int(post_ids[index]),
+                score=float(scores[index]),
+                computed_at=now,
+            )
+            for rank, index in enumerate(indices, 1)
+        )
+
+    def replace():
+        TrendingPost.objects.all().delete()
+        TrendingPost.objects.bulk_create(entries, batch_size=500)
+
+    run_write(replace)
+    invalidate_tags_on_commit(TRENDING_TAG)
+    return len(entries)
@@ -1,11 +1,17 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, archive, async_views, views
 app_name = 'blog'
 
+# Страницы чтения: асинхронные под ASGI, обычные под WSGI.
+read_views = async_views if settings.ASYNC_READ_VIEWS else views
+
 
 urlpatterns = [
-    path('', views.index, name='index'),
-    path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('', read_views.index, name='index'),
+    path(
+        'posts/<int:post_id>/', read_views.post_detail, name='post_detail'
+    ),
     path(
         'posts/create/',
         views.CreatePostView.as_view(),
@@ -43,12 +49,50 @@ urlpatterns = [
     ),
     path(
         'profile/<str:username>/',
-        views.profile,
+        read_views.profile,
         name='profile'
     ),
     path(
         'category/<slug:category_slug>/',
-        views.category_posts,
+        read_views.category_posts,
         name='category_posts'
     ),
+    path('popular/', views.popular, name='popular'),
+    path(
+        'popular/<slug:category_slug>/',
+        views.popular,
+        name='popular_category'
+    ),
+    path('archive/<int:year>/', archive.archive, name='archive_year'),
+    path(
+        'archive/<int:year>/<two_digits:month>/',
+        archive.archive,
+        name='archive_month'
+    ),
+    path(
+        'archive/<int:year>/<two_digits:month>/<two_digits:day>/',
+        archive.archive,
+        name='archive_day'
+    ),
+    path('api/posts/', api.post_list, name='api_post_list'),
+    path(
+        'api/posts/<int:post_id>/',
+        api.post_detail,
+        name='api_post_detail'
+    ),
+    path(
+        'api/posts/<int:post_id>/comments/',
+        api.post_comments,
+        name='api_post_comments'
+    ),
+    path(
+        'api/category/<slug:category_slug>/',
+        api.category_posts,
+        name='api_category_posts'
+    ),
+    path(
+        'api/profile/<str:username>/',
+        api.author_posts,
+        name='api_author_posts'
+    ),
 ]
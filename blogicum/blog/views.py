@@ -4,80 +4,192 @@ from django.views.generic import (
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.shortcuts import render, get_object_or_404
 from django.shortcuts import redirect
-from .models import Category, Post, Comment
+from .models import Post, Comment, RelatedPost, TrendingPost
 from django.urls import reverse
 from django.utils import timezone
+from django.conf import settings
 from django.core.paginator import Paginator
+from django.db import router
+from django.db.models import Count
 from django.http import Http404
 from django.http import HttpResponseNotFound
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from .forms import PostForm, CommentForm, EditProfileForm
+from .cache import (
+    FEED_TAG, LOCATIONS_TAG, TRENDING_TAG, author_tag, category_tag,
+    get_post_tags, post_tag
+)
+from .counters import count_views
+from .deletion import deleting_post_ids, is_being_deleted, schedule_deletion
+from .page_cache import shared_page, skip_page_cache, tag_page
+from .reference import (
+    attach_reference, get_published_category, published_category_ids,
+    published_location_ids
+)
+from blogicum.db import run_write
 User = get_user_model()
 
 
-def index(request):
-    post_list = Post.objects.filter(
+def get_published_posts():
+    """Публикации, видимые в общей ленте."""
+    # Видимость категорий и мест берётся из справочника в памяти,
+    # без JOIN с их таблицами.
+    return Post.objects.filter(
         is_published=True,
         pub_date__lte=timezone.now(),
-        category__is_published=True,
-        location__is_published=True,
+        category_id__in=published_category_ids(),
+        location_id__in=published_location_ids(),
         author__is_active=True
-    ).select_related('category', 'location', 'author').order_by('-pub_date')
+    )
+
+
+def get_category_posts(category):
+    """Опубликованные записи категории."""
+    return Post.objects.filter(
+        category=category,
+        is_published=True,
+        pub_date__lte=timezone.now(),
+        location_id__in=published_location_ids()
+    )
+
+
+def filter_author_posts(posts, is_owner):
+    """Записи автора, которые видны в профиле владельцу или гостю.
+
+    Владельцу видны все, кроме удаляемых в фоне, остальным -
+    опубликованные.
+    """
+    if is_owner:
+        return posts.exclude(pk__in=deleting_post_ids())
+    return posts.filter(is_published=True, pub_date__lte=timezone.now())
+
+
+def get_author_posts(author, user):
+    """Записи автора: владельцу видны все, остальным - опубликованные."""
+    return filter_author_posts(
+        Post.objects.filter(author=author), user == author
+    )
+
+
+def is_post_public(post):
+    """Видна ли страница публикации всем посетителям."""
+    return bool(
+        post.is_published
+        and post.pub_date <= timezone.now()
+        and post.category is not None
+        and post.category.is_published
+        and post.location is not None
+        and post.location.is_published
+        and post.author.is_active
+    )
+
+
+def attach_comment_counts(posts):
+    """Подставляет количество комментариев одним запросом на страницу.
+
+    Комментарии могут лежать в другой базе, поэтому без annotate и JOIN.
+    """
+    posts = list(posts)
+    counts = dict(
+        Comment.objects.filter(
+            post_id__in=[post.pk for post in posts], is_published=True
+        ).values_list('post_id').annotate(Count('id')).order_by()
+    )
+    for post in posts:
+        post.comment_count = counts.get(post.pk, 0)
+    return posts
+
+
+def get_related_posts(post_id):
+    """«Читайте также»: готовый список из blog.related, один запрос."""
+    entries = RelatedPost.objects.filter(
+        post_id=post_id, related__in=get_published_posts()
+    ).select_related('related__author').order_by('rank')
+    return [
+        entry.related
+        for entry in entries[:settings.RELATED_POSTS_COUNT]
+    ]
+
+
+def prepare_posts_page(request, page_obj, *tags):
+    """Готовит карточки страницы ленты.
+
+    Подставляет категории и места из справочника, количество
+    комментариев и помечает страницу тегами всех показанных карточек.
+    """
+    attach_reference(page_obj)
+    attach_comment_counts(page_obj)
+    for post in page_obj:
+        tags += tuple(get_post_tags(post))
+    tag_page(request, *tags)
+
+
+@shared_page
+def index(request):
+    post_list = get_published_posts().select_related(
+        'author'
+    ).order_by('-pub_date')
 
     paginator = Paginator(post_list, 10)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    prepare_posts_page(request, page_obj, FEED_TAG)
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'blog/index.html', context)
 
 
+@count_views
+@shared_page
 def post_detail(request, post_id):
     post = get_object_or_404(
-        Post.objects.select_related('author', 'category', 'location'),
+        Post.objects.select_related('author'),
         pk=post_id
     )
+    attach_reference([post])
 
-    if request.user != post.author:
-        if not (
-            post.is_published
-            and post.pub_date <= timezone.now()
-            and post.category.is_published
-            and post.location.is_published
-            and post.author.is_active
-        ):
+    if not is_post_public(post):
+        if request.user != post.author or is_being_deleted(post.pk):
             raise Http404("Пост не найден")
+        # Автору виден и скрытый пост, такую страницу не делим с другими.
+        skip_page_cache(request)
+    tag_page(request, *get_post_tags(post))
 
-    comments = post.comments.filter(is_published=True)
+    # Авторы - отдельным запросом: JOIN между базами невозможен.
+    comments = post.comments.filter(
+        is_published=True
+    ).prefetch_related('author')
     form = CommentForm()
+    related_posts = get_related_posts(post.pk)
+    tag_page(request, *(post_tag(related.pk) for related in related_posts))
 
     context = {
         'post': post,
         'comments': comments,
         'form': form,
+        'related_posts': related_posts,
     }
     return render(request, 'blog/detail.html', context)
 
 
+@shared_page
 def category_posts(request, category_slug):
-    category = get_object_or_404(
-        Category,
-        slug=category_slug,
-        is_published=True
-    )
+    category = get_published_category(category_slug)
+    if category is None:
+        raise Http404("Категория не найдена")
 
-    post_list = Post.objects.filter(
-        category=category,
-        is_published=True,
-        pub_date__lte=timezone.now(),
-        location__is_published=True
+    post_list = get_category_posts(category).select_related(
+        'author'
     ).order_by('-pub_date')
 
     paginator = Paginator(post_list, 10)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    prepare_posts_page(
+        request, page_obj, category_tag(category.slug), LOCATIONS_TAG
+    )
     context = {
         'category': category,
         'page_obj': page_obj,
@@ -85,21 +197,51 @@ def category_posts(request, category_slug):
     return render(request, 'blog/category.html', context)
 
 
+@shared_page
+def popular(request, category_slug=None):
+    """Популярное из таблицы, которую заполняет compute_trending."""
+    category = None
+    tags = [TRENDING_TAG, LOCATIONS_TAG]
+    if category_slug is not None:
+        category = get_published_category(category_slug)
+        if category is None:
+            raise Http404("Категория не найдена")
+        tags.append(category_tag(category.slug))
+
+    # Видимость проверяется подзапросом в том же запросе: пост мог быть
+    # скрыт после расчёта.
+    entries = TrendingPost.objects.filter(
+        category=category, post__in=get_published_posts()
+    ).select_related('post__author').order_by('rank')
+    posts = [entry.post for entry in entries]
+    prepare_posts_page(request, posts, *tags)
+    context = {
+        'category': category,
+        'posts': posts,
+    }
+    return render(request, 'blog/popular.html', context)
+
+
+def is_own_profile(request, username):
+    """Владельцу профиль показывает и неопубликованные записи."""
+    return (
+        request.user.is_authenticated
+        and request.user.get_username() == username
+    )
+
+
+@shared_page(personal=is_own_profile)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
 
-    if request.user == author:
-        post_list = Post.objects.filter(author=author)
-    else:
-        post_list = Post.objects.filter(
-            author=author,
-            is_published=True,
-            pub_date__lte=timezone.now()
-        )
+    post_list = get_author_posts(author, request.user).select_related(
+        'author'
+    )
 
     paginator = Paginator(post_list, 10)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    prepare_posts_page(request, page_obj, author_tag(author.username))
 
     context = {
         'profile': author,
@@ -127,6 +269,9 @@ class EditProfileView(UpdateView):
             return redirect('blog:index')
         return super().dispatch(request, *args, **kwargs)
 
+    def form_valid(self, form):
+        return run_write(super().form_valid, form)
+
     def get_success_url(self):
         return reverse(
             'blog:profile',
@@ -143,7 +288,7 @@ class CreatePostView(LoginRequiredMixin, CreateView):
         form.instance.author = self.request.user
         if form.instance.pub_date > timezone.now():
             form.instance.is_published = False
-        return super().form_valid(form)
+        return run_write(super().form_valid, form)
 
     def get_success_url(self):
         return reverse(
@@ -159,14 +304,17 @@ class EditPostView(LoginRequiredMixin, UpdateView):
     pk_url_kwarg = 'post_id'
 
     def get_object(self, queryset=None):
-        post = get_object_or_404(Post, pk=self.kwargs.get('post_id'))
+        post = get_object_or_404(
+            Post.objects.exclude(pk__in=deleting_post_ids()),
+            pk=self.kwargs.get('post_id')
+        )
         return post
 
     def form_valid(self, form):
         # Проверяем, является ли публикация отложенной
         if form.instance.pub_date > timezone.now():
             form.instance.is_published = False
-        return super().form_valid(form)
+        return run_write(super().form_valid, form)
 
     def dispatch(self, request, *args, **kwargs):
         post = self.get_object()
@@ -191,6 +339,9 @@ class DeletePostView(LoginRequiredMixin, DeleteView):
     form_class = PostForm
     template_name = 'blog/create.html'
     pk_url_kwarg = 'post_id'
+    # Без DELETE: DeletionMixin.delete удалил бы пост сразу, мимо
+    # schedule_deletion.
+    http_method_names = ['get', 'post', 'head', 'options']
 
     def get_object(self, queryset=None):
         try:
@@ -203,16 +354,12 @@ class DeletePostView(LoginRequiredMixin, DeleteView):
             raise
 
     def post(self, request, **kwargs):
-        try:
-            self.object = self.get_object()
-            if self.object.author != request.user:
-                return redirect('blog:post_detail', post_id=self.object.pk)
-
-            self.object.delete()
-            return redirect('blog:profile', username=request.user.username)
+        self.object = self.get_object()
+        if self.object.author != request.user:
+            return redirect('blog:post_detail', post_id=self.object.pk)
 
-        except Exception:
-            return redirect('blog:post_detail', post_id=kwargs.get('post_id'))
+        schedule_deletion(self.object)
+        return redirect('blog:profile', username=request.user.username)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -228,15 +375,6 @@ class DeletePostView(LoginRequiredMixin, DeleteView):
         except Http404:
             return HttpResponseNotFound()
 
-    def delete(self, request, *args, **kwargs):
-        try:
-            return super().delete(request, *args, **kwargs)
-        except Exception:
-            return redirect(
-                'blog:post_detail',
-                post_id=self.kwargs.get('post_id')
-            )
-
     def get_success_url(self):
         messages.success(self.request, 'Пост успешно удалён')
         return reverse(
@@ -251,10 +389,15 @@ class CreateCommentView(LoginRequiredMixin, CreateView):
     model = Comment
 
     def form_valid(self, form):
-        post = get_object_or_404(Post, id=self.kwargs['post_id'])
+        post = get_object_or_404(
+            Post.objects.exclude(pk__in=deleting_post_ids()),
+            id=self.kwargs['post_id']
+        )
         form.instance.author = self.request.user
         form.instance.post = post
-        return super().form_valid(form)
+        return run_write(
+            super().form_valid, form, using=router.db_for_write(Comment)
+        )
 
     def get_success_url(self):
         return reverse(
@@ -281,6 +424,11 @@ class EditCommentView(LoginRequiredMixin, UpdateView):
             return redirect('blog:post_detail', post_id=comment.post.pk)
         return super().dispatch(request, *args, **kwargs)
 
+    def form_valid(self, form):
+        return run_write(
+            super().form_valid, form, using=router.db_for_write(Comment)
+        )
+
     def get_success_url(self):
         return reverse(
             'blog:post_detail',
@@ -306,6 +454,11 @@ class DeleteCommentView(LoginRequiredMixin, DeleteView):
             return redirect('blog:post_detail', post_id=comment.post.pk)
         return super().dispatch(request, *args, **kwargs)
 
+    def form_valid(self, form):
+        return run_write(
+            super().form_valid, form, using=router.db_for_write(Comment)
+        )
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Удаляем форму из контекста, если она есть
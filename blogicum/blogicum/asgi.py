@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogicum.settings')
+# Под ASGI страницы чтения асинхронные, без передачи запроса в поток.
+os.environ.setdefault('BLOGICUM_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
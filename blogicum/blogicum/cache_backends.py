@@ -0,0 +1,359 @@
+"""Бэкенды кэша проекта.
+
+``TwoTierCache`` - небольшой LRU в памяти процесса с коротким сроком
+жизни перед общим бэкендом (alias из ``OPTIONS['SHARED']``). Запись идёт
+сквозь оба уровня. В журнал инвалидаций в общем кэше попадают только
+``incr`` (поколения тегов) и ``clear``: от них зависит свежесть всего
+остального. Прочие ``set``/``delete`` журнал не трогают, и копии в
+памяти других процессов доживают свой ``LOCAL_TIMEOUT``. ``FileCache`` -
+файловый кэш с атомарными ``add`` и ``incr``, на которых держатся
+блокировки и поколения тегов.
+Время вызовов ``TwoTierCache`` попадает в заголовок Server-Timing.
+"""
+import os
+import pickle
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+
+from .server_timing import timed
+
+_SEQ_KEY = '__twotier:seq'
+_EVENT_KEY = '__twotier:event:{}'
+_CLEAR_ALL = '*'
+_MAX_EVENTS = 500
+
+
+class FileCache(FileBasedCache):
+    """Файловый кэш с атомарными ``add`` и ``incr`` между процессами."""
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._createdir()
+        fname = self._key_to_file(key, version)
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        try:
+            with open(fd, 'wb') as f:
+                self._write_content(f, timeout, value)
+            for _ in range(2):
+                try:
+                    # Жёсткая ссылка создаётся атомарно или не создаётся.
+                    os.link(tmp_path, fname)
+                    return True
+                except FileExistsError:
+                    # Просроченный файл has_key удалит - пробуем ещё раз.
+                    if self.has_key(key, version):  # noqa: W601
+                        return False
+            return False
+        finally:
+            os.remove(tmp_path)
+
+    def incr(self, key, delta=1, version=None):
+        fname = self._key_to_file(key, version)
+        try:
+            with open(fname, 'r+b') as f:
+                locks.lock(f, locks.LOCK_EX)
+                try:
+                    expiry = pickle.load(f)
+                    if expiry is not None and expiry < time.time():
+                        raise ValueError(f"Key '{key}' not found")
+                    value = pickle.loads(zlib.decompress(f.read()))
+                    value += delta
+                    f.seek(0)
+                    f.truncate()
+                    f.write(pickle.dumps(expiry, self.pickle_protocol))
+                    f.write(zlib.compress(
+                        pickle.dumps(value, self.pickle_protocol)
+                    ))
+                    return value
+                finally:
+                    locks.unlock(f)
+        except FileNotFoundError:
+            raise ValueError(f"Key '{key}' not found")
+
+
+class _LocalTier:
+    """Общий для всех потоков процесса LRU-словарь одного бэкенда."""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.RLock()
+        self.seq = None
+        self.synced_at = 0.0
+        self.stats = dict.fromkeys(
+            ('local_hits', 'local_misses', 'shared_hits', 'shared_misses'), 0
+        )
+
+
+_tiers = {}
+_tiers_lock = threading.Lock()
+_process = {'pid': None, 'token': None}
+
+
+def _process_token():
+    # После fork() у дочернего процесса должен быть свой идентификатор.
+    if _process['pid'] != os.getpid():
+        _process['pid'] = os.getpid()
+        _process['token'] = uuid.uuid4().hex
+    return _process['token']
+
+
+class TwoTierCache(BaseCache):
+    """LRU в памяти процесса перед общим кэшем.
+
+    Параметры ``OPTIONS``: ``SHARED`` - alias общего кэша,
+    ``LOCAL_TIMEOUT`` - срок жизни записи в памяти (секунды),
+    ``LOCAL_MAX_ENTRIES`` - размер LRU, ``SYNC_INTERVAL`` - как часто
+    читать журнал инвалидаций других процессов, ``EVENT_TIMEOUT`` - сколько
+    хранится запись журнала.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', 'shared')
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self._local_max_entries = options.get('LOCAL_MAX_ENTRIES', 1000)
+        self._sync_interval = options.get('SYNC_INTERVAL', 1)
+        self._event_timeout = options.get('EVENT_TIMEOUT', 60)
+        with _tiers_lock:
+            self._tier = _tiers.setdefault(location, _LocalTier())
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    # Локальный уровень.
+
+    def _local_get(self, key):
+        tier = self._tier
+        with tier.lock:
+            item = tier.entries.get(key)
+            if item is None:
+                return None
+            expires, pickled = item
+            if expires < time.monotonic():
+                del tier.entries[key]
+                return None
+            tier.entries.move_to_end(key)
+        return pickled
+
+    def _local_set(self, key, value, timeout):
+        local_timeout = self._local_timeout
+        if timeout is not None:
+            local_timeout = min(local_timeout, timeout)
+        if local_timeout <= 0:
+            self._local_delete(key)
+            return
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        tier = self._tier
+        with tier.lock:
+            tier.entries[key] = (time.monotonic() + local_timeout, pickled)
+            tier.entries.move_to_end(key)
+            while len(tier.entries) > self._local_max_entries:
+                tier.entries.popitem(last=False)
+
+    def _local_delete(self, key):
+        with self._tier.lock:
+            self._tier.entries.pop(key, None)
+
+    def _local_clear(self):
+        with self._tier.lock:
+            self._tier.entries.clear()
+
+    def _count(self, name, n=1):
+        with self._tier.lock:
+            self._tier.stats[name] += n
+
+    # Журнал инвалидаций.
+
+    def _publish(self, *keys):
+        """Сообщает другим процессам, что их копии ``keys`` устарели."""
+        # Сначала догоняем журнал, чтобы своё событие шло сразу за ним.
+        self._sync(force=True)
+        shared = self.shared
+        try:
+            seq = shared.incr(_SEQ_KEY)
+        except ValueError:
+            shared.add(_SEQ_KEY, 0, None)
+            seq = shared.incr(_SEQ_KEY)
+        shared.set(
+            _EVENT_KEY.format(seq), (_process_token(), keys),
+            self._event_timeout
+        )
+        with self._tier.lock:
+            if self._tier.seq == seq - 1:
+                self._tier.seq = seq
+
+    def _sync(self, force=False):
+        tier = self._tier
+        now = time.monotonic()
+        with tier.lock:
+            if not force and now - tier.synced_at < self._sync_interval:
+                return
+            tier.synced_at = now
+            known = tier.seq
+        # Общий кэш читается без блокировки, чтобы не держать потоки,
+        # читающие память процесса.
+        seq = self.shared.get(_SEQ_KEY, 0)
+        if seq == known:
+            return
+        events = None
+        if known is not None and known < seq <= known + _MAX_EVENTS:
+            event_keys = [
+                _EVENT_KEY.format(n) for n in range(known + 1, seq + 1)
+            ]
+            events = self.shared.get_many(event_keys)
+            if len(events) < len(event_keys):
+                # Часть событий потеряна - надёжнее забыть всё.
+                events = None
+        with tier.lock:
+            if tier.seq != known:
+                # Журнал уже прочитал другой поток.
+                return
+            if known is None:
+                # Первая синхронизация: в памяти только то, что процесс
+                # сам записал, и оно свежее журнала.
+                pass
+            elif events is None:
+                # Журнал начат заново или процесс отстал слишком
+                # сильно - проще забыть всё.
+                self._local_clear()
+            else:
+                self._apply_events(events.values())
+            tier.seq = seq
+
+    def _apply_events(self, events):
+        token = _process_token()
+        for origin, keys in events:
+            if origin == token:
+                continue
+            if _CLEAR_ALL in keys:
+                self._local_clear()
+                return
+            for key in keys:
+                self._local_delete(key)
+
+    # API кэша.
+
+    @timed('cache')
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._sync()
+        pickled = self._local_get(key)
+        if pickled is not None:
+            self._count('local_hits')
+            return pickle.loads(pickled)
+        self._count('local_misses')
+        sentinel = object()
+        value = self.shared.get(key, sentinel)
+        if value is sentinel:
+            self._count('shared_misses')
+            return default
+        self._count('shared_hits')
+        self._local_set(key, value, self._local_timeout)
+        return value
+
+    @timed('cache')
+    def get_many(self, keys, version=None):
+        self._sync()
+        result = {}
+        missing = {}
+        for key in keys:
+            full_key = self.make_and_validate_key(key, version=version)
+            pickled = self._local_get(full_key)
+            if pickled is None:
+                missing[full_key] = key
+            else:
+                result[key] = pickle.loads(pickled)
+        self._count('local_hits', len(result))
+        self._count('local_misses', len(missing))
+        if missing:
+            found = self.shared.get_many(list(missing))
+            self._count('shared_hits', len(found))
+            self._count('shared_misses', len(missing) - len(found))
+            for full_key, value in found.items():
+                self._local_set(full_key, value, self._local_timeout)
+                result[missing[full_key]] = value
+        return result
+
+    @timed('cache')
+    def has_key(self, key, version=None):
+        full_key = self.make_and_validate_key(key, version=version)
+        self._sync()
+        return (
+            self._local_get(full_key) is not None
+            or self.shared.has_key(full_key)  # noqa: W601
+        )
+
+    @timed('cache')
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        timeout = self._timeout(timeout)
+        self.shared.set(key, value, timeout)
+        self._local_set(key, value, timeout)
+
+    @timed('cache')
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        timeout = self._timeout(timeout)
+        added = self.shared.add(key, value, timeout)
+        if added:
+            self._local_set(key, value, timeout)
+        return added
+
+    @timed('cache')
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        for key, value in data.items():
+            self.set(key, value, timeout, version)
+        return []
+
+    @timed('cache')
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._local_delete(key)
+        return self.shared.touch(key, self._timeout(timeout))
+
+    @timed('cache')
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        value = self.shared.incr(key, delta)
+        self._local_delete(key)
+        self._publish(key)
+        return value
+
+    @timed('cache')
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._local_delete(key)
+        return self.shared.delete(key)
+
+    @timed('cache')
+    def delete_many(self, keys, version=None):
+        full_keys = [
+            self.make_and_validate_key(key, version=version) for key in keys
+        ]
+        for key in full_keys:
+            self._local_delete(key)
+        self.shared.delete_many(full_keys)
+
+    @timed('cache')
+    def clear(self):
+        self._local_clear()
+        self.shared.clear()
+        self._publish(_CLEAR_ALL)
+
+    def stats(self):
+        """Попадания и промахи каждого уровня в этом процессе."""
+        with self._tier.lock:
+            return {**self._tier.stats, 'local_size': len(self._tier.entries)}
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
@@ -0,0 +1,162 @@
+"""Настройка соединений с базой данных и координация записи.
+
+SQLite допускает одного писателя на файл. ``run_write`` выполняет запись
+в транзакции и при «database is locked» повторяет её с растущей
+случайной паузой, а в режиме ``DB_WRITE_MODE = 'queue'`` ещё и
+выстраивает все записи процесса в один поток. Сколько писатели ждали
+блокировку, показывает ``write_stats()``.
+"""
+import contextvars
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseBusy(Exception):
+    """Запись не удалась: база занята дольше, чем разрешают повторы."""
+
+
+def apply_sqlite_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Обработчик connection_created: профиль PRAGMA для SQLite.
+
+    WAL позволяет читать во время записи, busy_timeout заставляет
+    писателя подождать блокировку вместо «database is locked».
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None)
+    if pragmas:
+        with connection.cursor() as cursor:
+            apply_sqlite_pragmas(cursor, pragmas)
+
+
+def is_lock_error(exc):
+    message = str(exc).lower()
+    return isinstance(exc, OperationalError) and (
+        'locked' in message or 'busy' in message
+    )
+
+
+class WriteStats:
+    """Счётчики ожидания блокировки записи в этом процессе."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.writes = 0
+            self.retries = 0
+            self.failures = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+
+    def record(self, waited, retries, failed=False):
+        with self.lock:
+            self.writes += 1
+            self.retries += retries
+            self.failures += failed
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'writes': self.writes,
+                'retries': self.retries,
+                'failures': self.failures,
+                'total_wait': self.total_wait,
+                'max_wait': self.max_wait,
+                'avg_wait': self.total_wait / self.writes
+                if self.writes else 0.0,
+            }
+
+
+_stats = WriteStats()
+_writer = {'executor': None}
+_writer_lock = threading.Lock()
+
+
+def write_stats():
+    """Сколько записей, повторов и секунд ожидания было в процессе."""
+    return _stats.snapshot()
+
+
+def reset_write_stats():
+    _stats.reset()
+
+
+def _backoff(attempt):
+    # Полный джиттер: писатели, упёршиеся в блокировку одновременно,
+    # не повторяют попытку тоже одновременно.
+    cap = min(
+        settings.DB_WRITE_BACKOFF_MAX,
+        settings.DB_WRITE_BACKOFF * 2 ** attempt
+    )
+    return random.uniform(0, cap)
+
+
+def _write_with_retry(func, args, kwargs, using, started):
+    attempts = settings.DB_WRITE_RETRIES + 1
+    for attempt in range(attempts):
+        attempt_started = time.perf_counter()
+        try:
+            with transaction.atomic(using=using):
+                result = func(*args, **kwargs)
+        except OperationalError as exc:
+            if not is_lock_error(exc):
+                raise
+            if attempt + 1 == attempts:
+                waited = time.perf_counter() - started
+                _stats.record(waited, attempt, failed=True)
+                logger.warning(
+                    'Запись в %s не удалась за %d попыток (%.2f с)',
+                    using, attempts, waited
+                )
+                raise DatabaseBusy(str(exc)) from exc
+            time.sleep(_backoff(attempt))
+        else:
+            _stats.record(attempt_started - started, attempt)
+            return result
+
+
+def _get_writer():
+    with _writer_lock:
+        if _writer['executor'] is None:
+            _writer['executor'] = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix='db-writer'
+            )
+        return _writer['executor']
+
+
+def run_write(func, *args, using=None, **kwargs):
+    """Выполняет запись ``func(*args, **kwargs)`` в транзакции ``using``.
+
+    При блокировке базы повторяет её до ``DB_WRITE_RETRIES`` раз, затем
+    выбрасывает ``DatabaseBusy``. Функция должна быть безопасна для
+    повтора: всё, что она пишет в базу, откатывается вместе с транзакцией.
+    """
+    using = using or DEFAULT_DB_ALIAS
+    started = time.perf_counter()
+    in_writer = threading.current_thread().name.startswith('db-writer')
+    if settings.DB_WRITE_MODE != 'queue' or in_writer:
+        return _write_with_retry(func, args, kwargs, using, started)
+    # Поток-писатель видит контекст запроса (например, маршрут реплик).
+    context = contextvars.copy_context()
+    future = _get_writer().submit(
+        context.run, _write_with_retry, func, args, kwargs, using, started
+    )
+    return future.result()
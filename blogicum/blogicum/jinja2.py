@@ -0,0 +1,68 @@
+"""Окружение Jinja2 для горячих публичных шаблонов.
+
+Подключается настройкой ``TEMPLATE_ENGINE = 'jinja2'``: шаблоны из
+``templates/jinja2`` повторяют шаблоны Django с тем же именем и дают тот
+же HTML, остальные страницы рендерит Django. Вывод ``{{ }}`` проходит
+ту же локализацию, что и в шаблонах Django, а фильтры и теги Django
+доступны как одноимённые фильтры и функции.
+"""
+from django.template import defaultfilters
+from django.templatetags.static import static
+from django.utils.formats import localize
+from django.utils.safestring import mark_safe
+from django.utils.timezone import template_localtime
+from django_bootstrap5.templatetags.django_bootstrap5 import (
+    bootstrap_button, bootstrap_css, bootstrap_form
+)
+from jinja2 import Environment, pass_context
+
+from blog.cards import render_post_cards
+from blog.fast_urls import fast_reverse
+from blog.page_cache import FRAGMENTS, punch_hole
+
+
+def render_value(value):
+    """Как вывод переменной в шаблоне Django."""
+    return localize(template_localtime(value))
+
+
+def date(value, arg=None):
+    return defaultfilters.date(template_localtime(value), arg)
+
+
+def linebreaksbr(value):
+    return defaultfilters.linebreaksbr(value, autoescape=True)
+
+
+@pass_context
+def personal(context, name, *args):
+    """Персональный фрагмент страницы (см. тег ``personal``)."""
+    request = context.get('request')
+    if getattr(request, 'punch_holes', False):
+        return punch_hole(name, args)
+    fragment = FRAGMENTS[name]
+    template = context.environment.get_template(fragment.template)
+    return mark_safe(template.render(
+        {**context.get_all(), **dict(zip(fragment.args, args))}
+    ))
+
+
+def environment(**options):
+    options.setdefault('finalize', render_value)
+    options.setdefault('keep_trailing_newline', True)
+    env = Environment(**options)
+    env.globals.update({
+        'static': static,
+        'url': fast_reverse,
+        'personal': personal,
+        'post_cards': render_post_cards,
+        'bootstrap_css': bootstrap_css,
+        'bootstrap_form': bootstrap_form,
+        'bootstrap_button': bootstrap_button,
+    })
+    env.filters.update({
+        'date': date,
+        'linebreaksbr': linebreaksbr,
+        'truncatewords': defaultfilters.truncatewords,
+    })
+    return env
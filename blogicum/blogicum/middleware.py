@@ -0,0 +1,158 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.deprecation import MiddlewareMixin
+
+from . import (
+    profiling, query_budget, routers, server_timing, template_profiling
+)
+from .db import DatabaseBusy
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """Выбирает базу для чтения и закрепляет писавших за основной."""
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.db_route = routers.start_request(request)
+
+    def process_response(self, request, response):
+        route = getattr(request, 'db_route', None)
+        routers.finish_request()
+        if request.method not in SAFE_METHODS or (route and route.wrote):
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class DatabaseBusyMiddleware(MiddlewareMixin):
+    """Отвечает 503 вместо 500, если запись не дождалась блокировки."""
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, DatabaseBusy):
+            return None
+        response = render(request, 'pages/503.html', status=503)
+        response['Retry-After'] = '1'
+        return response
+
+
+class QueryBudgetMiddleware(MiddlewareMixin):
+    """Считает запросы к базе и их время по представлениям."""
+
+    def process_request(self, request):
+        request.query_counter = query_budget.start_counting()
+
+    def process_response(self, request, response):
+        counter = getattr(request, 'query_counter', None)
+        query_budget.stop_counting()
+        match = request.resolver_match
+        if counter is None or match is None:
+            return response
+        query_budget.record_view(match.view_name, counter)
+        query_budget.check_budget(match.view_name, counter)
+        return response
+
+
+class ServerTimingMiddleware(MiddlewareMixin):
+    """Добавляет Server-Timing: база, шаблоны, кэш и весь ответ."""
+
+    def process_request(self, request):
+        if settings.SERVER_TIMING:
+            request.server_timing = server_timing.start()
+
+    def process_response(self, request, response):
+        timing = getattr(request, 'server_timing', None)
+        if timing is None:
+            return response
+        server_timing.stop()
+        response['Server-Timing'] = server_timing.header(
+            timing, getattr(request, 'query_counter', None)
+        )
+        return response
+
+
+class ProfilingMiddleware:
+    """Профилирует запросы по просьбе сотрудника и выборку по view_name."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        requested = profiling.is_asked(request) and request.user.is_staff
+        name = profiling.profiled_view_name(request, requested)
+        if name is None:
+            return self.get_response(request)
+        with profiling.RequestProfile(request, name) as profile:
+            response = self.get_response(request)
+        return profile.mark(response)
+
+    async def __acall__(self, request):
+        requested = (
+            profiling.is_asked(request) and (await request.auser()).is_staff
+        )
+        name = profiling.profiled_view_name(request, requested)
+        if name is None:
+            return await self.get_response(request)
+        with profiling.RequestProfile(request, name) as profile:
+            response = await self.get_response(request)
+        return profile.mark(response)
+
+
+class TemplateProfilingMiddleware(MiddlewareMixin):
+    """Время шаблонов для сотрудника: панель внизу страницы или JSON.
+
+    Включается параметром ``TEMPLATE_PROFILING_PARAM``; со значением
+    ``json`` вместо страницы отдаётся выгрузка для сравнения прогонов.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        template_profiling.install()
+
+    def process_request(self, request):
+        if (
+            settings.TEMPLATE_PROFILING_PARAM in request.GET
+            and request.user.is_staff
+        ):
+            request.template_profile = template_profiling.start()
+
+    def process_response(self, request, response):
+        profile = getattr(request, 'template_profile', None)
+        if profile is None:
+            return response
+        template_profiling.stop()
+        match = request.resolver_match
+        data = {
+            'path': request.get_full_path(),
+            'view': match.view_name if match else None,
+            'templates': profile.as_list(),
+        }
+        if request.GET[settings.TEMPLATE_PROFILING_PARAM] == 'json':
+            return JsonResponse(data)
+        if (
+            response.streaming
+            or not response.get('Content-Type', '').startswith('text/html')
+        ):
+            return response
+        panel = render_to_string('includes/template_profile.html', data)
+        content = response.content.decode(response.charset)
+        position = content.rfind('</body>')
+        if position == -1:
+            position = len(content)
+        response.content = content[:position] + panel + content[position:]
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = len(response.content)
+        return response
@@ -0,0 +1,151 @@
+"""Профилирование отдельных запросов через cProfile.
+
+Запрос профилируется, если сотрудник прислал заголовок ``X-Profile`` или
+параметр ``_profile``, либо если он попал в выборку по
+``PROFILING_SAMPLE_RATES`` для своего view_name. Рядом с ``.prof`` для
+snakeviz/pstats пишется текстовая сводка: самые дорогие функции и время в
+шаблонах, ORM и SQL. В ``PROFILING_DIR`` хранятся только последние
+``PROFILING_KEEP`` отчётов.
+
+cProfile видит только текущий поток. Под ASGI профиль снимается в
+потоке цикла событий: туда попадают и другие запросы, обработанные за
+это время, а запросы к базе из других потоков - нет. Одновременно
+профилируется только один запрос: остальные обслуживаются как обычно.
+"""
+import cProfile
+import io
+import pstats
+import random
+import re
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.urls import Resolver404, resolve
+from django.utils import timezone
+
+# Разделы сводки: (название, конец пути к файлу, имя функции).
+SECTIONS = (
+    ('шаблоны', 'django/template/backends/django.py', 'render'),
+    ('ORM, выборки', 'django/db/models/query.py', '_fetch_all'),
+    ('SQL', 'django/db/backends/utils.py', '_execute'),
+    ('SQL', 'django/db/backends/utils.py', '_executemany'),
+)
+
+
+def view_name(request):
+    try:
+        return resolve(request.path_info).view_name
+    except Resolver404:
+        return ''
+
+
+def is_asked(request):
+    """Запрос просит профиль; право на это проверяет middleware."""
+    return (
+        settings.PROFILING_HEADER in request.META
+        or settings.PROFILING_PARAM in request.GET
+    )
+
+
+def is_sampled(name):
+    rate = settings.PROFILING_SAMPLE_RATES.get(name, 0)
+    return rate > 0 and random.random() < rate
+
+
+def profiled_view_name(request, requested):
+    """view_name, если запрос надо профилировать, иначе None."""
+    if not requested and not settings.PROFILING_SAMPLE_RATES:
+        return None
+    name = view_name(request)
+    if requested or is_sampled(name):
+        return name
+    return None
+
+
+def section_times(stats):
+    """Суммарное время (cumulative) по разделам сводки."""
+    times = {}
+    for (filename, _, function), entry in stats.stats.items():
+        for title, suffix, name in SECTIONS:
+            if function == name and filename.endswith(suffix):
+                times[title] = times.get(title, 0.0) + entry[3]
+    return times
+
+
+def summary(profiler, request, name, elapsed):
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stream.write(
+        f'{request.method} {request.get_full_path()}\n'
+        f'Представление: {name or "-"}\n'
+        f'Всего: {elapsed * 1000:.1f} мс\n'
+    )
+    for title, seconds in section_times(stats).items():
+        stream.write(f'{title}: {seconds * 1000:.1f} мс\n')
+    stream.write('\n')
+    stats.sort_stats('cumulative').print_stats(settings.PROFILING_TOP)
+    stream.write('\n')
+    stats.sort_stats('tottime').print_stats(settings.PROFILING_TOP)
+    return stream.getvalue()
+
+
+def save_report(profiler, request, name, elapsed):
+    """Пишет .prof и .txt, удаляет старые отчёты; возвращает имя отчёта."""
+    directory = Path(settings.PROFILING_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    report = '{}-{}-{:04d}'.format(
+        timezone.now().strftime('%Y%m%d-%H%M%S-%f'),
+        re.sub(r'[^\w-]', '_', name or 'unknown'),
+        random.randrange(10000),
+    )
+    profiler.dump_stats(directory / f'{report}.prof')
+    (directory / f'{report}.txt').write_text(
+        summary(profiler, request, name, elapsed)
+    )
+    rotate(directory, settings.PROFILING_KEEP)
+    return report
+
+
+def rotate(directory, keep):
+    reports = sorted(directory.glob('*.prof'), key=lambda path: path.name)
+    for path in reports[:max(len(reports) - keep, 0)]:
+        path.unlink(missing_ok=True)
+        path.with_suffix('.txt').unlink(missing_ok=True)
+
+
+_active = threading.Lock()
+
+
+class RequestProfile:
+    """Снимает профиль на время блока ``with`` и сохраняет отчёт."""
+
+    def __init__(self, request, name):
+        self.request = request
+        self.name = name
+        self.profiler = None
+        self.report = None
+
+    def __enter__(self):
+        # Второй профилировщик в процессе помешал бы первому.
+        if _active.acquire(blocking=False):
+            self.profiler = cProfile.Profile()
+            self.started = time.perf_counter()
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.profiler is None:
+            return
+        self.profiler.disable()
+        elapsed = time.perf_counter() - self.started
+        _active.release()
+        self.report = save_report(
+            self.profiler, self.request, self.name, elapsed
+        )
+
+    def mark(self, response):
+        if self.report:
+            response['X-Profile-Id'] = self.report
+        return response
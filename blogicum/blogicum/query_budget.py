@@ -0,0 +1,102 @@
+"""Подсчёт запросов к базе по представлениям и бюджеты запросов.
+
+Каждое соединение получает обёртку выполнения запросов, которая
+отчитывается перед счётчиком текущего запроса из переменной контекста.
+Так считаются и запросы из потоков асинхронных представлений.
+``QueryBudgetMiddleware`` копит итоги по ``resolver_match.view_name`` и
+сверяет их с ``QUERY_BUDGETS``.
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('query_counter', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    """Количество запросов и суммарное время в базе."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.time = 0.0
+
+    def add(self, duration):
+        with self.lock:
+            self.count += 1
+            self.time += duration
+
+
+def count_queries(execute, sql, params, many, context):
+    counter = _current.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        counter.add(time.perf_counter() - started)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """Обработчик connection_created: подключает счётчик к соединению."""
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+def start_counting():
+    counter = QueryCounter()
+    _current.set(counter)
+    return counter
+
+
+def stop_counting():
+    _current.set(None)
+
+
+_views = {}
+_views_lock = threading.Lock()
+
+
+def record_view(view_name, counter):
+    with _views_lock:
+        stats = _views.setdefault(view_name, {
+            'requests': 0, 'queries': 0, 'max_queries': 0, 'db_time': 0.0,
+        })
+        stats['requests'] += 1
+        stats['queries'] += counter.count
+        stats['max_queries'] = max(stats['max_queries'], counter.count)
+        stats['db_time'] += counter.time
+
+
+def view_query_stats():
+    """Итоги по представлениям с начала работы процесса."""
+    with _views_lock:
+        return {name: dict(stats) for name, stats in _views.items()}
+
+
+def reset_view_query_stats():
+    with _views_lock:
+        _views.clear()
+
+
+def check_budget(view_name, counter):
+    """Сверяет запрос с бюджетом; в отладке может выбросить исключение."""
+    budget = settings.QUERY_BUDGETS.get(view_name)
+    if budget is None or counter.count <= budget:
+        return
+    message = (
+        f'{view_name}: {counter.count} запросов к базе при бюджете {budget}'
+    )
+    if settings.DEBUG and settings.QUERY_BUDGET_RAISE:
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
@@ -0,0 +1,131 @@
+"""Маршрутизация запросов между базами данных.
+
+``ModelDatabaseRouter`` держит таблицы с частой записью (``MODEL_DATABASES``)
+в отдельных базах, чтобы их запись не блокировала основную.
+
+``ReplicaRouter``: представления из ``REPLICA_VIEWS`` читают с одной из реплик
+``DATABASE_REPLICAS``, всё остальное и любая запись идут в ``default``.
+Маршрут запроса выбирает ``ReplicaRoutingMiddleware`` и хранит его в
+переменной контекста. Пользователь, который только что что-то записал,
+получает cookie и какое-то время читает с основной базы, чтобы сразу
+увидеть свою публикацию или комментарий, даже если реплика отстаёт.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, models
+
+_route = ContextVar('db_route', default=None)
+
+
+class Route:
+    """Маршрут текущего запроса: реплика для чтения и была ли запись."""
+
+    def __init__(self, replica=None):
+        self.replica = replica
+        self.wrote = False
+        # Транзакции, открытые до начала запроса (например, в тестах).
+        self.atomic_depth = len(connections[DEFAULT_DB_ALIAS].atomic_blocks)
+
+
+def model_database(model):
+    """Отдельная база модели из MODEL_DATABASES или None."""
+    return settings.MODEL_DATABASES.get(model._meta.label_lower)
+
+
+def foreign_key_options(label):
+    """on_delete и db_constraint внешних ключей модели ``label``.
+
+    В основной базе ключи обычные: с ограничениями и каскадным удалением.
+    Из отдельной базы ссылаться ограничениями не на что, поэтому их нет, а
+    удаление вслед за родителем делают сигналы.
+    """
+    if label in settings.MODEL_DATABASES:
+        return {'on_delete': models.DO_NOTHING, 'db_constraint': False}
+    return {'on_delete': models.CASCADE}
+
+
+class ModelDatabaseRouter:
+
+    def db_for_read(self, model, **hints):
+        return model_database(model)
+
+    def db_for_write(self, model, **hints):
+        return model_database(model)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Связи с такими моделями объявлены без ограничений в БД.
+        if model_database(obj1) or model_database(obj2):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        databases = settings.MODEL_DATABASES
+        if model_name is not None:
+            alias = databases.get(f'{app_label}.{model_name}')
+            if alias is not None:
+                return db == alias
+        if db in databases.values():
+            # В отдельной базе только её собственные таблицы.
+            return False
+        return None
+
+
+def is_replica_view(match):
+    views = settings.REPLICA_VIEWS
+    return match is not None and (
+        match.view_name in views or match.namespace in views
+    )
+
+
+def start_request(request):
+    replicas = settings.DATABASE_REPLICAS
+    replica = None
+    if (
+        replicas
+        and request.method in ('GET', 'HEAD')
+        and is_replica_view(request.resolver_match)
+        and settings.REPLICA_STICKY_COOKIE not in request.COOKIES
+    ):
+        # Весь запрос читает с одной реплики, чтобы данные были согласованы.
+        replica = random.choice(replicas)
+    route = Route(replica)
+    _route.set(route)
+    return route
+
+
+def finish_request():
+    _route.set(None)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        route = _route.get()
+        if (
+            route is None or route.replica is None
+            # Внутри транзакции читаем то, что в ней же и записали.
+            or len(connections[DEFAULT_DB_ALIAS].atomic_blocks)
+            > route.atomic_depth
+        ):
+            return DEFAULT_DB_ALIAS
+        return route.replica
+
+    def db_for_write(self, model, **hints):
+        route = _route.get()
+        if route is not None:
+            # После записи до конца запроса читаем с основной базы.
+            route.replica = None
+            route.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии основной базы, связи между ними допустимы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема приходит на реплики вместе с копией основной базы.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,90 @@
+"""Разбивка времени ответа для заголовка ``Server-Timing``.
+
+Запросы к базе считает ``query_budget`` (обёртка выполнения запросов), а
+время шаблонов и кэша - ``measure``: шаблонный бэкенд проекта и
+``TwoTierCache`` оборачивают свои вызовы. Вложенные вызовы одного вида
+(``set_many`` через ``set``) считаются один раз. Без начатого замера
+обёртки стоят одного обращения к переменной контекста.
+"""
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar('server_timing', default=None)
+_inside = ContextVar('server_timing_inside', default=())
+
+
+class Timing:
+    """Время и количество вызовов по видам за один запрос."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.durations = {}
+        self.calls = {}
+
+    def add(self, name, duration):
+        with self.lock:
+            self.durations[name] = self.durations.get(name, 0.0) + duration
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+
+def start():
+    timing = Timing()
+    _current.set(timing)
+    return timing
+
+
+def stop():
+    _current.set(None)
+
+
+@contextmanager
+def measure(name):
+    timing = _current.get()
+    inside = _inside.get()
+    if timing is None or name in inside:
+        yield
+        return
+    token = _inside.set(inside + (name,))
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - started)
+        _inside.reset(token)
+
+
+def timed(name):
+    """Декоратор: время вызова попадает в замер ``name``."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return func(*args, **kwargs)
+            with measure(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def header(timing, query_counter=None):
+    """Значение заголовка: db, tpl, cache и total в миллисекундах."""
+    metrics = []
+    if query_counter is not None:
+        metrics.append(
+            f'db;desc="{query_counter.count} queries";'
+            f'dur={query_counter.time * 1000:.1f}'
+        )
+    if 'tpl' in timing.durations:
+        metrics.append(f'tpl;dur={timing.durations["tpl"] * 1000:.1f}')
+    if 'cache' in timing.durations:
+        metrics.append(
+            f'cache;desc="{timing.calls["cache"]} calls";'
+            f'dur={timing.durations["cache"] * 1000:.1f}'
+        )
+    total = time.perf_counter() - timing.started
+    metrics.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(metrics)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,35 +47,110 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'blogicum.middleware.ServerTimingMiddleware',
+    'blogicum.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'blogicum.middleware.ProfilingMiddleware',
+    'blogicum.middleware.TemplateProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'blogicum.middleware.ReplicaRoutingMiddleware',
+    'blogicum.middleware.DatabaseBusyMiddleware',
 ]
 
 ROOT_URLCONF = 'blogicum.urls'
 
+# Наибольшее число запросов к базе на запрос по view_name
+# (blogicum.middleware.QueryBudgetMiddleware). Превышение пишется в лог,
+# а при DEBUG и QUERY_BUDGET_RAISE - выбрасывает исключение.
+# Запас в два запроса - на перечитывание справочников (blog.reference).
+QUERY_BUDGETS = {
+    'blog:index': 7,
+    'blog:post_detail': 8,
+    'blog:category_posts': 7,
+    'blog:popular': 7,
+    'blog:popular_category': 7,
+    'blog:archive_year': 8,
+    'blog:archive_month': 8,
+    'blog:archive_day': 8,
+    'blog:profile': 8,
+    'blog:create_post': 6,
+    'blog:edit_post': 9,
+    'blog:delete_post': 8,
+    'blog:add_comment': 8,
+    'blog:edit_comment': 7,
+    'blog:delete_comment': 7,
+    'blog:edit_profile': 4,
+    'blog:api_post_list': 3,
+    'blog:api_post_detail': 5,
+    'blog:api_post_comments': 7,
+    'blog:api_category_posts': 3,
+    'blog:api_author_posts': 6,
+    'pages:about': 4,
+    'pages:rules': 4,
+    'registration': 4,
+    'login': 4,
+    'logout': 4,
+    'logout_confirm': 4,
+    'user_state': 4,
+    'password_change': 4,
+    'password_change_done': 4,
+    'password_reset': 4,
+    'password_reset_done': 4,
+    # Сохраняет токен сброса в сессии.
+    'password_reset_confirm': 8,
+    'password_reset_complete': 4,
+}
+QUERY_BUDGET_RAISE = True
+
+# Асинхронные страницы чтения (blog.async_views); включает blogicum/asgi.py.
+ASYNC_READ_VIEWS = os.environ.get('BLOGICUM_ASYNC_VIEWS') == '1'
+
 TEMPLATES_DIR = BASE_DIR / 'templates'
 
-TEMPLATES = [
-    {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
-        'OPTIONS': {
-            'context_processors': [
-                'django.template.context_processors.debug',
-                'django.template.context_processors.request',
-                'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
-            ],
-        },
-    },
+TEMPLATE_CONTEXT_PROCESSORS = [
+    'django.template.context_processors.debug',
+    'django.template.context_processors.request',
+    'django.contrib.auth.context_processors.auth',
+    'django.contrib.messages.context_processors.messages',
 ]
 
+DJANGO_TEMPLATES = {
+    # DjangoTemplates, отмечающий время отрисовки в Server-Timing.
+    'BACKEND': 'blogicum.template_backends.TimedDjangoTemplates',
+    'NAME': 'django',
+    'DIRS': [TEMPLATES_DIR],
+    'APP_DIRS': True,
+    'OPTIONS': {
+        'context_processors': TEMPLATE_CONTEXT_PROCESSORS,
+    },
+}
+
+# Шаблоны из templates/jinja2 (лента, категория, профиль, пост и их
+# включения) перекрывают одноимённые шаблоны Django.
+JINJA2_TEMPLATES = {
+    'BACKEND': 'blogicum.template_backends.TimedJinja2',
+    'NAME': 'jinja2',
+    'DIRS': [TEMPLATES_DIR / 'jinja2'],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        'environment': 'blogicum.jinja2.environment',
+        'context_processors': TEMPLATE_CONTEXT_PROCESSORS,
+    },
+}
+
+# 'django' или 'jinja2' - чем рендерить горячие публичные страницы.
+TEMPLATE_ENGINE = os.environ.get('BLOGICUM_TEMPLATE_ENGINE', 'django')
+
+if TEMPLATE_ENGINE == 'jinja2':
+    TEMPLATES = [JINJA2_TEMPLATES, DJANGO_TEMPLATES]
+else:
+    TEMPLATES = [DJANGO_TEMPLATES]
+
 WSGI_APPLICATION = 'blogicum.wsgi.application'
 
 
@@ -85,9 +161,131 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Соединение живёт между запросами, а не открывается заново.
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        # Транзакция сразу берёт блокировку записи и ждёт её busy_timeout,
+        # а не падает при попытке перейти от чтения к записи.
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
     }
 }
 
+# Профиль SQLite, применяется к каждому новому соединению
+# (blogicum.db.configure_sqlite); сравнить с журналом отката:
+# python manage.py sqlite_bench
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'memory',
+}
+
+# Реплики только для чтения - копии основной базы SQLite, например:
+# BLOGICUM_DB_REPLICAS=replica1.sqlite3,replica2.sqlite3
+# В тестах они смотрят в тестовую копию default (TEST MIRROR).
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+    filter(None, os.environ.get('BLOGICUM_DB_REPLICAS', '').split(',')), 1
+):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / name,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+# Таблицы с частой записью в отдельных файлах SQLite: у каждого файла своя
+# блокировка записи, и поток комментариев не задерживает публикации.
+# BLOGICUM_COMMENTS_DB=comments.sqlite3
+MODEL_DATABASES = {}
+if os.environ.get('BLOGICUM_COMMENTS_DB'):
+    DATABASES['comments'] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / os.environ['BLOGICUM_COMMENTS_DB'],
+    }
+    MODEL_DATABASES['blog.comment'] = 'comments'
+
+# Запись из представлений (blogicum.db.run_write): 'retry' - повтор при
+# «database is locked» с растущей случайной паузой, 'queue' - то же, но все
+# записи процесса идут через один поток. Сравнить: python manage.py
+# write_bench
+DB_WRITE_MODE = 'retry'
+DB_WRITE_RETRIES = 5
+DB_WRITE_BACKOFF = 0.05
+DB_WRITE_BACKOFF_MAX = 1.0
+
+# Удаление публикаций и пользователей (blog.deletion): объект сразу
+# скрывается, а комментарии и посты удаляются пачками в фоновом потоке с
+# паузой между пачками. Прерванные задачи: python manage.py resume_deletions
+DELETION_IN_BACKGROUND = True
+DELETION_BATCH_SIZE = 200
+DELETION_BATCH_PAUSE = 0.01
+
+# Просмотры постов копятся в памяти процесса и раз в столько секунд
+# пишутся в базу пачкой (blog.counters); 0 - только по flush_views().
+VIEW_COUNTS_FLUSH_INTERVAL = 5
+
+# Популярное (blog.trending, python manage.py compute_trending): кандидаты
+# за окно, полураспад веса активности, веса комментария и просмотра и
+# сколько постов хранить для сайта и для каждой категории.
+TRENDING_WINDOW_DAYS = 14
+TRENDING_HALF_LIFE_HOURS = 24
+TRENDING_COMMENT_WEIGHT = 1.0
+TRENDING_VIEW_WEIGHT = 0.05
+TRENDING_SIZE = 20
+
+# «Читайте также» (blog.related, python manage.py compute_related): сколько
+# похожих постов хранить на пост и по сколько строк сравнивать за раз.
+RELATED_POSTS_COUNT = 5
+RELATED_POSTS_CHUNK = 256
+
+DATABASE_ROUTERS = [
+    'blogicum.routers.ModelDatabaseRouter',
+    'blogicum.routers.ReplicaRouter',
+]
+
+# Представления, которые читают с реплик (имя или пространство имён).
+REPLICA_VIEWS = {
+    'blog:index',
+    'blog:category_posts',
+    'blog:profile',
+    'blog:post_detail',
+    'blog:popular',
+    'blog:popular_category',
+    'blog:archive_year',
+    'blog:archive_month',
+    'blog:archive_day',
+    'pages',
+}
+# После записи пользователь столько секунд читает с основной базы.
+REPLICA_STICKY_COOKIE = 'db_primary'
+REPLICA_STICKY_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# default - LRU в памяти процесса перед общим кэшем shared; для
+# нескольких серверов shared переключается на Redis или Memcached.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'blogicum.cache_backends.TwoTierCache',
+        'LOCATION': 'blogicum',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_TIMEOUT': 5,
+            'LOCAL_MAX_ENTRIES': 1000,
+            'SYNC_INTERVAL': 1,
+        },
+    },
+    'shared': {
+        'BACKEND': 'blogicum.cache_backends.FileCache',
+        'LOCATION': BASE_DIR / 'cache',
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -154,3 +352,42 @@ LOGIN_REDIRECT_URL = 'blog:index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
+
+# Время жизни общих (без данных пользователя) тел страниц блога, секунды;
+# 0 - кэш страниц выключен.
+PAGE_CACHE_TIMEOUT = 60
+
+# Сколько секунд после срока хранится устаревшая копия, которую отдают,
+# пока значение пересчитывается или если пересчёт упал.
+CACHE_STALE_TIMEOUT = 300
+
+# Блокировка пересчёта и сколько ждать чужого пересчёта, если копии нет.
+CACHE_LOCK_TIMEOUT = 30
+
+CACHE_LOCK_WAIT = 2
+
+# Заголовок Server-Timing с временем базы, шаблонов, кэша и всего ответа
+# (blogicum.middleware.ServerTimingMiddleware).
+SERVER_TIMING = True
+
+# Профилирование запросов (blogicum.middleware.ProfilingMiddleware).
+# Сотрудник включает его заголовком X-Profile или параметром ?_profile;
+# PROFILING_SAMPLE_RATES задаёт долю профилируемых запросов по view_name,
+# например {'blog:index': 0.001}.
+PROFILING_DIR = BASE_DIR / 'profiles'
+
+PROFILING_KEEP = 100
+
+PROFILING_SAMPLE_RATES = {}
+
+PROFILING_HEADER = 'HTTP_X_PROFILE'
+
+PROFILING_PARAM = '_profile'
+
+# Сколько функций показывать в текстовой сводке.
+PROFILING_TOP = 30
+
+# Параметр запроса, по которому сотрудник видит время каждого шаблона
+# (blogicum.middleware.TemplateProfilingMiddleware); ?_templates=json -
+# выгрузка в JSON.
+TEMPLATE_PROFILING_PARAM = '_templates'
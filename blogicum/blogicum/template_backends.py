@@ -0,0 +1,49 @@
+"""Шаблонные бэкенды, отмечающие время отрисовки в Server-Timing."""
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+from . import server_timing
+
+
+class TimedTemplate(Template):
+
+    def render(self, context=None, request=None):
+        with server_timing.measure('tpl'):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+try:
+    from django.template.backends.jinja2 import Jinja2
+    from django.template.backends.jinja2 import Template as Jinja2Template
+except ImportError:
+    # Без пакета jinja2 бэкенд недоступен, как и сам Jinja2 Django.
+    pass
+else:
+    class TimedJinja2Template(Jinja2Template):
+
+        def render(self, context=None, request=None):
+            with server_timing.measure('tpl'):
+                return super().render(context, request)
+
+    class TimedJinja2(Jinja2):
+
+        def from_string(self, template_code):
+            return TimedJinja2Template(
+                self.env.from_string(template_code), self
+            )
+
+        def get_template(self, template_name):
+            template = super().get_template(template_name)
+            return TimedJinja2Template(template.template, self)
@@ -0,0 +1,92 @@
+"""Время отрисовки каждого шаблона за запрос.
+
+``install`` оборачивает ``django.template.base.Template._render``: через
+него проходят и страницы, и каждый ``{% include %}``, и шаблоны тегов
+вроде ``{% bootstrap_form %}``. Для каждого имени шаблона копятся число
+отрисовок, полное время (вместе с вложенными шаблонами) и собственное
+время. Без начатого замера обёртка стоит одного обращения к переменной
+контекста.
+"""
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.template.base import Template
+
+_current = ContextVar('template_profile', default=None)
+
+
+class TemplateProfile:
+    """Время шаблонов одного запроса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Стек вложенных отрисовок свой у каждого потока.
+        self.local = threading.local()
+        self.templates = {}
+
+    def measure(self, name, render, *args):
+        stack = self.local.__dict__.setdefault('stack', [])
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            return render(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with self.lock:
+                entry = self.templates.setdefault(
+                    name, {'calls': 0, 'cumulative': 0.0, 'self': 0.0}
+                )
+                entry['calls'] += 1
+                entry['cumulative'] += elapsed
+                entry['self'] += elapsed - children
+
+    def as_list(self):
+        """Шаблоны по убыванию собственного времени, время в мс."""
+        with self.lock:
+            rows = [
+                {
+                    'name': name,
+                    'calls': entry['calls'],
+                    'cumulative_ms': round(entry['cumulative'] * 1000, 3),
+                    'self_ms': round(entry['self'] * 1000, 3),
+                }
+                for name, entry in self.templates.items()
+            ]
+        return sorted(rows, key=lambda row: row['self_ms'], reverse=True)
+
+
+def start():
+    profile = TemplateProfile()
+    _current.set(profile)
+    return profile
+
+
+def stop():
+    _current.set(None)
+
+
+def _profiled(render):
+    @wraps(render)
+    def wrapper(self, context):
+        profile = _current.get()
+        if profile is None:
+            return render(self, context)
+        return profile.measure(self.name or '<string>', render, self, context)
+    wrapper.template_profiling = True
+    return wrapper
+
+
+def install():
+    """Подключает замер; повторный вызов ничего не меняет.
+
+    Тестовое окружение Django подменяет ``Template._render`` своей
+    обёрткой, поэтому вызывается при создании middleware, а не при
+    импорте.
+    """
+    if not getattr(Template._render, 'template_profiling', False):
+        Template._render = _profiled(Template._render)
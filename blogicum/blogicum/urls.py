@@ -15,7 +15,7 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from users.views import SignUp, SignIn, LoggedOut
+from users.views import SignUp, SignIn, LoggedOut, UserState
 from django.views.generic import TemplateView
 from django.conf.urls.static import static
 from django.conf import settings
@@ -40,6 +40,7 @@ urlpatterns = [
         TemplateView.as_view(template_name='registration/logged_out.html'),
         name='logout_confirm'
     ),
+    path('auth/state/', UserState.as_view(), name='user_state'),
     path('auth/', include('django.contrib.auth.urls')),
 ] + static(
     settings.MEDIA_URL,
@@ -1,8 +1,14 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 app_name = 'pages'
 
+if settings.ASYNC_READ_VIEWS:
+    AboutView, RulesView = views.AsyncAboutView, views.AsyncRulesView
+else:
+    AboutView, RulesView = views.AboutView, views.RulesView
+
 urlpatterns = [
-    path('about/', views.AboutView.as_view(), name='about'),
-    path('rules/', views.RulesView.as_view(), name='rules'),
+    path('about/', AboutView.as_view(), name='about'),
+    path('rules/', RulesView.as_view(), name='rules'),
 ]
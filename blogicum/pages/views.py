@@ -21,3 +21,19 @@ class AboutView(TemplateView):
 
 class RulesView(TemplateView):
     template_name = 'pages/rules.html'
+
+
+class AsyncTemplateMixin:
+    """Асинхронный обработчик GET для развёртывания через ASGI."""
+
+    async def get(self, request, *args, **kwargs):
+        # Ответ отложенный: шаблон отрендерит обработчик запроса.
+        return super().get(request, *args, **kwargs)
+
+
+class AsyncAboutView(AsyncTemplateMixin, AboutView):
+    pass
+
+
+class AsyncRulesView(AsyncTemplateMixin, RulesView):
+    pass
@@ -5,6 +5,11 @@ from django.urls import reverse_lazy
 from django.contrib.auth import logout
 from django.contrib import messages
 from django.shortcuts import redirect
+from django.http import JsonResponse
+from django.middleware.csrf import get_token
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import never_cache
 from users.forms import CustomUserCreationForm
 
 
@@ -26,3 +31,22 @@ class LoggedOut(View):
         logout(request)
         messages.success(request, 'Вы успешно вышли из системы')
         return redirect('logout_confirm')
+
+
+@method_decorator(never_cache, name='dispatch')
+class UserState(View):
+    """Состояние пользователя для заполнения общих кэшированных страниц."""
+
+    def get(self, request):
+        user = request.user
+        state = {
+            'is_authenticated': user.is_authenticated,
+            'username': user.username if user.is_authenticated else None,
+            'id': user.pk,
+            'profile_url': (
+                reverse('blog:profile', args=[user.username])
+                if user.is_authenticated else None
+            ),
+            'csrf_token': get_token(request),
+        }
+        return JsonResponse(state)
@@ -19,6 +19,7 @@ from typing import (
 import pytest
 from django.apps import apps
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.db.models import Model, Field
 from django.forms import BaseForm
 from django.http import HttpResponse
@@ -41,6 +42,43 @@ def enable_debug_false():
         yield
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Кэш страниц включён, как в настройках; каждый тест начинает с
+    # пустого кэша.
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def inline_deletion():
+    # Фоновый поток не видит данные незавершённой транзакции теста.
+    with override_settings(DELETION_IN_BACKGROUND=False):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def manual_view_counts():
+    # Просмотры пишутся в базу только явным flush_views().
+    with override_settings(VIEW_COUNTS_FLUSH_INTERVAL=0):
+        yield
+
+
+@pytest.fixture
+def page_cache():
+    with override_settings(PAGE_CACHE_TIMEOUT=60):
+        yield
+
+
+@pytest.fixture
+def no_page_cache():
+    # Для сравнения двух рендеров одной страницы: копия из кэша совпала
+    # бы с первым рендером при любых шаблонах.
+    with override_settings(PAGE_CACHE_TIMEOUT=0):
+        yield
+
+
 class SafeImportFromContextManager:
     def __init__(
             self,
@@ -0,0 +1,120 @@
+from http import HTTPStatus
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from blog.models import Comment
+
+from conftest import N_PER_PAGE
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def visible_posts(mixer, user, published_location, published_category):
+    return mixer.cycle(N_PER_PAGE * 2).blend(
+        "blog.Post",
+        author=user,
+        is_published=True,
+        category=published_category,
+        location=published_location,
+    )
+
+
+def test_api_post_list_cursor(client, visible_posts):
+    url = reverse("blog:api_post_list")
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 7}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(url, params)
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        seen.extend(item["id"] for item in data["results"])
+        cursor = data["next"]
+        if not cursor:
+            break
+    expected = sorted(
+        visible_posts, key=lambda post: (post.pub_date, post.id), reverse=True
+    )
+    assert seen == [post.id for post in expected], (
+        "Убедитесь, что курсорная пагинация API возвращает все опубликованные"
+        " посты по одному разу в порядке убывания даты публикации."
+    )
+
+
+def test_api_sparse_fields(client, visible_posts):
+    response = client.get(
+        reverse("blog:api_post_list"), {"fields": "id,title"}
+    )
+    assert response.status_code == HTTPStatus.OK
+    for item in response.json()["results"]:
+        assert set(item) == {"id", "title"}
+
+    response = client.get(
+        reverse("blog:api_post_list"), {"fields": "id,password"}
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_api_etag(client, visible_posts):
+    url = reverse(
+        "blog:api_post_detail", kwargs={"post_id": visible_posts[0].id}
+    )
+    response = client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    etag = response["ETag"]
+    assert response.json()["author"] == visible_posts[0].author.username
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_api_hides_unpublished(
+    client, user_client, mixer, user, published_location, published_category
+):
+    post = mixer.blend(
+        "blog.Post",
+        author=user,
+        is_published=False,
+        category=published_category,
+        location=published_location,
+    )
+    url = reverse("blog:api_post_detail", kwargs={"post_id": post.id})
+    assert client.get(url).status_code == HTTPStatus.NOT_FOUND
+    assert user_client.get(url).status_code == HTTPStatus.OK
+
+    url = reverse("blog:api_post_comments", kwargs={"post_id": post.id})
+    assert client.get(url).status_code == HTTPStatus.NOT_FOUND
+    assert user_client.get(url).status_code == HTTPStatus.OK
+
+
+def test_api_comments_cursor_keeps_microseconds(
+    client, mixer, user, visible_posts
+):
+    post = visible_posts[0]
+    comments = mixer.cycle(6).blend("blog.Comment", post=post, author=user)
+    # Половина комментариев - в одну и ту же микросекунду.
+    same_moment = timezone.now().replace(microsecond=123456)
+    Comment.objects.filter(
+        pk__in=[comment.pk for comment in comments[:3]]
+    ).update(created_at=same_moment)
+    url = reverse("blog:api_post_comments", kwargs={"post_id": post.id})
+    seen = []
+    cursor = None
+    for _ in range(len(comments) + 1):
+        params = {"limit": 1}
+        if cursor:
+            params["cursor"] = cursor
+        data = client.get(url, params).json()
+        seen.extend(item["id"] for item in data["results"])
+        cursor = data["next"]
+        if not cursor:
+            break
+    expected = Comment.objects.filter(post=post).order_by("created_at", "id")
+    assert seen == [comment.id for comment in expected], (
+        "Убедитесь, что курсор хранит время с микросекундами и страницы"
+        " комментариев не повторяются и не теряют строк."
+    )
@@ -0,0 +1,184 @@
+from datetime import datetime, timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from blog.archive import PAGE_SIZE
+from blog.deletion import schedule_deletion
+from blog.models import MonthBucket, Post, month_key
+
+pytestmark = [pytest.mark.django_db]
+
+
+def moment(year, month, day, hour=12):
+    return timezone.make_aware(datetime(year, month, day, hour))
+
+
+def buckets():
+    return {
+        (bucket.year, bucket.month): bucket.count
+        for bucket in MonthBucket.objects.filter(count__gt=0)
+    }
+
+
+@pytest.fixture
+def make_post(mixer, user, published_category, published_location):
+    def make(pub_date, **kwargs):
+        return mixer.blend(
+            "blog.Post", author=user,
+            category=kwargs.pop("category", published_category),
+            location=published_location, pub_date=pub_date,
+            is_published=kwargs.pop("is_published", True), **kwargs
+        )
+    return make
+
+
+def test_buckets_follow_posts(make_post):
+    post = make_post(moment(2024, 5, 3))
+    make_post(moment(2024, 5, 20))
+    draft = make_post(moment(2024, 6, 1), is_published=False)
+    assert buckets() == {(2024, 5): 2}
+
+    draft.is_published = True
+    draft.save()
+    post.pub_date = moment(2024, 4, 30)
+    post.save()
+    assert buckets() == {(2024, 4): 1, (2024, 5): 1, (2024, 6): 1}, (
+        "Убедитесь, что счётчики месяцев меняются при публикации и"
+        " переносе даты поста."
+    )
+
+    post.is_published = False
+    post.save()
+    draft.delete()
+    assert buckets() == {(2024, 5): 1}, (
+        "Убедитесь, что снятый с публикации и удалённый пост вычитается"
+        " из архива."
+    )
+
+
+def test_scheduled_deletion_uncounts_once(make_post):
+    post = make_post(moment(2024, 5, 3))
+    make_post(moment(2024, 5, 4))
+    schedule_deletion(post)
+    assert not Post.objects.filter(pk=post.pk).exists()
+    assert buckets() == {(2024, 5): 1}
+
+
+def test_rebuild_after_bulk_update(make_post):
+    for day in (1, 2, 3):
+        make_post(moment(2023, 12, day))
+    make_post(moment(2024, 1, 1, hour=1))
+    assert buckets() == {(2023, 12): 3, (2024, 1): 1}
+    # update() идёт мимо сигналов.
+    Post.objects.filter(pub_date__year=2023).update(is_published=False)
+    assert MonthBucket.objects.rebuild() == 1
+    assert buckets() == {(2024, 1): 1}
+
+
+def test_month_page_uses_keyset_pagination(settings, client, make_post):
+    posts = [make_post(moment(2024, 5, 1 + number % 28)) for number in range(
+        PAGE_SIZE + 5
+    )]
+    make_post(moment(2024, 6, 1))
+    url = reverse("blog:archive_month", args=[2024, 5])
+    assert url.endswith("/archive/2024/05/")
+
+    seen = []
+    cursor = None
+    while True:
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url, {"before": cursor} if cursor else {})
+        assert response.status_code == 200
+        assert len(queries) <= settings.QUERY_BUDGETS["blog:archive_month"]
+        assert not any(
+            "OFFSET" in query["sql"]
+            or ("GROUP BY" in query["sql"] and "blog_post" in query["sql"])
+            for query in queries
+        ), (
+            "Убедитесь, что архив листается по курсору без OFFSET, а"
+            " месяцы берутся из готовых счётчиков."
+        )
+        seen += [post.id for post in response.context["posts"]]
+        cursor = response.context["next_cursor"]
+        if not cursor:
+            break
+    expected = sorted(posts, key=lambda post: (post.pub_date, post.id))
+    assert seen == [post.id for post in reversed(expected)], (
+        "Убедитесь, что страницы архива идут от новых к старым и без"
+        " повторов."
+    )
+
+
+def test_month_pages_share_one_pub_date(client, make_post):
+    shared = moment(2024, 5, 3).replace(microsecond=654321)
+    posts = [make_post(shared) for _ in range(PAGE_SIZE * 2 + 3)]
+    url = reverse("blog:archive_month", args=[2024, 5])
+    seen = []
+    cursor = None
+    for _ in range(len(posts)):
+        response = client.get(url, {"before": cursor} if cursor else {})
+        seen += [post.id for post in response.context["posts"]]
+        cursor = response.context["next_cursor"]
+        if not cursor:
+            break
+    assert seen == sorted((post.id for post in posts), reverse=True), (
+        "Убедитесь, что посты с одинаковой датой публикации не теряются"
+        " и не повторяются между страницами архива."
+    )
+
+
+def test_year_and_day_pages(client, make_post):
+    may = make_post(moment(2024, 5, 3))
+    june = make_post(moment(2024, 6, 1))
+    make_post(moment(2023, 5, 3))
+    response = client.get(reverse("blog:archive_year", args=[2024]))
+    assert [post.id for post in response.context["posts"]] == [
+        june.id, may.id
+    ]
+    response = client.get(reverse("blog:archive_day", args=[2024, 5, 3]))
+    assert [post.id for post in response.context["posts"]] == [may.id]
+
+
+def test_sidebar_lists_months(client, make_post):
+    make_post(moment(2024, 5, 3))
+    make_post(moment(2024, 5, 4))
+    make_post(moment(2023, 11, 4))
+    content = client.get(
+        reverse("blog:archive_year", args=[2024])
+    ).content.decode()
+    for month, count in (("/archive/2024/05/", 2), ("/archive/2023/11/", 1)):
+        assert f'href="{month}"' in content
+        assert f"({count})" in content
+
+
+@pytest.mark.parametrize("path", [
+    "/archive/2024/13/",
+    "/archive/2024/02/30/",
+    "/archive/2024/05/?before=garbage",
+])
+def test_bad_dates_are_not_found(client, path):
+    assert client.get(path).status_code == 404
+
+
+def test_sidebar_counts_only_visible_posts(client, mixer, make_post):
+    now = timezone.now()
+    this_month = month_key(now - timedelta(minutes=1))
+    make_post(now - timedelta(minutes=1))
+    make_post(now + timedelta(minutes=1))
+    hidden = mixer.blend("blog.Category", is_published=False)
+    make_post(moment(2024, 5, 3), category=hidden)
+    make_post(moment(2024, 6, 3))
+    make_post(moment(2024, 6, 4), category=hidden)
+    response = client.get(reverse("blog:archive_year", args=[2024]))
+    months = {
+        (bucket.year, bucket.month): bucket.count
+        for bucket in response.context["months"]
+    }
+    assert months == {this_month: 1, (2024, 6): 1}, (
+        "Убедитесь, что счётчики архива не включают отложенные посты и"
+        " посты скрытых категорий."
+    )
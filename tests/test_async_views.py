@@ -0,0 +1,130 @@
+import asyncio
+import importlib
+import re
+import threading
+from contextlib import contextmanager
+from http import HTTPStatus
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.test import AsyncClient, override_settings
+from django.urls import clear_url_caches, resolve, reverse
+from django.utils.module_loading import import_string
+
+# Асинхронные представления ходят в базу из других потоков, поэтому
+# данные теста должны быть закоммичены.
+pytestmark = [pytest.mark.django_db(transaction=True)]
+
+CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="[^"]+"')
+
+
+def reload_urls():
+    for name in ("blog.urls", "pages.urls", settings.ROOT_URLCONF):
+        importlib.reload(importlib.import_module(name))
+    clear_url_caches()
+
+
+@contextmanager
+def async_read_views():
+    """Подключает blog.async_views, как под ASGI."""
+    try:
+        with override_settings(ASYNC_READ_VIEWS=True):
+            reload_urls()
+            yield
+    finally:
+        reload_urls()
+
+
+def test_middleware_is_async_capable():
+    for path in settings.MIDDLEWARE:
+        assert getattr(import_string(path), "async_capable", False), (
+            f"Убедитесь, что middleware `{path}` поддерживает асинхронные"
+            " запросы."
+        )
+
+
+def test_async_pages_match_sync(
+    no_page_cache, client, user, post_with_published_location, comment_to_a_post,
+    published_category,
+):
+    post = post_with_published_location
+    urls = [
+        reverse("blog:index"),
+        reverse("blog:post_detail", args=[post.id]),
+        reverse("blog:category_posts", args=[published_category.slug]),
+        reverse("blog:profile", args=[user.username]),
+        reverse("pages:about"),
+        reverse("blog:post_detail", args=[post.id + 100]),
+        reverse("blog:category_posts", args=["no-such-category"]),
+        reverse("blog:profile", args=["no-such-user"]),
+    ]
+    expected = {url: client.get(url) for url in urls}
+    async_client = AsyncClient()
+    with async_read_views():
+        assert asyncio.iscoroutinefunction(resolve(urls[0]).func)
+        for url, response in expected.items():
+            async_response = async_to_sync(async_client.get)(url)
+            assert async_response.status_code == response.status_code, url
+            if response.status_code != HTTPStatus.OK:
+                continue
+            assert CSRF_RE.sub("", async_response.content.decode()) == (
+                CSRF_RE.sub("", response.content.decode())
+            ), (
+                f"Убедитесь, что асинхронная страница {url} совпадает с"
+                " синхронной."
+            )
+
+
+def test_async_page_cache(page_cache, post_with_published_location):
+    async_client = AsyncClient()
+    with async_read_views():
+        first, second = (
+            async_to_sync(async_client.get)(reverse("blog:index"))
+            for _ in range(2)
+        )
+    assert first.status_code == second.status_code == HTTPStatus.OK
+    assert post_with_published_location.title in second.content.decode()
+
+
+def test_async_owner_profile_after_cache_hit(
+    page_cache, mixer, user, published_location, published_category
+):
+    draft = mixer.blend(
+        "blog.Post", author=user, is_published=False,
+        category=published_category, location=published_location,
+    )
+    url = reverse("blog:profile", args=[user.username])
+    owner_client = AsyncClient()
+    owner_client.force_login(user)
+    with async_read_views():
+        anonymous = async_to_sync(AsyncClient().get)(url)
+        owner = async_to_sync(owner_client.get)(url)
+    assert draft.title not in anonymous.content.decode()
+    assert draft.title in owner.content.decode(), (
+        "Убедитесь, что асинхронный профиль не отдаёт владельцу общую"
+        " копию из кэша."
+    )
+
+
+def test_in_thread_closes_connections(monkeypatch):
+    from blog import async_views
+
+    calls = []
+
+    def record(name):
+        calls.append((name, threading.get_ident()))
+
+    monkeypatch.setattr(
+        async_views, "close_old_connections", lambda: record("close")
+    )
+
+    async def call():
+        await async_views.in_thread(record, "query")
+
+    async_to_sync(call)()
+    assert [name for name, _ in calls] == ["close", "query", "close"], (
+        "Убедитесь, что поток пула закрывает устаревшие соединения до и"
+        " после вызова ORM: request_finished до него не доходит."
+    )
+    assert len({ident for _, ident in calls}) == 1
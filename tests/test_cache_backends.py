@@ -0,0 +1,74 @@
+from unittest import mock
+
+import pytest
+from django.core.cache import caches
+
+from blogicum.cache_backends import TwoTierCache
+
+
+def make_tier(location):
+    return TwoTierCache(
+        location, {"OPTIONS": {"SHARED": "shared", "SYNC_INTERVAL": 0}}
+    )
+
+
+@pytest.fixture
+def shared():
+    shared = caches["shared"]
+    shared.clear()
+    yield shared
+    shared.clear()
+
+
+def test_two_tier_stats(shared):
+    tier = make_tier("test-stats")
+    tier.set("category:routine", 1)
+    assert tier.get("category:routine") == 1
+    assert tier.stats()["local_hits"] == 1
+
+    other = make_tier("test-stats-other")
+    assert other.get("category:routine") == 1
+    assert other.get("missing") is None
+    stats = other.stats()
+    assert stats["shared_hits"] == 1
+    assert stats["shared_misses"] == 1
+    assert other.get("category:routine") == 1
+    assert other.stats()["local_hits"] == 1
+
+
+def test_two_tier_invalidation_broadcast(shared):
+    writer = make_tier("test-writer")
+    reader = make_tier("test-reader")
+    writer.set("tag:post:1", 1)
+    assert reader.get("tag:post:1") == 1
+    # Инвалидация из «другого процесса».
+    with mock.patch(
+        "blogicum.cache_backends._process_token", return_value="other"
+    ):
+        writer.incr("tag:post:1")
+    assert reader.get("tag:post:1") == 2, (
+        "Убедитесь, что смена поколения тега в одном процессе сбрасывает"
+        " его копию в памяти других процессов."
+    )
+
+
+def test_two_tier_plain_writes_skip_log(shared):
+    cache = make_tier("test-writer")
+    cache.set("page:a", "a")
+    cache.add("page:b", "b")
+    cache.delete("page:a")
+    cache.delete_many(["page:b"])
+    assert shared.get("__twotier:seq") is None, (
+        "Убедитесь, что обычные set/delete не пишут в журнал инвалидаций:"
+        " туда попадают только смены поколений тегов."
+    )
+
+
+def test_file_cache_atomic_add_and_incr(shared):
+    assert shared.add("lock", 1, 10)
+    assert not shared.add("lock", 2, 10)
+    assert shared.get("lock") == 1
+    shared.set("counter", 5)
+    assert shared.incr("counter", 3) == 8
+    with pytest.raises(ValueError):
+        shared.incr("missing")
@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+from django.db import OperationalError
+
+from blog.cache import get_or_compute, invalidate_tags
+
+
+def test_single_recomputation():
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return "feed"
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(
+                get_or_compute("test:feed", compute, 60)
+            )
+        )
+        for _ in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["feed"] * 10
+    assert len(calls) == 1, (
+        "Убедитесь, что при одновременном промахе значение пересчитывает"
+        " только один обработчик."
+    )
+
+
+def test_stale_while_revalidate():
+    get_or_compute("test:post", lambda: "old", 60, tags=["post:1"])
+    invalidate_tags("post:1")
+    cache.add("test:post:lock", 1, 10)
+    assert get_or_compute("test:post", lambda: "new", 60) == "old"
+    cache.delete("test:post:lock")
+    assert get_or_compute("test:post", lambda: "new", 60) == "new"
+
+
+def test_stale_on_database_error():
+    get_or_compute("test:locked", lambda: "old", 60, tags=["post:2"])
+    invalidate_tags("post:2")
+
+    def compute():
+        raise OperationalError("database is locked")
+
+    assert get_or_compute("test:locked", compute, 60) == "old"
+    cache.delete("test:locked")
+    with pytest.raises(OperationalError):
+        get_or_compute("test:locked", compute, 60)
+
+
+@pytest.mark.parametrize("collected", [False, True])
+def test_invalidation_during_compute(collected):
+    cache.clear()
+    tags = ["post:7"]
+    versions = iter(["old", "new"])
+
+    def compute():
+        value = next(versions)
+        if value == "old":
+            # Пост изменили, пока страница рендерилась.
+            invalidate_tags("post:7")
+        return value
+
+    get_or_compute(
+        "test:race", compute, 60,
+        tags=(lambda value: tags) if collected else tags
+    )
+    assert get_or_compute("test:race", compute, 60, tags=tags) == "new", (
+        "Убедитесь, что значение, посчитанное во время сброса его тега,"
+        " не считается свежим."
+    )
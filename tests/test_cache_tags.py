@@ -0,0 +1,82 @@
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from blog.cache import get_cached, invalidate_tags, set_cached
+
+pytestmark = [pytest.mark.django_db(transaction=True)]
+
+
+def test_invalidate_tag():
+    set_cached("test:a", "a", tags=["post:1", "author:alice"])
+    set_cached("test:b", "b", tags=["post:2"])
+    assert get_cached("test:a") == "a"
+    invalidate_tags("author:alice")
+    assert get_cached("test:a") is None
+    assert get_cached("test:b") == "b"
+
+
+@pytest.mark.parametrize(
+    "page", ["blog:index", "blog:category_posts", "blog:profile"]
+)
+def test_unpublished_category_invalidates_pages(
+    page_cache, client, post_with_published_location, page
+):
+    post = post_with_published_location
+    args = {
+        "blog:index": [],
+        "blog:category_posts": [post.category.slug],
+        "blog:profile": [post.author.username],
+    }[page]
+    url = reverse(page, args=args)
+    post_url = reverse("blog:post_detail", args=[post.id])
+    assert post_url in client.get(url).content.decode()
+
+    post.category.is_published = False
+    post.category.save()
+    response = client.get(url)
+    if page == "blog:profile":
+        assert "Выбранная категория снята с публикации" in (
+            response.content.decode()
+        )
+    elif page == "blog:index":
+        assert post_url not in response.content.decode()
+    else:
+        assert response.status_code == 404
+
+
+def test_new_comment_invalidates_post_page(
+    page_cache, client, mixer, user, post_with_published_location
+):
+    post = post_with_published_location
+    url = reverse("blog:post_detail", args=[post.id])
+    client.get(url)
+    client.get(reverse("blog:index"))
+    mixer.blend(
+        "blog.Comment", post=post, author=user, text="Свежий комментарий"
+    )
+    assert "Свежий комментарий" in client.get(url).content.decode()
+    assert "Комментарии (1)" in client.get(reverse("blog:index")).content.decode()
+
+
+def test_page_rendered_before_commit_is_recomputed(
+    page_cache, client, post_with_published_location
+):
+    post = post_with_published_location
+    url = reverse("blog:post_detail", args=[post.id])
+    with transaction.atomic():
+        post.title = "Новый заголовок"
+        post.save()
+        # Рендер в окне между сохранением и COMMIT: другой процесс здесь
+        # прочитал бы ещё старые строки.
+        client.get(url)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert any(
+        "blog_post" in query["sql"] for query in queries.captured_queries
+    ), (
+        "Убедитесь, что теги кэша сбрасываются после COMMIT: страница,"
+        " отрендеренная до него, не должна считаться свежей."
+    )
+    assert "Новый заголовок" in response.content.decode()
@@ -0,0 +1,106 @@
+import pytest
+from django.conf import settings
+from django.db import connections, models
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from blog.models import Comment, Post
+from blogicum.routers import ModelDatabaseRouter, foreign_key_options
+
+# Комментарии могут лежать в отдельной базе (BLOGICUM_COMMENTS_DB).
+pytestmark = [pytest.mark.django_db(databases="__all__")]
+
+
+@override_settings(MODEL_DATABASES={"blog.comment": "comments"})
+def test_comment_router():
+    router = ModelDatabaseRouter()
+    assert router.db_for_write(Comment) == "comments"
+    assert router.db_for_read(Comment) == "comments"
+    assert router.db_for_read(Post) is None
+    assert router.allow_migrate("comments", "blog", "comment")
+    assert not router.allow_migrate("default", "blog", "comment")
+    assert not router.allow_migrate("comments", "blog", "post")
+    assert router.allow_migrate("default", "blog", "post") is None
+
+
+@pytest.mark.skipif(
+    "comments" in settings.DATABASES,
+    reason="комментарии в отдельной базе (BLOGICUM_COMMENTS_DB)",
+)
+def test_comment_keys_constrained_in_default_database():
+    for name in ("author", "post"):
+        field = Comment._meta.get_field(name)
+        assert field.db_constraint, (
+            "Убедитесь, что в основной базе у внешних ключей комментария"
+            " есть ограничения."
+        )
+        assert field.remote_field.on_delete is models.CASCADE
+
+
+def test_foreign_key_options():
+    with override_settings(MODEL_DATABASES={}):
+        assert foreign_key_options("blog.comment") == {
+            "on_delete": models.CASCADE
+        }
+    with override_settings(MODEL_DATABASES={"blog.comment": "comments"}):
+        assert foreign_key_options("blog.comment") == {
+            "on_delete": models.DO_NOTHING, "db_constraint": False
+        }
+
+
+def test_comments_deleted_with_post_and_author(
+    mixer, user, another_user, post_with_published_location
+):
+    post = post_with_published_location
+    mixer.cycle(3).blend("blog.Comment", post=post, author=another_user)
+    own_post = mixer.blend("blog.Post", author=another_user)
+    mixer.blend("blog.Comment", post=own_post, author=user)
+    post.delete()
+    assert not Comment.objects.filter(post_id=post.id).exists(), (
+        "Убедитесь, что при удалении поста удаляются и его комментарии."
+    )
+    user.delete()
+    assert not Comment.objects.exists(), (
+        "Убедитесь, что при удалении пользователя удаляются и его"
+        " комментарии."
+    )
+
+
+def test_comment_counts_in_one_query(
+    mixer, client, user, many_posts_with_published_locations
+):
+    for post in Post.objects.order_by("-pub_date")[:3]:
+        mixer.cycle(2).blend("blog.Comment", post=post, author=user)
+    comment_db = connections[Comment.objects.db]
+    with CaptureQueriesContext(comment_db) as queries:
+        response = client.get(reverse("blog:index"))
+    assert response.content.decode().count("Комментарии (2)") == 3
+    comment_queries = [
+        query for query in queries.captured_queries
+        if "blog_comment" in query["sql"]
+    ]
+    assert len(comment_queries) == 1, (
+        "Убедитесь, что количество комментариев на странице ленты"
+        " считается одним запросом."
+    )
+
+
+@pytest.mark.skipif(
+    "comments" not in settings.DATABASES,
+    reason="база комментариев задаётся переменной BLOGICUM_COMMENTS_DB",
+)
+def test_comments_live_in_separate_database(
+    user_client, post_with_published_location
+):
+    post = post_with_published_location
+    user_client.post(
+        reverse("blog:add_comment", args=[post.id]),
+        data={"text": "Отдельная база"},
+    )
+    comment = Comment.objects.using("comments").get()
+    assert comment.post == post
+    response = user_client.get(reverse("blog:post_detail", args=[post.id]))
+    assert "Отдельная база" in response.content.decode()
+    post.delete()
+    assert not Comment.objects.using("comments").exists()
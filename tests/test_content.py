@@ -19,7 +19,7 @@ from conftest import (
     _testget_context_item_by_key,
 )
 
-pytestmark = [pytest.mark.django_db]
+pytestmark = [pytest.mark.django_db(transaction=True)]
 
 
 class ContentTester(ABC):
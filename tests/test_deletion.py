@@ -0,0 +1,231 @@
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models.signals import post_delete, pre_delete
+from django.urls import reverse
+
+from blog import deletion
+from blog.deletion import deletion_progress, schedule_deletion
+from blog.models import Comment, DeletionJob, MonthBucket, Post
+
+pytestmark = [pytest.mark.django_db]
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def small_batches(settings):
+    settings.DELETION_BATCH_SIZE = 3
+    settings.DELETION_BATCH_PAUSE = 0
+
+
+@pytest.fixture
+def progress():
+    events = []
+
+    def record(sender, job, **kwargs):
+        events.append((job.status, job.deleted, job.total))
+
+    deletion_progress.connect(record)
+    yield events
+    deletion_progress.disconnect(record)
+
+
+def test_post_deleted_in_batches(
+    mixer, user, another_user, post_with_published_location, progress
+):
+    post = post_with_published_location
+    mixer.cycle(7).blend("blog.Comment", post=post, author=another_user)
+    other = mixer.blend("blog.Comment", author=another_user)
+    job = schedule_deletion(post)
+    assert job.status == DeletionJob.DONE
+    assert (job.deleted, job.total) == (8, 8)
+    assert not Post.objects.filter(pk=post.pk).exists()
+    assert list(Comment.objects.all()) == [other]
+    # Три пачки комментариев, пост и итог задачи.
+    assert [deleted for _, deleted, _ in progress] == [3, 6, 7, 8, 8], (
+        "Убедитесь, что комментарии удаляются пачками по"
+        " DELETION_BATCH_SIZE и после каждой отправляется прогресс."
+    )
+
+
+def test_user_deleted_in_batches(mixer, user, another_user):
+    posts = mixer.cycle(4).blend("blog.Post", author=user)
+    mixer.cycle(2).blend("blog.Comment", post=posts[0], author=another_user)
+    mixer.cycle(2).blend("blog.Comment", post=posts[1], author=user)
+    other_post = mixer.blend("blog.Post", author=another_user)
+    mixer.blend("blog.Comment", post=other_post, author=user)
+    kept = mixer.blend("blog.Comment", post=other_post, author=another_user)
+    job = schedule_deletion(user)
+    assert job.status == DeletionJob.DONE
+    assert (job.deleted, job.total) == (10, 10)
+    assert not User.objects.filter(pk=user.pk).exists()
+    assert list(Post.objects.all()) == [other_post]
+    assert list(Comment.objects.all()) == [kept]
+
+
+def test_object_hidden_until_deleted(
+    settings, mixer, user, post_with_published_location
+):
+    settings.DELETION_IN_BACKGROUND = True
+    post = post_with_published_location
+    mixer.cycle(2).blend("blog.Comment", post=post, author=user)
+    # Транзакция теста не завершается, поэтому поток не запускается.
+    job = schedule_deletion(post)
+    assert job.status == DeletionJob.PENDING
+    post.refresh_from_db()
+    assert not post.is_published, (
+        "Убедитесь, что пост скрывается сразу, до удаления в фоне."
+    )
+    assert schedule_deletion(post) == job
+    schedule_deletion(user)
+    user.refresh_from_db()
+    assert not user.is_active
+
+    call_command("resume_deletions", stdout=None)
+    assert not DeletionJob.objects.exclude(status=DeletionJob.DONE).exists()
+    assert not Post.objects.exists()
+    assert not User.objects.filter(pk=user.pk).exists()
+    assert not Comment.objects.exists()
+
+
+def test_failed_job_can_be_resumed(
+    monkeypatch, mixer, user, post_with_published_location
+):
+    post = post_with_published_location
+    mixer.cycle(5).blend("blog.Comment", post=post, author=user)
+    calls = []
+    advance = deletion._advance
+
+    def fail_after_first_batch(job, count):
+        advance(job, count)
+        calls.append(count)
+        if len(calls) == 1:
+            raise RuntimeError("сбой")
+
+    monkeypatch.setattr(deletion, "_advance", fail_after_first_batch)
+    job = schedule_deletion(post)
+    assert job.status == DeletionJob.FAILED
+    assert "сбой" in job.error
+    assert Comment.objects.count() == 2
+    post.refresh_from_db()
+    assert post.is_published, (
+        "Убедитесь, что после ошибки удаления пост снова опубликован."
+    )
+    assert MonthBucket.objects.get().count == 1
+
+    call_command("resume_deletions", "--failed", stdout=None)
+    job.refresh_from_db()
+    assert job.status == DeletionJob.DONE
+    assert (job.deleted, job.total) == (6, 6)
+    assert not Post.objects.filter(pk=post.pk).exists()
+    assert MonthBucket.objects.get().count == 0
+
+
+def test_failed_user_deletion_restores_user(
+    monkeypatch, mixer, user, post_with_published_location
+):
+    draft = mixer.blend("blog.Post", author=user, is_published=False)
+
+    def fail(job):
+        raise RuntimeError("сбой")
+
+    monkeypatch.setattr(deletion, "_delete_user", fail)
+    job = schedule_deletion(user)
+    assert job.status == DeletionJob.FAILED
+    user.refresh_from_db()
+    assert user.is_active, (
+        "Убедитесь, что после ошибки удаления пользователь снова активен."
+    )
+    assert Post.objects.get(pk=post_with_published_location.pk).is_published
+    assert not Post.objects.get(pk=draft.pk).is_published, (
+        "Убедитесь, что черновик автора после ошибки остаётся черновиком."
+    )
+
+
+def test_comment_raw_delete_is_safe():
+    # Комментарии удаляются пачкой через _raw_delete, мимо сборщика
+    # каскада и сигналов (blog.deletion._delete_comments).
+    assert not Comment._meta.related_objects, (
+        "На комментарии теперь ссылаются другие модели: удаляйте их пачки"
+        " через delete()."
+    )
+    for signal in (pre_delete, post_delete):
+        receivers = [
+            receiver.__name__
+            for group in signal._live_receivers(Comment)
+            for receiver in group
+        ]
+        assert set(receivers) <= {"invalidate_comment"}, (
+            "У удаления комментария появились обработчики: удаляйте их"
+            " пачки через delete()."
+        )
+
+
+def test_delete_post_view(
+    mixer, user, user_client, post_with_published_location
+):
+    post = post_with_published_location
+    mixer.cycle(4).blend("blog.Comment", post=post, author=user)
+    response = user_client.post(reverse("blog:delete_post", args=[post.id]))
+    assert response.status_code == 302
+    assert not Post.objects.filter(pk=post.pk).exists()
+    assert not Comment.objects.exists()
+    assert DeletionJob.objects.get().status == DeletionJob.DONE
+
+
+def test_delete_method_not_allowed(user_client, post_with_published_location):
+    post = post_with_published_location
+    response = user_client.delete(reverse("blog:delete_post", args=[post.id]))
+    assert response.status_code == 405
+    assert Post.objects.filter(pk=post.pk).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_background_deletion(settings, mixer, user, another_user):
+    settings.DELETION_IN_BACKGROUND = True
+    post = mixer.blend("blog.Post", author=user)
+    mixer.cycle(5).blend("blog.Comment", post=post, author=another_user)
+    job = schedule_deletion(post)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        job.refresh_from_db()
+        if job.status not in DeletionJob.ACTIVE:
+            break
+        time.sleep(0.05)
+    assert job.status == DeletionJob.DONE, (
+        "Убедитесь, что удаление выполняется в фоновом потоке."
+    )
+    assert not Post.objects.exists()
+    assert not Comment.objects.exists()
+
+
+def test_post_being_deleted_hidden_from_author(
+    settings, user_client, post_with_published_location
+):
+    # Задача остаётся в очереди: on_commit в транзакции теста не сработает.
+    settings.DELETION_IN_BACKGROUND = True
+    post = post_with_published_location
+    job = schedule_deletion(post)
+    assert job.status == DeletionJob.PENDING
+    profile = user_client.get(reverse("blog:profile", args=[post.author]))
+    assert post.title not in profile.content.decode(), (
+        "Убедитесь, что удаляемый пост не показывается в профиле автора."
+    )
+    for name in (
+        "blog:post_detail", "blog:edit_post", "blog:api_post_detail",
+        "blog:api_post_comments",
+    ):
+        assert user_client.get(
+            reverse(name, args=[post.id])
+        ).status_code == 404, (
+            f"Убедитесь, что страница {name} удаляемого поста недоступна"
+            " и автору."
+        )
+    response = user_client.post(
+        reverse("blog:add_comment", args=[post.id]), {"text": "Ещё"}
+    )
+    assert response.status_code == 404
+    assert not Comment.objects.filter(post=post).exists()
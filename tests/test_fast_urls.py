@@ -0,0 +1,91 @@
+import pytest
+from django.template import engines
+from django.urls import NoReverseMatch, reverse, set_script_prefix
+
+from blog.fast_urls import _compile, fast_path, fast_reverse
+
+
+@pytest.mark.parametrize(
+    "name, args",
+    [
+        ("blog:index", []),
+        ("pages:about", []),
+        ("blog:post_detail", [1]),
+        ("blog:post_detail", ["42"]),
+        ("blog:edit_comment", [3, 7]),
+        ("blog:category_posts", ["travel-2_x"]),
+        ("blog:profile", ["user"]),
+        ("blog:profile", ["Автор.Тест+1@x"]),
+        ("blog:profile", ["a b?c#d%e&f"]),
+    ],
+)
+def test_fast_reverse_matches_reverse(name, args):
+    assert fast_reverse(name, *args) == reverse(name, args=args), (
+        f"Убедитесь, что fast_reverse для {name} совпадает с reverse."
+    )
+
+
+@pytest.mark.parametrize(
+    "name, args",
+    [
+        ("blog:post_detail", [-1]),
+        ("blog:post_detail", ["abc"]),
+        ("blog:post_detail", [True]),
+        ("blog:category_posts", ["не-slug"]),
+        ("blog:profile", ["a/b"]),
+        ("blog:profile", [""]),
+        ("blog:post_detail", []),
+        ("blog:missing", []),
+    ],
+)
+def test_unusual_arguments_fall_back_to_reverse(name, args):
+    with pytest.raises(NoReverseMatch):
+        reverse(name, args=args)
+    with pytest.raises(NoReverseMatch):
+        fast_reverse(name, *args)
+
+
+def test_kwargs_use_reverse():
+    assert fast_reverse("blog:post_detail", post_id=5) == reverse(
+        "blog:post_detail", args=[5]
+    )
+
+
+def test_script_prefix():
+    fast_reverse("blog:post_detail", 1)
+    set_script_prefix("/blog/")
+    try:
+        assert fast_reverse("blog:post_detail", 1) == reverse(
+            "blog:post_detail", args=[1]
+        )
+        assert fast_reverse("blog:post_detail", 1).startswith("/blog/")
+    finally:
+        set_script_prefix("/")
+
+
+def test_script_prefix_cold_cache():
+    _compile.cache_clear()
+    set_script_prefix("/blog/")
+    try:
+        assert fast_path("blog:post_detail", 1) == "posts/1/", (
+            "Убедитесь, что быстрый путь работает и под префиксом скрипта."
+        )
+        assert fast_reverse("blog:post_detail", 1) == reverse(
+            "blog:post_detail", args=[1]
+        ) == "/blog/posts/1/"
+    finally:
+        set_script_prefix("/")
+        _compile.cache_clear()
+
+
+def test_fast_url_tag_escapes():
+    html = engines["django"].from_string(
+        "{% load fast_urls %}{% fast_url 'blog:profile' name %}"
+    ).render({"name": "a&b"})
+    assert html == reverse("blog:profile", args=["a&b"]).replace("&", "&amp;")
+
+
+def test_fast_path_returns_none_for_unusual_arguments():
+    assert fast_path("blog:post_detail", 5) == "posts/5/"
+    assert fast_path("blog:post_detail", "abc") is None
+    assert fast_path("blog:missing") is None
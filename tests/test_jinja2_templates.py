@@ -0,0 +1,79 @@
+import re
+
+import pytest
+from django.conf import settings as django_settings
+from django.urls import reverse
+
+pytest.importorskip("jinja2")
+
+pytestmark = [
+    pytest.mark.django_db, pytest.mark.usefixtures("no_page_cache")
+]
+
+CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="[^"]+"')
+
+
+def use_engine(settings, engine):
+    if engine == "jinja2":
+        settings.TEMPLATES = [
+            django_settings.JINJA2_TEMPLATES,
+            django_settings.DJANGO_TEMPLATES,
+        ]
+    else:
+        settings.TEMPLATES = [django_settings.DJANGO_TEMPLATES]
+
+
+def render_both(settings, client, url):
+    pages = {}
+    for engine in ("django", "jinja2"):
+        use_engine(settings, engine)
+        response = client.get(url)
+        assert response.status_code == 200
+        pages[engine] = CSRF_RE.sub("csrf", response.content.decode())
+    return pages
+
+
+@pytest.fixture
+def pages(
+    mixer, user, another_user, many_posts_with_published_locations,
+    post_with_published_location, published_category,
+):
+    post = post_with_published_location
+    post.text = "Первая строка\nвторая <строка>"
+    post.save()
+    mixer.blend("blog.Comment", post=post, author=user, text="Мой\nответ")
+    mixer.blend("blog.Comment", post=post, author=another_user)
+    user.first_name = "Имя"
+    user.save()
+    return [
+        reverse("blog:index"),
+        reverse("blog:index") + "?page=2",
+        reverse("blog:category_posts", args=[published_category.slug]),
+        reverse("blog:profile", args=[user.username]),
+        reverse("blog:profile", args=[another_user.username]),
+        reverse("blog:post_detail", args=[post.id]),
+    ]
+
+
+@pytest.mark.parametrize("visitor", ["client", "user_client"])
+def test_jinja2_matches_django(settings, request, pages, visitor):
+    client = request.getfixturevalue(visitor)
+    for url in pages:
+        rendered = render_both(settings, client, url)
+        assert rendered["jinja2"] == rendered["django"], (
+            f"Убедитесь, что страница {url} в Jinja2 совпадает с шаблоном"
+            " Django."
+        )
+
+
+def test_jinja2_with_page_cache(settings, page_cache, user_client, pages):
+    for url in pages:
+        rendered = render_both(settings, user_client, url)
+        assert rendered["jinja2"] == rendered["django"]
+
+
+def test_other_pages_fall_back_to_django(settings, client):
+    use_engine(settings, "jinja2")
+    response = client.get(reverse("pages:about"))
+    assert response.status_code == 200
+    assert "Блогикум" in response.content.decode()
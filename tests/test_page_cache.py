@@ -0,0 +1,155 @@
+import re
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from blog.cache import invalidate_tags
+
+pytestmark = [pytest.mark.django_db]
+
+CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="[^"]+"')
+
+
+def get_content(client, url):
+    response = client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    return CSRF_RE.sub("", response.content.decode())
+
+
+def test_shared_body_personal_fragments(
+    page_cache, user, another_user, user_client, another_user_client,
+    unlogged_client, post_with_published_location, comment_to_a_post,
+):
+    post = post_with_published_location
+    url = reverse("blog:post_detail", args=[post.id])
+    edit_url = reverse("blog:edit_post", args=[post.id])
+
+    author_content = get_content(user_client, url)
+    assert edit_url in author_content
+    assert "<!--personal:" not in author_content
+
+    other_content = get_content(another_user_client, url)
+    assert edit_url not in other_content, (
+        "Убедитесь, что закэшированная страница поста не показывает"
+        " кнопки редактирования другим пользователям."
+    )
+    assert another_user.username in other_content
+    assert "Оставить комментарий" in other_content
+
+    anonymous_content = get_content(unlogged_client, url)
+    assert reverse("login") in anonymous_content
+    assert "Оставить комментарий" not in anonymous_content
+    assert "<!--personal:" not in anonymous_content
+
+
+def test_cached_page_matches_uncached(
+    page_cache, user_client, post_with_published_location, comment_to_a_post
+):
+    url = reverse("blog:post_detail", args=[post_with_published_location.id])
+    with override_settings(PAGE_CACHE_TIMEOUT=0):
+        expected = get_content(user_client, url)
+    assert get_content(user_client, url) == expected
+    assert get_content(user_client, url) == expected
+
+
+def test_hidden_post_not_shared(
+    page_cache, mixer, user, user_client, another_user_client,
+    published_location, published_category,
+):
+    post = mixer.blend(
+        "blog.Post",
+        author=user,
+        is_published=False,
+        category=published_category,
+        location=published_location,
+    )
+    url = reverse("blog:post_detail", args=[post.id])
+    assert user_client.get(url).status_code == HTTPStatus.OK
+    assert another_user_client.get(url).status_code == HTTPStatus.NOT_FOUND
+
+
+def test_owner_profile_after_cache_hit(
+    page_cache, mixer, user, user_client, unlogged_client,
+    published_location, published_category,
+):
+    draft = mixer.blend(
+        "blog.Post",
+        author=user,
+        is_published=False,
+        category=published_category,
+        location=published_location,
+    )
+    url = reverse("blog:profile", args=[user.username])
+    assert draft.title not in get_content(unlogged_client, url)
+    assert draft.title in get_content(user_client, url), (
+        "Убедитесь, что владелец видит свои черновики в профиле, даже если"
+        " общая копия страницы уже в кэше."
+    )
+    assert draft.title not in get_content(unlogged_client, url)
+
+
+def renders(client, url):
+    """Рендерит ли страница заново, а не берёт копию из кэша."""
+    with CaptureQueriesContext(connection) as queries:
+        client.get(url)
+    return any(
+        "blog_post" in query["sql"] for query in queries.captured_queries
+    )
+
+
+def test_sticky_reader_bypasses_page_cache(
+    page_cache, client, post_with_published_location
+):
+    url = reverse("blog:post_detail", args=[post_with_published_location.id])
+    assert renders(client, url)
+    assert not renders(client, url)
+    client.cookies["db_primary"] = "1"
+    assert renders(client, url), (
+        "Убедитесь, что недавно писавший пользователь получает страницу с"
+        " основной базы, а не общую копию из кэша."
+    )
+    assert renders(client, url)
+
+
+# Роль реплики играет сама основная база: важен только маршрут запроса.
+@override_settings(DATABASE_REPLICAS=["default"])
+def test_replica_page_not_cached_right_after_invalidation(
+    page_cache, settings, client, post_with_published_location
+):
+    url = reverse("blog:post_detail", args=[post_with_published_location.id])
+    invalidate_tags("feed")
+    assert renders(client, url)
+    assert renders(client, url), (
+        "Убедитесь, что страница, прочитанная с реплики сразу после сброса"
+        " тегов, не попадает в общий кэш."
+    )
+    settings.REPLICA_STICKY_SECONDS = 0
+    assert renders(client, url)
+    assert not renders(client, url)
+
+
+def test_unused_query_params_share_one_entry(
+    page_cache, client, many_posts_with_published_locations
+):
+    url = reverse("blog:index")
+    assert renders(client, url + "?x=1")
+    assert not renders(client, url + "?x=2"), (
+        "Убедитесь, что параметры, которые страница не читает, не"
+        " создают новых записей в кэше страниц."
+    )
+    assert not renders(client, url)
+    assert renders(client, url + "?page=2&x=1")
+    assert not renders(client, url + "?x=3&page=2")
+
+
+def test_user_state(user, user_client, unlogged_client):
+    state = user_client.get(reverse("user_state")).json()
+    assert state["is_authenticated"]
+    assert state["username"] == user.username
+    assert state["csrf_token"]
+    state = unlogged_client.get(reverse("user_state")).json()
+    assert not state["is_authenticated"]
@@ -0,0 +1,69 @@
+import pytest
+from django.template import engines
+from django.urls import reverse
+
+from blog.cards import render_post_cards
+
+pytestmark = [pytest.mark.django_db]
+
+INCLUDE_LOOP = (
+    '{% for post in posts %}\n'
+    '    <article class="mb-5">\n'
+    '      {% include "includes/post_card.html" %}\n'
+    '    </article>\n'
+    '  {% endfor %}'
+)
+
+
+def render_with_include(posts):
+    return engines["django"].from_string(INCLUDE_LOOP).render(
+        {"posts": posts}
+    )
+
+
+@pytest.fixture
+def varied_posts(mixer, published_category, published_location):
+    author = mixer.blend("auth.User", username="Автор.Тест+1@x")
+    hidden_category = mixer.blend("blog.Category", is_published=False)
+    hidden_location = mixer.blend("blog.Location", is_published=False)
+    posts = [
+        mixer.blend(
+            "blog.Post", author=author, category=published_category,
+            location=published_location,
+            title='<b>"Заголовок" & ко</b>',
+            text="Слово " * 30 + "<script>",
+        ),
+        mixer.blend(
+            "blog.Post", category=published_category, location=None,
+            image="post_images/фото 1.jpg",
+        ),
+        mixer.blend(
+            "blog.Post", category=hidden_category,
+            location=hidden_location,
+        ),
+        mixer.blend(
+            "blog.Post", category=published_category, is_published=False,
+            text="Короткий",
+        ),
+    ]
+    for number, post in enumerate(posts):
+        post.comment_count = number * 1000
+    return posts
+
+
+def test_cards_match_include(varied_posts):
+    assert render_post_cards(varied_posts) == render_with_include(
+        varied_posts
+    ), "Убедитесь, что карточки совпадают с шаблоном post_card.html."
+
+
+def test_feed_pages_use_cards(client, many_posts_with_published_locations):
+    post = many_posts_with_published_locations[0]
+    for url in (
+        reverse("blog:index"),
+        reverse("blog:category_posts", args=[post.category.slug]),
+        reverse("blog:profile", args=[post.author.username]),
+    ):
+        response = client.get(url)
+        posts = list(response.context["page_obj"])
+        assert render_post_cards(posts) in response.content.decode()
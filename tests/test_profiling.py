@@ -0,0 +1,69 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def profiles(settings, tmp_path):
+    settings.PROFILING_DIR = tmp_path
+    return tmp_path
+
+
+@pytest.fixture
+def staff_client(mixer):
+    staff = mixer.blend("auth.User", is_staff=True)
+    client = Client()
+    client.force_login(staff)
+    return client
+
+
+def test_staff_profiles_with_header(
+    staff_client, profiles, post_with_published_location
+):
+    response = staff_client.get(reverse("blog:index"), HTTP_X_PROFILE="1")
+    report = response["X-Profile-Id"]
+    assert (profiles / f"{report}.prof").exists()
+    summary = (profiles / f"{report}.txt").read_text()
+    assert "blog:index" in summary
+    assert "шаблоны" in summary, (
+        "Убедитесь, что сводка профиля показывает время в шаблонах."
+    )
+    assert "SQL" in summary
+
+
+def test_query_flag(staff_client, profiles):
+    response = staff_client.get(reverse("pages:about") + "?_profile")
+    assert "X-Profile-Id" in response
+
+
+def test_others_are_not_profiled(user_client, client, profiles):
+    for visitor in (user_client, client):
+        response = visitor.get(reverse("blog:index"), HTTP_X_PROFILE="1")
+        assert "X-Profile-Id" not in response
+    assert not list(profiles.iterdir()), (
+        "Убедитесь, что профилировать запросы могут только сотрудники."
+    )
+
+
+def test_sampling_by_view(client, settings, profiles):
+    settings.PROFILING_SAMPLE_RATES = {"pages:rules": 1}
+    assert "X-Profile-Id" in client.get(reverse("pages:rules"))
+    assert "X-Profile-Id" not in client.get(reverse("pages:about"))
+
+
+def test_reports_rotate(client, settings, profiles):
+    settings.PROFILING_SAMPLE_RATES = {"pages:rules": 1}
+    settings.PROFILING_KEEP = 2
+    for _ in range(4):
+        client.get(reverse("pages:rules"))
+    assert len(list(profiles.glob("*.prof"))) == 2
+    assert len(list(profiles.glob("*.txt"))) == 2
+
+
+def test_async_requests_are_profiled(settings, profiles):
+    settings.PROFILING_SAMPLE_RATES = {"pages:rules": 1}
+    response = async_to_sync(AsyncClient().get)(reverse("pages:rules"))
+    assert (profiles / f"{response['X-Profile-Id']}.prof").exists()
@@ -0,0 +1,194 @@
+import logging
+
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth.tokens import default_token_generator
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from blogicum.query_budget import (
+    QueryBudgetExceeded, reset_view_query_stats, view_query_stats
+)
+
+pytestmark = [pytest.mark.django_db]
+
+# Маршрут -> функция, строящая аргументы URL из данных теста.
+URLS = {
+    "blog:index": lambda data: [],
+    "blog:post_detail": lambda data: [data["post"].id],
+    "blog:category_posts": lambda data: [data["category"].slug],
+    "blog:popular": lambda data: [],
+    "blog:popular_category": lambda data: [data["category"].slug],
+    "blog:archive_year": lambda data: [data["post"].pub_date.year],
+    "blog:archive_month": lambda data: [
+        data["post"].pub_date.year, data["post"].pub_date.month
+    ],
+    "blog:archive_day": lambda data: [
+        data["post"].pub_date.year, data["post"].pub_date.month,
+        data["post"].pub_date.day
+    ],
+    "blog:profile": lambda data: [data["author"].username],
+    "blog:create_post": lambda data: [],
+    "blog:edit_post": lambda data: [data["post"].id],
+    "blog:delete_post": lambda data: [data["post"].id],
+    "blog:edit_comment": lambda data: [data["post"].id, data["comment"].id],
+    "blog:delete_comment": lambda data: [
+        data["post"].id, data["comment"].id
+    ],
+    "blog:edit_profile": lambda data: [],
+    "blog:api_post_list": lambda data: [],
+    "blog:api_post_detail": lambda data: [data["post"].id],
+    "blog:api_post_comments": lambda data: [data["post"].id],
+    "blog:api_category_posts": lambda data: [data["category"].slug],
+    "blog:api_author_posts": lambda data: [data["author"].username],
+    "pages:about": lambda data: [],
+    "pages:rules": lambda data: [],
+    "registration": lambda data: [],
+    "login": lambda data: [],
+    "logout": lambda data: [],
+    "logout_confirm": lambda data: [],
+    "user_state": lambda data: [],
+    "password_change": lambda data: [],
+    "password_change_done": lambda data: [],
+    "password_reset": lambda data: [],
+    "password_reset_done": lambda data: [],
+    "password_reset_confirm": lambda data: [
+        urlsafe_base64_encode(force_bytes(data["author"].pk)),
+        default_token_generator.make_token(data["author"]),
+    ],
+    "password_reset_complete": lambda data: [],
+}
+
+
+@pytest.fixture
+def realistic_data(
+    mixer, user, another_user, many_posts_with_published_locations,
+    post_with_published_location, comment_to_a_post, published_category,
+):
+    """Две страницы ленты, у каждой публикации - по три комментария."""
+    for post in many_posts_with_published_locations:
+        mixer.cycle(2).blend("blog.Comment", post=post, author=another_user)
+        mixer.blend("blog.Comment", post=post, author=user)
+    mixer.cycle(3).blend(
+        "blog.Comment", post=post_with_published_location, author=user
+    )
+    return {
+        "post": post_with_published_location,
+        "comment": comment_to_a_post,
+        "category": published_category,
+        "author": user,
+    }
+
+
+def collect_view_names(resolver, namespace=""):
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.namespace == "admin":
+                continue
+            inner = pattern.namespace or ""
+            yield from collect_view_names(
+                pattern, f"{namespace}{inner}:" if inner else namespace
+            )
+        elif pattern.name:
+            yield namespace + pattern.name
+
+
+def test_every_url_has_budget():
+    missing = set(collect_view_names(get_resolver())) - set(URLS)
+    # GET формы комментария отдельно не используется: форма на странице
+    # поста, а сам маршрут принимает только отправку.
+    missing.discard("blog:add_comment")
+    assert not missing, (
+        "Убедитесь, что для каждого маршрута блога, статических страниц и"
+        f" пользователей задан бюджет запросов: {sorted(missing)}."
+    )
+    for name in URLS:
+        assert name in settings.QUERY_BUDGETS
+
+
+@pytest.mark.parametrize("name", URLS)
+def test_query_budget(
+    name, realistic_data, client, user_client, another_user_client,
+    django_assert_max_num_queries,
+):
+    url = reverse(name, args=URLS[name](realistic_data))
+    budget = settings.QUERY_BUDGETS[name]
+    for visitor in (client, user_client, another_user_client):
+        # Бюджет - на рендер страницы, а не на копию из кэша.
+        cache.clear()
+        with django_assert_max_num_queries(budget):
+            response = visitor.get(url)
+        # Ошибка или 404 уложатся в любой бюджет - меряем только
+        # настоящую страницу или редирект с неё.
+        assert response.status_code in (200, 302), (
+            f"{name}: ответ {response.status_code} вместо страницы"
+            " или редиректа."
+        )
+
+
+def test_add_comment_budget(
+    realistic_data, user_client, django_assert_max_num_queries
+):
+    url = reverse("blog:add_comment", args=[realistic_data["post"].id])
+    with django_assert_max_num_queries(
+        settings.QUERY_BUDGETS["blog:add_comment"]
+    ):
+        response = user_client.post(url, data={"text": "Ещё комментарий"})
+    assert response.status_code == 302
+
+
+def test_middleware_records_views(client, post_with_published_location):
+    reset_view_query_stats()
+    client.get(reverse("blog:index"))
+    client.get(reverse("blog:index"))
+    stats = view_query_stats()["blog:index"]
+    assert stats["requests"] == 2
+    assert stats["queries"] >= 2
+    assert stats["db_time"] > 0
+
+
+def test_budget_exceeded(
+    client, settings, caplog, post_with_published_location
+):
+    settings.QUERY_BUDGETS = {"blog:index": 0}
+    # Бюджет проверяется на рендере, а не на копии из кэша страниц.
+    settings.PAGE_CACHE_TIMEOUT = 0
+    with caplog.at_level(logging.WARNING, "blogicum.query_budget"):
+        response = client.get(reverse("blog:index"))
+    assert response.status_code == 200, (
+        "Убедитесь, что вне отладки превышение бюджета только"
+        " записывается в лог, а страница отдаётся как обычно."
+    )
+    assert "blog:index" in caplog.text
+
+    settings.DEBUG = True
+    caplog.clear()
+    with pytest.raises(QueryBudgetExceeded, match="blog:index.*бюджете 0"):
+        client.get(reverse("blog:index"))
+    assert not [
+        record for record in caplog.records
+        if record.name == "blogicum.query_budget"
+    ], (
+        "Убедитесь, что в строгом режиме превышение бюджета выбрасывает"
+        " исключение, а не уходит в лог."
+    )
+
+    settings.QUERY_BUDGET_RAISE = False
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, "blogicum.query_budget"):
+        response = client.get(reverse("blog:index"))
+    assert response.status_code == 200
+    assert "blog:index" in caplog.text
+
+
+def test_budget_respected_in_strict_mode(
+    client, settings, caplog, post_with_published_location
+):
+    settings.DEBUG = True
+    settings.PAGE_CACHE_TIMEOUT = 0
+    with caplog.at_level(logging.WARNING, "blogicum.query_budget"):
+        response = client.get(reverse("blog:index"))
+    assert response.status_code == 200
+    assert "blog:index" not in caplog.text
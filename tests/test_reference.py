@@ -0,0 +1,56 @@
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from blog.reference import get_published_category, get_reference
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_category_lookup_without_queries(
+    published_category, django_assert_num_queries
+):
+    get_reference()
+    with django_assert_num_queries(0):
+        category = get_published_category(published_category.slug)
+    assert category == published_category
+    assert get_published_category("no-such-category") is None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reference_refreshes_on_save(published_category):
+    assert get_published_category(published_category.slug)
+    published_category.is_published = False
+    published_category.save()
+    assert get_published_category(published_category.slug) is None, (
+        "Убедитесь, что справочник категорий обновляется после сохранения"
+        " категории."
+    )
+
+
+def test_feed_does_not_join_reference_tables(
+    client, post_with_published_location
+):
+    get_reference()
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse("blog:index"))
+    assert post_with_published_location.title in response.content.decode()
+    for query in queries.captured_queries:
+        assert "blog_category" not in query["sql"]
+        assert "blog_location" not in query["sql"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reference_loaded_before_commit_is_reloaded(
+    published_category, django_assert_num_queries
+):
+    with transaction.atomic():
+        published_category.title = "Новое название"
+        published_category.save()
+        # Перечитывание в окне до COMMIT: другой процесс загрузил бы здесь
+        # ещё старые строки.
+        get_reference()
+    with django_assert_num_queries(2):
+        category = get_published_category(published_category.slug)
+    assert category.title == "Новое название"
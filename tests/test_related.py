@@ -0,0 +1,149 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+from blog.models import Post, RelatedPost  # noqa: E402
+from blog.related import (  # noqa: E402
+    build_matrix, compute_related, nearest, tokenize
+)
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_tokenize_skips_stop_words_and_short_words():
+    assert tokenize("Это кот и ПЁС, 2024 cats") == ["кот", "пёс", "cats"]
+
+
+def test_nearest_orders_by_similarity():
+    matrix = build_matrix([
+        "сад яблоня груша",
+        "сад яблоня слива",
+        "сад вишня",
+        "море песок",
+    ])
+    blocks = list(nearest(matrix, np.arange(4), count=2, chunk=3))
+    assert [len(block) for block in blocks] == [3, 1], (
+        "Убедитесь, что строки сравниваются пачками по chunk."
+    )
+    first = blocks[0][0]
+    assert first[0] == 0
+    assert first[1].tolist() == [1, 2], (
+        "Убедитесь, что соседи упорядочены по убыванию сходства."
+    )
+    assert blocks[1][0][1].tolist() == [], (
+        "Убедитесь, что посты без общих слов не считаются похожими."
+    )
+
+
+@pytest.fixture
+def garden(mixer, user, published_category, published_location):
+    def post(title, text, **kwargs):
+        return mixer.blend(
+            "blog.Post", author=user, category=published_category,
+            location=published_location, title=title, text=text,
+            pub_date=timezone.now() - timedelta(hours=1),
+            is_published=kwargs.pop("is_published", True), **kwargs
+        )
+
+    return {
+        "apple": post("Яблоня", "сад яблоня урожай осень"),
+        "pear": post("Груша", "сад груша урожай осень"),
+        "plum": post("Слива", "сад слива урожай"),
+        "sea": post("Море", "море песок пляж"),
+        "hidden": post("Черновик", "сад яблоня урожай", is_published=False),
+    }
+
+
+def related_ids(post):
+    return list(
+        RelatedPost.objects.filter(post=post)
+        .order_by("rank").values_list("related_id", flat=True)
+    )
+
+
+def test_compute_related(settings, garden):
+    settings.RELATED_POSTS_COUNT = 2
+    assert compute_related() == 4
+    assert related_ids(garden["apple"]) == [
+        garden["pear"].id, garden["plum"].id
+    ], (
+        "Убедитесь, что сохраняются RELATED_POSTS_COUNT самых похожих"
+        " опубликованных постов."
+    )
+    assert related_ids(garden["sea"]) == []
+    assert not RelatedPost.objects.filter(post=garden["hidden"]).exists()
+
+
+def test_incremental_run_recomputes_changed(settings, garden):
+    settings.RELATED_POSTS_COUNT = 2
+    compute_related()
+    assert compute_related() == 1, (
+        "Убедитесь, что без изменений повторный запуск пересчитывает"
+        " только посты без списка похожих."
+    )
+
+    sea = garden["sea"]
+    sea.text = "сад груша урожай осень"
+    sea.save()
+    assert compute_related() < 4
+    assert sea.id in related_ids(garden["pear"]), (
+        "Убедитесь, что изменённый пост попадает в списки похожих на него."
+    )
+    assert related_ids(sea)[0] == garden["pear"].id
+
+    assert compute_related(full=True) == 4
+
+
+@pytest.mark.parametrize("appears", ["scheduled", "unhidden"])
+def test_incremental_run_picks_up_newly_visible(settings, garden, appears):
+    settings.RELATED_POSTS_COUNT = 2
+    hidden = garden["hidden"]
+    if appears == "scheduled":
+        Post.objects.filter(pk=hidden.pk).update(
+            is_published=True, pub_date=timezone.now() + timedelta(days=1)
+        )
+    compute_related()
+    # update() не трогает updated_at, как и наступление даты публикации.
+    pub_date = timezone.now() if appears == "scheduled" else hidden.pub_date
+    Post.objects.filter(pk=hidden.pk).update(
+        is_published=True, pub_date=pub_date
+    )
+    compute_related()
+    assert related_ids(hidden)[0] == garden["apple"].id, (
+        "Убедитесь, что пост, ставший видимым после расчёта, получает"
+        " свой список похожих."
+    )
+    assert hidden.id in related_ids(garden["apple"]), (
+        "Убедитесь, что пост, ставший видимым после расчёта, попадает в"
+        " списки похожих на него."
+    )
+
+
+def test_detail_shows_related_posts(settings, client, garden):
+    compute_related()
+    Post.objects.filter(pk=garden["plum"].pk).update(is_published=False)
+    url = reverse("blog:post_detail", args=[garden["apple"].id])
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert len(queries) <= settings.QUERY_BUDGETS["blog:post_detail"]
+    assert response.context["related_posts"] == [garden["pear"]], (
+        "Убедитесь, что в «Читайте также» нет скрытых после расчёта постов."
+    )
+    content = response.content.decode()
+    assert "Читайте также" in content
+    assert reverse("blog:post_detail", args=[garden["pear"].id]) in content
+    related_queries = [
+        query for query in queries
+        if "blog_relatedpost" in query["sql"]
+    ]
+    assert len(related_queries) == 1, (
+        "Убедитесь, что похожие посты читаются готовым списком одним"
+        " запросом."
+    )
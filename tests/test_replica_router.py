@@ -0,0 +1,87 @@
+import pytest
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from blog.models import Post
+from blogicum.middleware import ReplicaRoutingMiddleware
+from blogicum.routers import ReplicaRouter
+
+pytestmark = [pytest.mark.django_db]
+
+router = ReplicaRouter()
+
+
+def route_request(request, action=None):
+    """Проводит запрос через middleware, возвращает базу для чтения."""
+    request.resolver_match = resolve(request.path)
+    middleware = ReplicaRoutingMiddleware(lambda request: HttpResponse())
+    middleware.process_view(request, None, (), {})
+    try:
+        if action:
+            action()
+        return router.db_for_read(Post)
+    finally:
+        request.response = middleware.process_response(
+            request, HttpResponse()
+        )
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+def test_read_views_use_replica():
+    factory = RequestFactory()
+    for url in (reverse("blog:index"), reverse("pages:about")):
+        assert route_request(factory.get(url)) == "replica"
+    assert router.db_for_read(Post) == "default", (
+        "Убедитесь, что после ответа маршрут запроса сбрасывается."
+    )
+    assert route_request(factory.get(reverse("blog:create_post"))) == (
+        "default"
+    )
+    assert router.db_for_write(Post) == "default"
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+def test_reads_stick_to_primary_after_write():
+    factory = RequestFactory()
+    request = factory.get(reverse("blog:index"))
+    assert route_request(
+        request, lambda: router.db_for_write(Post)
+    ) == "default", (
+        "Убедитесь, что после записи запрос читает с основной базы."
+    )
+    assert "db_primary" in request.response.cookies
+
+    request = factory.get(reverse("blog:index"), HTTP_COOKIE="db_primary=1")
+    assert route_request(request) == "default", (
+        "Убедитесь, что пользователь, который недавно писал, читает с"
+        " основной базы."
+    )
+
+
+def test_write_sets_sticky_cookie(user_client, post_with_published_location):
+    response = user_client.post(
+        reverse("blog:add_comment", args=[post_with_published_location.id]),
+        data={"text": "Комментарий"},
+    )
+    assert "db_primary" in response.cookies
+
+
+@pytest.mark.skipif(
+    not settings.DATABASE_REPLICAS,
+    reason="реплики задаются переменной окружения BLOGICUM_DB_REPLICAS",
+)
+@pytest.mark.django_db(transaction=True, databases="__all__")
+def test_index_reads_from_configured_replica(
+    client, post_with_published_location
+):
+    replica = connections[settings.DATABASE_REPLICAS[0]]
+    with CaptureQueriesContext(replica) as queries:
+        response = client.get(reverse("blog:index"))
+    assert post_with_published_location.title in response.content.decode()
+    assert queries.captured_queries, (
+        "Убедитесь, что главная страница читает с реплики."
+    )
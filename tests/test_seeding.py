@@ -0,0 +1,72 @@
+from collections import Counter
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+
+from blog.models import Category, Comment, Post
+from blog.seeding import seed_blog
+
+pytestmark = [pytest.mark.django_db]
+
+
+def seed_small(**kwargs):
+    return seed_blog(
+        users=5, categories=2, locations=2, posts=40, comments=400,
+        batch_size=7, **kwargs
+    )
+
+
+def test_seed_counts():
+    summary = seed_small()
+    assert summary == {
+        "users": 5, "categories": 2, "locations": 2, "posts": 40,
+        "images": 0, "comments": 400,
+    }
+    assert Post.objects.count() == 40
+    assert Comment.objects.count() == 400
+
+
+def test_seed_is_deterministic():
+    seed_small(seed=3, prefix="a")
+    first = list(Post.objects.order_by("pk").values_list("title", "text"))
+    Post.objects.all().delete()
+    seed_small(seed=3, prefix="b")
+    second = list(Post.objects.order_by("pk").values_list("title", "text"))
+    assert first == second, (
+        "Убедитесь, что одинаковый seed даёт одинаковые данные."
+    )
+
+
+def test_comments_follow_zipf():
+    seed_small()
+    counts = sorted(
+        Counter(Comment.objects.values_list("post_id", flat=True)).values(),
+        reverse=True,
+    )
+    assert counts[0] > 5 * counts[len(counts) // 2], (
+        "Убедитесь, что комментарии сосредоточены на немногих постах."
+    )
+
+
+def test_seed_images(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    seed_small(images=2, image_share=1)
+    assert Post.objects.filter(image="").count() == 0
+    assert len(list((tmp_path / "post_images").iterdir())) == 2
+
+
+def test_seeded_pages_render(client):
+    seed_small()
+    category = Category.objects.first()
+    assert client.get(reverse("blog:index")).status_code == 200
+    assert client.get(
+        reverse("blog:category_posts", args=[category.slug])
+    ).status_code == 200
+
+
+def test_seed_command_refuses_duplicate_prefix():
+    call_command("seed", scale=0.001, categories=1, locations=1)
+    assert Post.objects.count() == 100
+    with pytest.raises(CommandError):
+        call_command("seed", scale=0.001, categories=1, locations=1)
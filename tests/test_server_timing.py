@@ -0,0 +1,53 @@
+import re
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+pytestmark = [pytest.mark.django_db]
+
+METRIC_RE = re.compile(r'(\w+);(?:desc="([^"]*)";)?dur=([\d.]+)')
+
+
+def metrics(response):
+    return {
+        name: (desc, float(duration))
+        for name, desc, duration in METRIC_RE.findall(
+            response["Server-Timing"]
+        )
+    }
+
+
+def test_server_timing_header(client, post_with_published_location):
+    url = reverse("blog:post_detail", args=[post_with_published_location.id])
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    timing = metrics(response)
+    assert set(timing) == {"db", "tpl", "cache", "total"}, (
+        "Убедитесь, что Server-Timing содержит время базы, шаблонов, кэша"
+        " и всего ответа."
+    )
+    assert timing["db"][0] == f"{len(queries)} queries"
+    assert timing["total"][1] >= timing["tpl"][1]
+
+
+def test_cached_page_timing(
+    client, page_cache, post_with_published_location
+):
+    client.get(reverse("blog:index"))
+    timing = metrics(client.get(reverse("blog:index")))
+    assert timing["db"][0] == "0 queries"
+    assert int(timing["cache"][0].split()[0]) > 0
+
+
+def test_server_timing_can_be_disabled(client, settings):
+    settings.SERVER_TIMING = False
+    assert "Server-Timing" not in client.get(reverse("pages:about"))
+
+
+def test_async_server_timing():
+    response = async_to_sync(AsyncClient().get)(reverse("pages:rules"))
+    assert "tpl" in metrics(response)
@@ -0,0 +1,49 @@
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def staff_client(mixer):
+    client = Client()
+    client.force_login(mixer.blend("auth.User", is_staff=True))
+    return client
+
+
+def test_json_export(staff_client, mixer, post_with_published_location):
+    post = post_with_published_location
+    mixer.cycle(3).blend("blog.Comment", post=post)
+    response = staff_client.get(
+        reverse("blog:post_detail", args=[post.id]) + "?_templates=json"
+    )
+    data = response.json()
+    assert data["view"] == "blog:post_detail"
+    templates = {row["name"]: row for row in data["templates"]}
+    actions = templates["includes/personal/comment_actions.html"]
+    assert actions["calls"] == 3, (
+        "Убедитесь, что каждое включение шаблона учитывается отдельно."
+    )
+    comments = templates["includes/comments.html"]
+    assert comments["cumulative_ms"] >= comments["self_ms"]
+    assert comments["cumulative_ms"] >= actions["cumulative_ms"]
+
+
+def test_panel_for_staff(
+    staff_client, page_cache, post_with_published_location
+):
+    url = reverse("blog:post_detail", args=[post_with_published_location.id])
+    staff_client.get(url + "?_templates")
+    content = staff_client.get(url + "?_templates").content.decode()
+    assert "includes/comments.html" in content, (
+        "Убедитесь, что панель показывает шаблоны и при включённом кэше"
+        " страниц."
+    )
+    assert content.rstrip().endswith("</html>")
+
+
+def test_hidden_from_others(user_client, client):
+    url = reverse("pages:about") + "?_templates"
+    for visitor in (user_client, client):
+        assert "includes/footer.html" not in visitor.get(url).content.decode()
@@ -0,0 +1,141 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+np = pytest.importorskip("numpy")
+
+from blog.models import Comment, Post, TrendingPost  # noqa: E402
+from blog.trending import (  # noqa: E402
+    compute_trending, score_posts, top_posts
+)
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_score_decays_with_age(settings):
+    settings.TRENDING_HALF_LIFE_HOURS = 24
+    settings.TRENDING_COMMENT_WEIGHT = 1.0
+    settings.TRENDING_VIEW_WEIGHT = 0.5
+    now = timezone.now()
+    day = 24 * 3600
+    scores = score_posts(
+        published=np.array([now.timestamp(), now.timestamp() - day]),
+        views=np.array([0.0, 4.0]),
+        comment_posts=np.array([0, 0, 1]),
+        commented=np.array([
+            now.timestamp(), now.timestamp() - day, now.timestamp() - day
+        ]),
+        now=now,
+    )
+    assert scores == pytest.approx([1.5, 0.5 + 0.5 * 4 * 0.5]), (
+        "Убедитесь, что вес комментария и просмотра убывает вдвое за"
+        " TRENDING_HALF_LIFE_HOURS."
+    )
+
+
+def test_top_posts_per_site_and_category():
+    scores = np.array([5.0, 0.0, 3.0, 3.0, 1.0, 4.0])
+    published = np.array([0.0, 0.0, 1.0, 2.0, 0.0, 0.0])
+    categories = np.array([1, 1, 2, 2, -1, 1])
+    site, by_category = top_posts(scores, published, categories, size=2)
+    assert site.tolist() == [0, 5]
+    assert {key: value.tolist() for key, value in by_category.items()} == {
+        1: [0, 5],
+        # При равной оценке выше более новый пост.
+        2: [3, 2],
+    }
+
+
+@pytest.fixture
+def activity(mixer, user, another_user, published_location):
+    now = timezone.now()
+    categories = mixer.cycle(2).blend("blog.Category", is_published=True)
+
+    def post(category, comments, **kwargs):
+        post = mixer.blend(
+            "blog.Post", author=user, category=category,
+            location=published_location,
+            pub_date=kwargs.pop("pub_date", now - timedelta(hours=1)),
+            is_published=kwargs.pop("is_published", True), **kwargs
+        )
+        for _ in range(comments):
+            mixer.blend("blog.Comment", post=post, author=another_user)
+        return post
+
+    return {
+        "categories": categories,
+        "hot": post(categories[0], 5),
+        "warm": post(categories[1], 3),
+        "viewed": post(categories[0], 0, views=40),
+        "quiet": post(categories[1], 0),
+        "hidden": post(categories[0], 9, is_published=False),
+        "old": post(categories[1], 9, pub_date=now - timedelta(days=60)),
+    }
+
+
+def trending_ids(category=None):
+    return list(
+        TrendingPost.objects.filter(category=category)
+        .order_by("rank").values_list("post_id", flat=True)
+    )
+
+
+def test_compute_trending(activity):
+    first, second = activity["categories"]
+    assert compute_trending() == 6
+    assert trending_ids() == [
+        activity["hot"].id, activity["warm"].id, activity["viewed"].id
+    ], (
+        "Убедитесь, что популярное упорядочено по оценке и не включает"
+        " скрытые, старые и посты без активности."
+    )
+    assert trending_ids(first) == [activity["hot"].id, activity["viewed"].id]
+    assert trending_ids(second) == [activity["warm"].id]
+
+    Comment.objects.filter(post=activity["hot"]).delete()
+    compute_trending()
+    assert trending_ids() == [activity["warm"].id, activity["viewed"].id]
+
+
+def test_popular_page_reads_one_list(settings, client, activity):
+    compute_trending()
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse("blog:popular"))
+    assert response.status_code == 200
+    assert len(queries) <= settings.QUERY_BUDGETS["blog:popular"]
+    assert [post.id for post in response.context["posts"]] == trending_ids()
+    trending_queries = [
+        query for query in queries
+        if "blog_trendingpost" in query["sql"]
+    ]
+    assert len(trending_queries) == 1, (
+        "Убедитесь, что страница популярного читает готовый список одним"
+        " запросом."
+    )
+
+
+def test_popular_category_page(client, activity):
+    first, _ = activity["categories"]
+    compute_trending()
+    Post.objects.filter(pk=activity["viewed"].pk).update(is_published=False)
+    response = client.get(reverse("blog:popular_category", args=[first.slug]))
+    assert [post.id for post in response.context["posts"]] == [
+        activity["hot"].id
+    ], "Убедитесь, что скрытые после расчёта посты не показываются."
+    assert client.get(
+        reverse("blog:popular_category", args=["no-such-category"])
+    ).status_code == 404
+
+
+@pytest.mark.django_db(transaction=True)
+def test_recompute_refreshes_cached_page(page_cache, client, activity):
+    url = reverse("blog:popular")
+    assert activity["hot"].title not in client.get(url).content.decode()
+    compute_trending()
+    assert activity["hot"].title in client.get(url).content.decode(), (
+        "Убедитесь, что пересчёт сбрасывает кэш страницы популярного."
+    )
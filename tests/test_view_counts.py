@@ -0,0 +1,117 @@
+import pytest
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from blog import counters
+from blog.counters import flush_views, pending_views, record_view
+from blog.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def clean_counts():
+    counters._counts.clear()
+    yield
+    counters._counts.clear()
+
+
+def views_in_db(post):
+    return Post.objects.values_list("views", flat=True).get(pk=post.pk)
+
+
+def test_views_buffered_until_flush(client, post_with_published_location):
+    post = post_with_published_location
+    url = reverse("blog:post_detail", args=[post.id])
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(3):
+            assert client.get(url).status_code == 200
+    assert not any(
+        query["sql"].startswith("UPDATE") for query in queries
+    ), "Убедитесь, что просмотр не пишет в базу сразу."
+    assert pending_views() == {post.id: 3}
+    assert views_in_db(post) == 0
+
+    assert flush_views() == 3
+    assert views_in_db(post) == 3, (
+        "Убедитесь, что flush_views прибавляет накопленные просмотры."
+    )
+    assert pending_views() == {}
+    assert flush_views() == 0
+
+
+def test_cached_page_view_is_counted(
+    page_cache, client, post_with_published_location
+):
+    url = reverse("blog:post_detail", args=[post_with_published_location.id])
+    client.get(url)
+    client.get(url)
+    assert pending_views() == {post_with_published_location.id: 2}, (
+        "Убедитесь, что просмотр страницы из кэша тоже засчитывается."
+    )
+
+
+def test_missing_page_is_not_counted(client, post_with_published_location):
+    post = post_with_published_location
+    post.is_published = False
+    post.save()
+    assert client.get(
+        reverse("blog:post_detail", args=[post.id])
+    ).status_code == 404
+    assert pending_views() == {}
+
+
+def test_flush_groups_updates_by_increment(mixer, user):
+    posts = mixer.cycle(3).blend("blog.Post", author=user)
+    for post, count in zip(posts, (2, 2, 1)):
+        for _ in range(count):
+            record_view(post.id)
+    with CaptureQueriesContext(connection) as queries:
+        flush_views()
+    updates = [
+        query for query in queries if query["sql"].startswith("UPDATE")
+    ]
+    assert len(updates) == 2, (
+        "Убедитесь, что просмотры записываются одним UPDATE на каждое"
+        " значение прироста."
+    )
+    assert [views_in_db(post) for post in posts] == [2, 2, 1]
+
+
+def test_failed_flush_keeps_counts(monkeypatch, post_with_published_location):
+    record_view(post_with_published_location.id)
+
+    def fail(func, *args, **kwargs):
+        raise RuntimeError("база занята")
+
+    monkeypatch.setattr(counters, "run_write", fail)
+    with pytest.raises(RuntimeError):
+        flush_views()
+    assert pending_views() == {post_with_published_location.id: 1}
+
+
+def test_save_does_not_overwrite_views(post_with_published_location):
+    post = Post.objects.get(pk=post_with_published_location.pk)
+    Post.objects.filter(pk=post.pk).update(views=F("views") + 7)
+    post.title = "Новый заголовок"
+    post.save()
+    assert views_in_db(post) == 7, (
+        "Убедитесь, что сохранение поста не затирает накопленные"
+        " просмотры."
+    )
+
+
+def test_views_shown_on_cards_and_detail(
+    client, post_with_published_location
+):
+    post = post_with_published_location
+    Post.objects.filter(pk=post.pk).update(views=12)
+    for url in (
+        reverse("blog:index"),
+        reverse("blog:post_detail", args=[post.id]),
+    ):
+        assert "Просмотры: 12" in client.get(url).content.decode(), (
+            f"Убедитесь, что на странице {url} показано число просмотров."
+        )
@@ -0,0 +1,86 @@
+import threading
+from http import HTTPStatus
+from unittest import mock
+
+import pytest
+from django.db import OperationalError
+from django.test import override_settings
+from django.urls import reverse
+
+from blogicum.db import (
+    DatabaseBusy, reset_write_stats, run_write, write_stats
+)
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.usefixtures("no_backoff"),
+]
+
+
+@pytest.fixture
+def no_backoff(settings):
+    settings.DB_WRITE_BACKOFF = 0
+    reset_write_stats()
+
+
+def flaky(failures, exc=OperationalError("database is locked")):
+    calls = []
+
+    def write():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise exc
+        return "saved"
+    return write, calls
+
+
+def test_retry_on_locked_database():
+    write, calls = flaky(2)
+    assert run_write(write) == "saved"
+    assert len(calls) == 3
+    stats = write_stats()
+    assert stats["writes"] == 1
+    assert stats["retries"] == 2, (
+        "Убедитесь, что повторы записи попадают в статистику ожидания."
+    )
+
+
+def test_gives_up_after_retries(settings):
+    settings.DB_WRITE_RETRIES = 2
+    write, calls = flaky(10)
+    with pytest.raises(DatabaseBusy):
+        run_write(write)
+    assert len(calls) == 3
+    assert write_stats()["failures"] == 1
+
+
+def test_other_errors_are_not_retried():
+    write, calls = flaky(1, OperationalError("no such table: blog_post"))
+    with pytest.raises(OperationalError):
+        run_write(write)
+    assert len(calls) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+@override_settings(DB_WRITE_MODE="queue")
+def test_queue_runs_writes_in_single_thread():
+    names = {
+        run_write(lambda: threading.current_thread().name)
+        for _ in range(5)
+    }
+    assert len(names) == 1
+    assert names.pop().startswith("db-writer")
+
+
+def test_busy_database_returns_503(user_client, post_with_published_location):
+    with mock.patch("blog.views.run_write", side_effect=DatabaseBusy):
+        response = user_client.post(
+            reverse(
+                "blog:add_comment", args=[post_with_published_location.id]
+            ),
+            data={"text": "Комментарий"},
+        )
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE, (
+        "Убедитесь, что при занятой базе запись отвечает 503, а не 500."
+    )
+    assert response["Retry-After"]